@@ -1,19 +1,35 @@
 from chalice import Chalice
-from chalice.app import Request
-from chalicelib.src.exchanges.alpaca.alpaca_cron_jobs import (
-    alpaca_schedule_price_check_at_next_interval_cron_job,
+from chalicelib.src.alerts.alerts_constants import alert_intake_mode_sqs
+from chalicelib.src.alerts.alerts_routes import alerts_routes
+from chalicelib.src.alerts.alerts_utils import get_alert_intake_mode
+from chalicelib.src.exchanges.alpaca.alpaca_routes import (
+    alpaca_routes,
+    alpaca_workers,
 )
-from chalicelib.src.exchanges.alpaca.alpaca_orders_utils import (
-    alpaca_submit_pair_trade_order,
-)
-from chalicelib.src.exchanges.bybit.bybit_order_utils import (
-    bybit_submit_pair_trade_order,
+from chalicelib.src.exchanges.bybit.bybit_routes import (
+    bybit_routes,
+    bybit_workers,
 )
 
+# Exchange routes live in per-exchange blueprints, which import exchange
+# modules inside each route handler, so a cold start only pays the SDK import
+# cost (alpaca-py, pybit, qstash, boto3) of the exchange the invocation is
+# for. See scripts/cold_start_benchmark.py. Each blueprint can also be
+# deployed as its own slim unit, see scripts/build_deployment_units.py
+
 # from chalicelib.src.aws.aws_constants import dynamodb_table_names_instance
 # from chalicelib.src.aws.dynamo_db import create_new_dynamodb_instance
 
 app = Chalice(app_name="orders")
+app.register_blueprint(alerts_routes)
+app.register_blueprint(alpaca_routes)
+app.register_blueprint(bybit_routes)
+
+# Queue workers subscribe to the SQS queues of alert_queue_names, which only
+# exist when ALERT_INTAKE_MODE is sqs
+if get_alert_intake_mode() == alert_intake_mode_sqs:
+    app.register_blueprint(alpaca_workers)
+    app.register_blueprint(bybit_workers)
 
 """
 Developer / Utility Routes
@@ -37,157 +53,6 @@ Developer / Utility Routes
 #     return {"dynamodb": "new table created"}
 
 
-"""
-Alpaca Routes
-"""
-
-
-@app.route("/alpacapairtradebuyalert", methods=["POST"])
-def alpaca_pair_trade_buy_alert():
-    request = app.current_request
-    tradingViewWebhookMessage = request.json_body
-    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-    alpaca_submit_pair_trade_order(tradingViewWebhookMessage["ticker"])
-
-    return {
-        "message": "alpacapairtradebuyalert - alert received",
-        "tradingViewWebhookMessage": tradingViewWebhookMessage,
-    }
-
-
-@app.route("/alpacapairtradesellalert", methods=["POST"])
-def alpaca_pair_trade_sell_alert():
-    request = app.current_request
-    tradingViewWebhookMessage = request.json_body
-    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-    alpaca_submit_pair_trade_order(
-        tradingViewWebhookMessage["ticker"], buy_alert=False
-    )
-
-    return {
-        "message": "alpacapairtradesellalert - alert received",
-        "tradingViewWebhookMessage": tradingViewWebhookMessage,
-    }
-
-
-@app.route("/testcronjobschedule", methods=["POST"])
-def alpaca_pair_price_check_at_next_interval():
-    request: Request | None = app.current_request
-    tradingViewWebhookMessage = request.json_body
-    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-    alpaca_schedule_price_check_at_next_interval_cron_job(
-        tradingViewWebhookMessage["ticker"],
-        tradingViewWebhookMessage["closePrice"],
-        tradingViewWebhookMessage["interval"],
-    )
-
-    return {
-        "message": "alpaca_schedule_price_check_at_next_interval_cron_job - cron job scheduled",  # noqa: E501
-        "tradingViewWebhookMessage": tradingViewWebhookMessage,
-    }
-
-
-# @app.route("/alpacapairtradebuyalertnotax", methods=["POST"])
-# def alpaca_pair_trade_buy_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     alpaca_submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         calculate_tax=False,
-#     )
-
-#     return {
-#         "message": "alpacapairtradebuyalertnotax - alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/alpacapairtradesellalertnotax", methods=["POST"])
-# def alpaca_pair_trade_sell_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     alpaca_submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         calculate_tax=False,
-#         buy_alert=False,
-#     )
-
-#     return {
-#         "message": "alpacapairtradesellalertnotax - alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-"""
-Bybit Routes
-"""
-
-
-@app.route("/bybitpairtradebuyalert", methods=["POST"])
-def bybit_pair_trade_buy_alert():
-    request = app.current_request
-    tradingViewWebhookMessage = request.json_body
-    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-    bybit_submit_pair_trade_order(tradingViewWebhookMessage["ticker"])
-
-    return {
-        "message": "bybitpairtradebuyalert - alert received",
-        "tradingViewWebhookMessage": tradingViewWebhookMessage,
-    }
-
-
-@app.route("/bybitpairtradesellalert", methods=["POST"])
-def bybit_pair_trade_sell_alert():
-    request = app.current_request
-    tradingViewWebhookMessage = request.json_body
-    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-    bybit_submit_pair_trade_order(
-        tradingViewWebhookMessage["ticker"], buy_alert=False
-    )
-
-    return {
-        "message": "bybitpairtradesellalert - alert received",
-        "tradingViewWebhookMessage": tradingViewWebhookMessage,
-    }
-
-
-# """
-# Kucoin Routes
-# """
-
-
-# # Developer function, convert assets in Kucoin subaccount to a stablecoin
-# @app.route("/converttostablecoin")
-# def transfer_funds_to_stablecoin():
-#     # set to sub account 1
-#     submit_market_order_custom_percentage(
-#         tax_pair, False, account=kucoin_account_names[2]
-#     )
-
-#     return {"message": "market order executed"}
-
-
-# # Developer function, reset Kucoin account to all Stablecoins
-# @app.route("/resettostablecoin")
-# def reset_funds_to_stablecoin():
-#     # SET BASE AND QUOTE CURRENCIES
-#     # SET ACCOUNT OR SUBACCOUNT
-#     # SET TRUE OR FALSE BUY
-#     # SET BUY PERCENTAGE CAPITAL
-#     pairToReset: str = "RNDRUP-USDT"
-#     account: str = kucoin_account_names[2]
-#     submit_market_order_custom_percentage(
-#         pairToReset,
-#         False,
-#         capital_percentage_to_deploy=1,
-#         account=account,
-#     )
-
-#     return {"message": "market order executed"}
-
-
 # """
 # Save historical Tradingview Alerts
 # """
@@ -219,286 +84,3 @@ def bybit_pair_trade_sell_alert():
 
 #     print("response: ", response)
 #     return {"saved": "ptos signal alert"}
-
-
-# """
-# Main Account routes
-# """
-
-
-# @app.route("/pairtradebuyalert", methods=["POST"])
-# def pair_trade_buy_alert():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/pairtradesellalert", methods=["POST"])
-# def pair_trade_sell_alert():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         buy_alert=False,
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/pairtradebuyalertnotax", methods=["POST"])
-# def pair_trade_buy_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# """
-# Sub Account 1 routes
-# """
-
-
-# @app.route("/sub1pairtradebuyalert", methods=["POST"])
-# def sub_1_pair_trade_buy_alert():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         account=kucoin_account_names[1],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub1pairtradesellalert", methods=["POST"])
-# def sub_1_pair_trade_sell_alert():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         buy_alert=False,
-#         account=kucoin_account_names[1],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub1pairtradebuyalertnotax", methods=["POST"])
-# def sub_1_pair_trade_buy_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         account=kucoin_account_names[1],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub1pairtradesellalertnotax", methods=["POST"])
-# def sub_1_pair_trade_sell_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         buy_alert=False,
-#         account=kucoin_account_names[1],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# """
-# Sub Account 2 routes
-# """
-
-
-# @app.route("/sub2pairtradebuyalert", methods=["POST"])
-# def sub_2_pair_trade_buy_alert():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         account=kucoin_account_names[2],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub2pairtradesellalert", methods=["POST"])
-# def sub_2_pair_trade_sell_alert():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         buy_alert=False,
-#         account=kucoin_account_names[2],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub2pairtradebuyalertnotax", methods=["POST"])
-# def sub_2_pair_trade_buy_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         account=kucoin_account_names[2],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub2pairtradesellalertnotax", methods=["POST"])
-# def sub_2_pair_trade_sell_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         buy_alert=False,
-#         account=kucoin_account_names[2],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub3pairtradebuyalertnotax", methods=["POST"])
-# def sub_3_pair_trade_buy_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         account=kucoin_account_names[3],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub3pairtradesellalertnotax", methods=["POST"])
-# def sub_3_pair_trade_sell_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         buy_alert=False,
-#         account=kucoin_account_names[3],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub4pairtradebuyalertnotax", methods=["POST"])
-# def sub_4_pair_trade_buy_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         account=kucoin_account_names[4],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
-
-
-# @app.route("/sub4pairtradesellalertnotax", methods=["POST"])
-# def sub_4_pair_trade_sell_alert_no_tax():
-#     request = app.current_request
-#     tradingViewWebhookMessage = request.json_body
-#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
-#     submit_pair_trade_order(
-#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
-#         capital_to_deploy=0.98,
-#         calculate_tax=False,
-#         buy_alert=False,
-#         account=kucoin_account_names[4],
-#     )
-
-#     return {
-#         "message": "alert received",
-#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
-#     }
@@ -0,0 +1,117 @@
+from typing import Dict
+
+from chalicelib.src.alerts.alerts_types import (
+    AlertExchangeAccounts,
+    AlertJobHandler,
+    AlertMetadataLoader,
+)
+
+# Alert intake modes, read from the ALERT_INTAKE_MODE environment variable.
+# sync executes the pair trade inside the webhook request, sqs and local
+# acknowledge the webhook once the alert is queued
+alert_intake_mode_environment_variable: str = "ALERT_INTAKE_MODE"
+alert_intake_mode_sync: str = "sync"
+alert_intake_mode_sqs: str = "sqs"
+alert_intake_mode_local: str = "local"
+
+# Exchange names, match the names used for the position state of a pair
+alert_exchange_alpaca: str = "alpaca"
+alert_exchange_bybit: str = "bybit"
+alert_exchange_kucoin: str = "kucoin"
+
+# One SQS FIFO queue per exchange. Messages are grouped per pair, so alerts
+# of a pair run in order while different pairs run in parallel
+alert_queue_names: Dict[str, str] = {
+    alert_exchange_alpaca: "orders-alpaca-alerts.fifo",
+    alert_exchange_bybit: "orders-bybit-alerts.fifo",
+    alert_exchange_kucoin: "orders-kucoin-alerts.fifo",
+}
+
+# Capital gains of a closed leg are saved by a tax task once the opening leg
+# is submitted. In sqs mode the task is handed to the tax queue of the
+# exchange and saved by its worker, otherwise it runs in the alert invocation
+alert_tax_queue_names: Dict[str, str] = {
+    alert_exchange_alpaca: "orders-alpaca-tax-tasks",
+}
+
+# Order function of each exchange, imported when the first job of the
+# exchange runs to keep the intake path light
+alert_job_handlers: Dict[str, AlertJobHandler] = {
+    alert_exchange_alpaca: {
+        "module": "chalicelib.src.exchanges.alpaca.alpaca_orders_utils",
+        "function": "alpaca_submit_pair_trade_order",
+        "account_parameter": "account",
+    },
+    alert_exchange_bybit: {
+        "module": "chalicelib.src.exchanges.bybit.bybit_order_utils",
+        "function": "bybit_submit_pair_trade_order",
+        "account_parameter": "account_name",
+    },
+    alert_exchange_kucoin: {
+        "module": "chalicelib.src.exchanges.kucoin.kucoin_utils",
+        "function": "submit_pair_trade_order",
+        "account_parameter": "account",
+    },
+}
+
+# Worker threads of the local queue, each works through one pair at a time
+alert_local_max_workers: int = 4
+
+# Batch alerts, one request carries the alerts of many pairs. In sync mode
+# the pairs of a batch are traded concurrently
+alert_batch_max_size: int = 50
+alert_batch_max_workers: int = 8
+alert_sides: Dict[str, bool] = {"buy": True, "sell": False}
+
+# Fan-out alerts, one alert is traded on several accounts of an exchange. In
+# sync mode the accounts are traded concurrently, bounded so the exchange
+# rate limits of a master account and its subaccounts are not exceeded
+alert_fanout_max_accounts: int = 10
+alert_fanout_max_workers: int = 4
+
+# Symbol metadata of each exchange, loaded once before the accounts of a
+# fan-out alert are traded so the concurrent orders share it
+alert_metadata_loaders: Dict[str, AlertMetadataLoader] = {
+    alert_exchange_alpaca: {
+        "module": "chalicelib.src.exchanges.alpaca.alpaca_asset_utils",
+        "function": "alpaca_load_asset_metadata",
+        "account_parameter": "account",
+    },
+    alert_exchange_bybit: {
+        "module": "chalicelib.src.exchanges.bybit.bybit_instrument_utils",
+        "function": "bybit_load_instrument_table",
+        "account_parameter": "account_name",
+    },
+    alert_exchange_kucoin: {
+        "module": "chalicelib.src.exchanges.kucoin.kucoin_utils",
+        "function": "load_symbol_increments",
+        "account_parameter": None,
+    },
+}
+
+# Accounts of each exchange, the keys of the credentials in the constants
+# module of the exchange. Imported when a fan-out alert is checked
+alert_exchange_accounts: Dict[str, AlertExchangeAccounts] = {
+    alert_exchange_alpaca: {
+        "module": "chalicelib.src.exchanges.alpaca.alpaca_constants",
+        "attribute": "alpaca_accounts",
+    },
+    alert_exchange_bybit: {
+        "module": "chalicelib.src.exchanges.bybit.bybit_constants",
+        "attribute": "bybit_accounts",
+    },
+    alert_exchange_kucoin: {
+        "module": "chalicelib.src.exchanges.kucoin.kucoin_constants",
+        "attribute": "kucoin_accounts",
+    },
+}
+
+# Cross-exchange alerts, one TradingView signal is traded on every exchange
+# it is routed to. Maps the ticker of the signal to the TradingView symbol of
+# the pair on each exchange, see tradingview_*_symbols of each exchange
+alert_exchange_routes: Dict[str, Dict[str, str]] = {
+    "<insert>": {
+        alert_exchange_alpaca: "<insert>",
+        alert_exchange_bybit: "<insert>",
+    },
+}
@@ -0,0 +1,68 @@
+import time
+
+from chalice import Blueprint
+from chalicelib.src.alerts.alerts_types import (
+    AlertAccountResult,
+    AlertBatchResult,
+    AlertExchangeResult,
+)
+from chalicelib.src.alerts.alerts_utils import (
+    submit_alert_batch,
+    submit_alert_cross_exchange,
+    submit_alert_fanout,
+)
+
+# Routes for alerts of several exchanges, registered by the combined orders
+# app. Exchange modules are imported when the first alert of the exchange runs
+alerts_routes: Blueprint = Blueprint(__name__)
+
+
+@alerts_routes.route("/pairtradebatchalert", methods=["POST"])
+def pair_trade_batch_alert():
+    request = alerts_routes.current_request
+    tradingViewWebhookMessages = request.json_body
+    print("tradingViewWebhookMessages", tradingViewWebhookMessages, "\n")
+    results: list[AlertBatchResult] = submit_alert_batch(
+        tradingViewWebhookMessages
+    )
+
+    return {
+        "message": "pairtradebatchalert - alerts received",
+        "results": results,
+    }
+
+
+@alerts_routes.route("/pairtradefanoutalert", methods=["POST"])
+def pair_trade_fanout_alert():
+    request = alerts_routes.current_request
+    tradingViewWebhookMessage = request.json_body
+    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+    start_time: float = time.monotonic()
+    results: list[AlertAccountResult] = submit_alert_fanout(
+        tradingViewWebhookMessage
+    )
+
+    return {
+        "message": "pairtradefanoutalert - alert received",
+        "durationSeconds": round(time.monotonic() - start_time, 3),
+        "results": results,
+        "tradingViewWebhookMessage": tradingViewWebhookMessage,
+    }
+
+
+@alerts_routes.route("/pairtradecrossexchangealert", methods=["POST"])
+def pair_trade_cross_exchange_alert():
+    request = alerts_routes.current_request
+    tradingViewWebhookMessage = request.json_body
+    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+    start_time: float = time.monotonic()
+    results: list[AlertExchangeResult] = submit_alert_cross_exchange(
+        tradingViewWebhookMessage
+    )
+
+    return {
+        "message": "pairtradecrossexchangealert - alert received",
+        "durationSeconds": round(time.monotonic() - start_time, 3),
+        "results": results,
+        "tradingViewWebhookMessage": tradingViewWebhookMessage,
+    }
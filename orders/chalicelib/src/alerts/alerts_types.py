@@ -0,0 +1,56 @@
+from typing import Optional, TypedDict
+
+
+class AlertJob(TypedDict):
+    job_id: str
+    exchange: str
+    tradingview_symbol: str
+    buy_alert: bool
+    calculate_tax: bool
+    capital_to_deploy: Optional[str]
+    account: Optional[str]
+    received_at: float
+
+
+class AlertJobHandler(TypedDict):
+    module: str
+    function: str
+    account_parameter: str
+
+
+class AlertBatchResult(TypedDict):
+    index: int
+    exchange: Optional[str]
+    ticker: Optional[str]
+    side: Optional[str]
+    status: str
+    job_id: Optional[str]
+    error: Optional[str]
+
+
+class AlertMetadataLoader(TypedDict):
+    module: str
+    function: str
+    account_parameter: Optional[str]
+
+
+class AlertExchangeAccounts(TypedDict):
+    module: str
+    attribute: str
+
+
+class AlertAccountResult(TypedDict):
+    account: str
+    status: str
+    job_id: Optional[str]
+    error: Optional[str]
+    duration_seconds: Optional[float]
+
+
+class AlertExchangeResult(TypedDict):
+    exchange: str
+    ticker: str
+    status: str
+    job_id: Optional[str]
+    error: Optional[str]
+    duration_seconds: Optional[float]
@@ -0,0 +1,864 @@
+import json
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import Decimal
+from importlib import import_module
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from chalice import BadRequestError
+from chalicelib.src.alerts.alerts_constants import (
+    alert_batch_max_size,
+    alert_batch_max_workers,
+    alert_exchange_accounts,
+    alert_exchange_routes,
+    alert_fanout_max_accounts,
+    alert_fanout_max_workers,
+    alert_intake_mode_environment_variable,
+    alert_intake_mode_local,
+    alert_intake_mode_sqs,
+    alert_intake_mode_sync,
+    alert_job_handlers,
+    alert_local_max_workers,
+    alert_metadata_loaders,
+    alert_queue_names,
+    alert_sides,
+)
+from chalicelib.src.alerts.alerts_types import (
+    AlertAccountResult,
+    AlertBatchResult,
+    AlertExchangeAccounts,
+    AlertExchangeResult,
+    AlertJob,
+    AlertJobHandler,
+    AlertMetadataLoader,
+)
+
+# SQS client and queue URLs, created on first use and kept for the lifetime
+# of the Lambda container
+alert_sqs_client: Any = None
+alert_queue_urls: Dict[str, str] = {}
+alert_sqs_lock: Lock = Lock()
+
+# Local queue, one deque of pending jobs per pair. A pair with a deque is
+# being worked through by one worker thread, so its alerts run in order.
+# Meant for chalice local, a Lambda container is frozen once it responds
+local_alert_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=alert_local_max_workers,
+    thread_name_prefix="alert-worker",
+)
+local_alert_queues: Dict[str, Deque[AlertJob]] = {}
+local_alert_queues_lock: Lock = Lock()
+
+# Worker threads of sync batches, shared by every batch handled by the
+# container so pooled exchange clients and metadata caches stay warm
+alert_batch_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=alert_batch_max_workers,
+    thread_name_prefix="alert-batch",
+)
+
+# Worker threads of sync fan-out alerts, bounds how many accounts are traded
+# at once
+alert_fanout_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=alert_fanout_max_workers,
+    thread_name_prefix="alert-fanout",
+)
+
+
+def get_alert_intake_mode() -> str:
+    """
+    Retrieves the alert intake mode of the deployment
+
+    Returns:
+    - A string with the intake mode, sync when it is not set
+    """
+
+    intake_mode: str = os.getenv(
+        alert_intake_mode_environment_variable, alert_intake_mode_sync
+    ).lower()
+    if intake_mode not in (
+        alert_intake_mode_sync,
+        alert_intake_mode_sqs,
+        alert_intake_mode_local,
+    ):
+        print(f"Unknown alert intake mode {intake_mode}, using sync")
+        return alert_intake_mode_sync
+    return intake_mode
+
+
+def validate_alert_message(webhook_message: Any) -> str:
+    """
+    Check a TradingView webhook message can be turned into an alert job
+
+    Parameters:
+    - webhook_message: JSON body of the webhook
+
+    Returns:
+    - A string with the TradingView symbol of the alert
+
+    Raises:
+    - ValueError: If the message has no ticker
+    """
+
+    if not isinstance(webhook_message, dict):
+        raise ValueError("Alert message must be a JSON object")
+
+    tradingview_symbol: Any = webhook_message.get("ticker")
+    if not isinstance(tradingview_symbol, str) or not tradingview_symbol:
+        raise ValueError("Alert message has no ticker")
+
+    return tradingview_symbol
+
+
+def create_alert_job(
+    exchange: str,
+    webhook_message: Any,
+    buy_alert: bool = True,
+    calculate_tax: bool = True,
+    capital_to_deploy: Decimal | float | None = None,
+    account: str | None = None,
+) -> AlertJob:
+    """
+    Validate a webhook message and describe the pair trade to run
+
+    Parameters:
+    - exchange: Exchange to trade on, a key of alert_job_handlers
+    - webhook_message: JSON body of the webhook
+    - buy_alert: Set buy or sell alert
+    - calculate_tax: Calculate tax on the closed inverse leg
+    - capital_to_deploy: Percentage of holdings to deploy, or None for the
+    default of the exchange
+    - account: Account to trade with, or None for the default of the
+    exchange
+
+    Returns:
+    - A AlertJob object that can be serialised to JSON
+
+    Raises:
+    - ValueError: If the exchange is unknown or the message is invalid
+    """
+
+    if not isinstance(exchange, str) or exchange not in alert_job_handlers:
+        raise ValueError(f"Unknown exchange {exchange}")
+
+    return {
+        "job_id": str(uuid.uuid4()),
+        "exchange": exchange,
+        "tradingview_symbol": validate_alert_message(webhook_message),
+        "buy_alert": buy_alert,
+        "calculate_tax": calculate_tax,
+        "capital_to_deploy": (
+            str(capital_to_deploy) if capital_to_deploy is not None else None
+        ),
+        "account": account,
+        "received_at": time.time(),
+    }
+
+
+def get_alert_pair_key(alert_job: AlertJob) -> str:
+    """
+    Key of the pair an alert job trades. Jobs with the same key run in order
+
+    Parameters:
+    - alert_job: Alert job to key
+
+    Returns:
+    - A string eg. alpaca#default#QQQ
+    """
+
+    return "#".join(
+        [
+            alert_job["exchange"],
+            alert_job["account"] or "default",
+            alert_job["tradingview_symbol"],
+        ]
+    )
+
+
+def get_alert_order_error(opening_order: Any) -> str | None:
+    """
+    Outcome of the opening order returned by the pair trade of an exchange.
+    The exchanges print order errors and return None or the error message
+    instead of raising them
+
+    Parameters:
+    - opening_order: Order returned by the pair trade function
+
+    Returns:
+    - A string with the reason the order was not placed, or None if it was
+    """
+
+    if opening_order is None:
+        return "Opening order not placed"
+    if isinstance(opening_order, str):
+        return opening_order
+    return None
+
+
+def execute_alert_job(alert_job: AlertJob) -> Any:
+    """
+    Run the pair trade described by an alert job
+
+    Parameters:
+    - alert_job: Alert job to run
+
+    Returns:
+    - The opening order of the pair trade, see get_alert_order_error
+    """
+
+    handler: AlertJobHandler = alert_job_handlers[alert_job["exchange"]]
+    submit_pair_trade_order: Callable[..., Any] = getattr(
+        import_module(handler["module"]), handler["function"]
+    )
+
+    order_parameters: Dict[str, Any] = {
+        "tradingview_symbol": alert_job["tradingview_symbol"],
+        "calculate_tax": alert_job["calculate_tax"],
+        "buy_alert": alert_job["buy_alert"],
+    }
+    if alert_job["capital_to_deploy"] is not None:
+        order_parameters["capital_to_deploy"] = Decimal(
+            alert_job["capital_to_deploy"]
+        )
+    if alert_job["account"] is not None:
+        order_parameters[handler["account_parameter"]] = alert_job["account"]
+
+    print(
+        f"Alert job {alert_job['job_id']} started",
+        f"{time.time() - alert_job['received_at']:.3f}s after intake",
+    )
+    opening_order: Any = submit_pair_trade_order(**order_parameters)
+    order_error: str | None = get_alert_order_error(opening_order)
+    if order_error:
+        print(f"Alert job {alert_job['job_id']} completed: {order_error}")
+    else:
+        print(f"Alert job {alert_job['job_id']} completed")
+    return opening_order
+
+
+def execute_alert_job_message(message_body: str) -> None:
+    """
+    Run the alert job of a queue message. Errors are raised, so SQS retries
+    the message before the next alert of the pair is delivered
+
+    Parameters:
+    - message_body: JSON body of the message, see send_alert_job_to_sqs
+    """
+
+    execute_alert_job(json.loads(message_body))
+
+
+def get_alert_sqs_client() -> Any:
+    """
+    Retrieves the shared SQS client, creating it on first use. boto3 is
+    imported here so the sync and local intake modes do not load it
+
+    Returns:
+    - A boto3 SQS client
+    """
+
+    global alert_sqs_client
+
+    with alert_sqs_lock:
+        if alert_sqs_client is None:
+            import boto3
+
+            alert_sqs_client = boto3.client("sqs")
+        return alert_sqs_client
+
+
+def get_alert_queue_url(exchange: str) -> str:
+    """
+    Retrieves the URL of the alert queue of an exchange, looked up once
+
+    Parameters:
+    - exchange: Exchange of the queue
+
+    Returns:
+    - A string with the queue URL
+    """
+
+    queue_url: str | None = alert_queue_urls.get(exchange)
+    if queue_url is None:
+        queue_url = get_alert_sqs_client().get_queue_url(
+            QueueName=alert_queue_names[exchange]
+        )["QueueUrl"]
+        alert_queue_urls[exchange] = queue_url
+    return queue_url
+
+
+def send_alert_job_to_sqs(alert_job: AlertJob) -> str:
+    """
+    Send an alert job to the SQS FIFO queue of its exchange. The pair is the
+    message group, so a pair is worked through in order
+
+    Parameters:
+    - alert_job: Alert job to send
+
+    Returns:
+    - A string with the SQS message id
+    """
+
+    response: Dict[str, Any] = get_alert_sqs_client().send_message(
+        QueueUrl=get_alert_queue_url(alert_job["exchange"]),
+        MessageBody=json.dumps(alert_job),
+        MessageGroupId=get_alert_pair_key(alert_job),
+        MessageDeduplicationId=alert_job["job_id"],
+    )
+    return response["MessageId"]
+
+
+def send_alert_jobs_to_sqs(
+    alert_jobs: List[AlertJob],
+) -> Dict[str, str | None]:
+    """
+    Send alert jobs to the SQS FIFO queues of their exchanges, in batches of
+    up to 10 messages per queue
+
+    Parameters:
+    - alert_jobs: Alert jobs to send
+
+    Returns:
+    - A dictionary keyed by job id, with None for sent jobs or the error of
+    jobs that were not sent
+    """
+
+    jobs_by_exchange: Dict[str, List[AlertJob]] = {}
+    for alert_job in alert_jobs:
+        jobs_by_exchange.setdefault(alert_job["exchange"], []).append(
+            alert_job
+        )
+
+    send_errors: Dict[str, str | None] = {}
+    for exchange, exchange_jobs in jobs_by_exchange.items():
+        for start in range(0, len(exchange_jobs), 10):
+            batch_end: int = start + 10
+            batch_jobs: List[AlertJob] = exchange_jobs[start:batch_end]
+            entries: List[Dict[str, str]] = [
+                {
+                    "Id": str(entry_index),
+                    "MessageBody": json.dumps(alert_job),
+                    "MessageGroupId": get_alert_pair_key(alert_job),
+                    "MessageDeduplicationId": alert_job["job_id"],
+                }
+                for entry_index, alert_job in enumerate(batch_jobs)
+            ]
+            try:
+                sqs_client: Any = get_alert_sqs_client()
+                response: Dict[str, Any] = sqs_client.send_message_batch(
+                    QueueUrl=get_alert_queue_url(exchange), Entries=entries
+                )
+            except Exception as e:
+                for alert_job in batch_jobs:
+                    send_errors[alert_job["job_id"]] = str(e)
+                continue
+
+            for alert_job in batch_jobs:
+                send_errors[alert_job["job_id"]] = None
+            for failed_entry in response.get("Failed", []):
+                alert_job = batch_jobs[int(failed_entry["Id"])]
+                send_errors[alert_job["job_id"]] = failed_entry.get(
+                    "Message", failed_entry.get("Code", "Not sent")
+                )
+
+    return send_errors
+
+
+def send_alert_job_to_local_queue(alert_job: AlertJob) -> None:
+    """
+    Add an alert job to the in-process queue of its pair, and start a worker
+    for the pair if none is running
+
+    Parameters:
+    - alert_job: Alert job to queue
+    """
+
+    pair_key: str = get_alert_pair_key(alert_job)
+    with local_alert_queues_lock:
+        pair_queue: Deque[AlertJob] | None = local_alert_queues.get(pair_key)
+        if pair_queue is not None:
+            pair_queue.append(alert_job)
+            return
+        local_alert_queues[pair_key] = deque([alert_job])
+
+    local_alert_executor.submit(run_local_alert_queue, pair_key)
+
+
+def run_local_alert_queue(pair_key: str) -> None:
+    """
+    Work through the queued jobs of a pair, oldest first. The queue is
+    removed once it is empty, so the next job starts a new worker
+
+    Parameters:
+    - pair_key: Pair of the queue, see get_alert_pair_key
+    """
+
+    while True:
+        with local_alert_queues_lock:
+            pair_queue: Deque[AlertJob] = local_alert_queues[pair_key]
+            if not pair_queue:
+                del local_alert_queues[pair_key]
+                return
+            alert_job: AlertJob = pair_queue.popleft()
+
+        try:
+            execute_alert_job(alert_job)
+        except Exception as e:
+            print(f"Alert job {alert_job['job_id']} failed: {e}")
+
+
+def submit_alert(
+    exchange: str,
+    webhook_message: Any,
+    buy_alert: bool = True,
+    calculate_tax: bool = True,
+    capital_to_deploy: Decimal | float | None = None,
+    account: str | None = None,
+) -> AlertJob:
+    """
+    Handle a TradingView alert in the intake mode of the deployment. The
+    sqs and local modes return once the alert is queued, so the webhook is
+    acknowledged without waiting for the orders
+
+    Parameters:
+    - exchange: Exchange to trade on, a key of alert_job_handlers
+    - webhook_message: JSON body of the webhook
+    - buy_alert: Set buy or sell alert
+    - calculate_tax: Calculate tax on the closed inverse leg
+    - capital_to_deploy: Percentage of holdings to deploy, or None for the
+    default of the exchange
+    - account: Account to trade with, or None for the default of the
+    exchange
+
+    Returns:
+    - The AlertJob that was queued or executed
+
+    Raises:
+    - BadRequestError: If the exchange is unknown or the message is invalid
+    """
+
+    try:
+        alert_job: AlertJob = create_alert_job(
+            exchange,
+            webhook_message,
+            buy_alert,
+            calculate_tax,
+            capital_to_deploy,
+            account,
+        )
+    except ValueError as e:
+        print(f"Alert rejected: {e}")
+        raise BadRequestError(str(e))
+    intake_mode: str = get_alert_intake_mode()
+
+    if intake_mode == alert_intake_mode_sqs:
+        message_id: str = send_alert_job_to_sqs(alert_job)
+        print(f"Alert job {alert_job['job_id']} queued as {message_id}")
+    elif intake_mode == alert_intake_mode_local:
+        send_alert_job_to_local_queue(alert_job)
+        print(f"Alert job {alert_job['job_id']} queued locally")
+    else:
+        execute_alert_job(alert_job)
+
+    return alert_job
+
+
+def create_alert_batch_result(
+    index: int,
+    webhook_message: Any,
+    status: str,
+    job_id: str | None = None,
+    error: str | None = None,
+) -> AlertBatchResult:
+    """
+    Result of one alert of a batch
+
+    Parameters:
+    - index: Position of the alert in the batch
+    - webhook_message: The alert message
+    - status: One of executed, queued, duplicate, rejected or failed
+    - job_id: Id of the alert job, if one was created
+    - error: Reason the alert was rejected or failed
+
+    Returns:
+    - A AlertBatchResult object
+    """
+
+    message_fields: Dict[str, Any] = (
+        webhook_message if isinstance(webhook_message, dict) else {}
+    )
+    return {
+        "index": index,
+        "exchange": message_fields.get("exchange"),
+        "ticker": message_fields.get("ticker"),
+        "side": message_fields.get("side"),
+        "status": status,
+        "job_id": job_id,
+        "error": error,
+    }
+
+
+def submit_alert_batch(webhook_messages: Any) -> List[AlertBatchResult]:
+    """
+    Handle many TradingView alerts of one bar close in a single request.
+    Alerts of the same pair are deduplicated, the last one in the batch is
+    kept. In sync mode the remaining pairs are traded concurrently, and an
+    alert is executed once its opening order is placed. Otherwise they are
+    queued like single alerts
+
+    Parameters:
+    - webhook_messages: JSON array of {exchange, ticker, side} messages
+
+    Returns:
+    - A list with the AlertBatchResult of each message, in batch order
+
+    Raises:
+    - BadRequestError: If the batch is not an array or is too large
+    """
+
+    if not isinstance(webhook_messages, list) or not webhook_messages:
+        raise BadRequestError("Alert batch must be a non-empty JSON array")
+    if len(webhook_messages) > alert_batch_max_size:
+        raise BadRequestError(
+            f"Alert batch holds more than {alert_batch_max_size} alerts"
+        )
+
+    results: List[AlertBatchResult] = []
+    # Latest alert job of each pair and its position in the batch
+    pair_alert_jobs: Dict[str, Tuple[int, AlertJob]] = {}
+    for index, webhook_message in enumerate(webhook_messages):
+        try:
+            side: Any = (
+                webhook_message.get("side")
+                if isinstance(webhook_message, dict)
+                else None
+            )
+            if side not in alert_sides:
+                raise ValueError("Alert side must be buy or sell")
+            alert_job: AlertJob = create_alert_job(
+                webhook_message.get("exchange"),
+                webhook_message,
+                buy_alert=alert_sides[side],
+            )
+        except ValueError as e:
+            results.append(
+                create_alert_batch_result(
+                    index, webhook_message, "rejected", error=str(e)
+                )
+            )
+            continue
+
+        results.append(
+            create_alert_batch_result(
+                index, webhook_message, "pending", alert_job["job_id"]
+            )
+        )
+        pair_key: str = get_alert_pair_key(alert_job)
+        if pair_key in pair_alert_jobs:
+            results[pair_alert_jobs[pair_key][0]]["status"] = "duplicate"
+        pair_alert_jobs[pair_key] = (index, alert_job)
+
+    intake_mode: str = get_alert_intake_mode()
+    if intake_mode == alert_intake_mode_sqs:
+        send_errors: Dict[str, str | None] = send_alert_jobs_to_sqs(
+            [alert_job for _, alert_job in pair_alert_jobs.values()]
+        )
+        for index, alert_job in pair_alert_jobs.values():
+            results[index]["error"] = send_errors[alert_job["job_id"]]
+            results[index]["status"] = (
+                "failed" if results[index]["error"] else "queued"
+            )
+    elif intake_mode == alert_intake_mode_local:
+        for index, alert_job in pair_alert_jobs.values():
+            send_alert_job_to_local_queue(alert_job)
+            results[index]["status"] = "queued"
+    else:
+        futures: Dict[int, Future] = {
+            index: alert_batch_executor.submit(execute_alert_job, alert_job)
+            for index, alert_job in pair_alert_jobs.values()
+        }
+        for index, future in futures.items():
+            try:
+                results[index]["error"] = get_alert_order_error(
+                    future.result()
+                )
+            except Exception as e:
+                print(f"Alert job {results[index]['job_id']} failed: {e}")
+                results[index]["error"] = str(e)
+            results[index]["status"] = (
+                "failed" if results[index]["error"] else "executed"
+            )
+
+    return results
+
+
+def get_alert_exchange_accounts(exchange: Any) -> List[str]:
+    """
+    Retrieves the account names of an exchange
+
+    Parameters:
+    - exchange: Exchange name, a key of alert_exchange_accounts
+
+    Returns:
+    - A list of account names
+
+    Raises:
+    - ValueError: If the exchange is unknown
+    """
+
+    if (
+        not isinstance(exchange, str)
+        or exchange not in alert_exchange_accounts
+    ):
+        raise ValueError(f"Unknown exchange {exchange}")
+
+    exchange_accounts: AlertExchangeAccounts = alert_exchange_accounts[
+        exchange
+    ]
+    return list(
+        getattr(
+            import_module(exchange_accounts["module"]),
+            exchange_accounts["attribute"],
+        )
+    )
+
+
+def validate_alert_accounts(accounts: Any, exchange: Any) -> List[str]:
+    """
+    Check the accounts of a fan-out alert
+
+    Parameters:
+    - accounts: JSON array of account names
+    - exchange: Exchange the accounts belong to
+
+    Returns:
+    - A list of account names, without repeated accounts
+
+    Raises:
+    - ValueError: If the accounts are not a non-empty array of names of
+    accounts of the exchange
+    """
+
+    if not isinstance(accounts, list) or not accounts:
+        raise ValueError("Alert accounts must be a non-empty JSON array")
+    if not all(isinstance(account, str) and account for account in accounts):
+        raise ValueError("Alert accounts must be account names")
+
+    unique_accounts: List[str] = list(dict.fromkeys(accounts))
+    if len(unique_accounts) > alert_fanout_max_accounts:
+        raise ValueError(
+            f"Alert targets more than {alert_fanout_max_accounts} accounts"
+        )
+
+    exchange_accounts: List[str] = get_alert_exchange_accounts(exchange)
+    unknown_accounts: List[str] = [
+        account
+        for account in unique_accounts
+        if account not in exchange_accounts
+    ]
+    if unknown_accounts:
+        raise ValueError(
+            f"Unknown {exchange} accounts: {', '.join(unknown_accounts)}"
+        )
+    return unique_accounts
+
+
+def load_alert_metadata(exchange: str, account: str) -> None:
+    """
+    Load the symbol metadata of an exchange before its accounts are traded
+    concurrently. Errors are printed, each order can still load it itself
+
+    Parameters:
+    - exchange: Exchange to load, a key of alert_metadata_loaders
+    - account: Account used if the metadata has to be fetched
+    """
+
+    loader: AlertMetadataLoader = alert_metadata_loaders[exchange]
+    loader_parameters: Dict[str, Any] = (
+        {loader["account_parameter"]: account}
+        if loader["account_parameter"]
+        else {}
+    )
+    try:
+        load_metadata: Callable[..., Any] = getattr(
+            import_module(loader["module"]), loader["function"]
+        )
+        load_metadata(**loader_parameters)
+    except Exception as e:
+        print(f"Error loading {exchange} metadata: {e}")
+
+
+def execute_alert_job_timed(alert_job: AlertJob) -> Tuple[str | None, float]:
+    """
+    Run the pair trade of an alert job and time it. Errors are returned, so
+    a failed job does not stop the jobs run next to it
+
+    Parameters:
+    - alert_job: Alert job to run
+
+    Returns:
+    - A tuple with the error, None if the opening order was placed, and the
+    duration in seconds
+    """
+
+    error: str | None = None
+    start_time: float = time.monotonic()
+    try:
+        error = get_alert_order_error(execute_alert_job(alert_job))
+    except Exception as e:
+        print(f"Alert job {alert_job['job_id']} failed: {e}")
+        error = str(e)
+    return error, round(time.monotonic() - start_time, 3)
+
+
+def submit_alert_fanout(webhook_message: Any) -> List[AlertAccountResult]:
+    """
+    Handle a TradingView alert that is traded on several accounts of one
+    exchange. In sync mode the symbol metadata is loaded once and the
+    accounts are traded concurrently, and an account is executed once its
+    opening order is placed. Otherwise one job per account is queued like
+    single alerts
+
+    Parameters:
+    - webhook_message: JSON body of {exchange, ticker, side, accounts}
+
+    Returns:
+    - A list with the AlertAccountResult of each account, in request order
+
+    Raises:
+    - BadRequestError: If the exchange, side or accounts are invalid
+    """
+
+    try:
+        if not isinstance(webhook_message, dict):
+            raise ValueError("Alert message must be a JSON object")
+        side: Any = webhook_message.get("side")
+        if side not in alert_sides:
+            raise ValueError("Alert side must be buy or sell")
+        accounts: List[str] = validate_alert_accounts(
+            webhook_message.get("accounts"), webhook_message.get("exchange")
+        )
+        alert_jobs: List[AlertJob] = [
+            create_alert_job(
+                webhook_message.get("exchange"),
+                webhook_message,
+                buy_alert=alert_sides[side],
+                account=account,
+            )
+            for account in accounts
+        ]
+    except ValueError as e:
+        print(f"Alert rejected: {e}")
+        raise BadRequestError(str(e))
+
+    results: List[AlertAccountResult] = [
+        {
+            "account": alert_job["account"],
+            "status": "queued",
+            "job_id": alert_job["job_id"],
+            "error": None,
+            "duration_seconds": None,
+        }
+        for alert_job in alert_jobs
+    ]
+
+    intake_mode: str = get_alert_intake_mode()
+    if intake_mode == alert_intake_mode_sqs:
+        send_errors: Dict[str, str | None] = send_alert_jobs_to_sqs(alert_jobs)
+        for result in results:
+            result["error"] = send_errors[result["job_id"]]
+            if result["error"]:
+                result["status"] = "failed"
+    elif intake_mode == alert_intake_mode_local:
+        for alert_job in alert_jobs:
+            send_alert_job_to_local_queue(alert_job)
+    else:
+        load_alert_metadata(alert_jobs[0]["exchange"], accounts[0])
+        for result, (error, duration_seconds) in zip(
+            results,
+            alert_fanout_executor.map(execute_alert_job_timed, alert_jobs),
+        ):
+            result["status"] = "failed" if error else "executed"
+            result["error"] = error
+            result["duration_seconds"] = duration_seconds
+
+    return results
+
+
+def submit_alert_cross_exchange(
+    webhook_message: Any,
+) -> List[AlertExchangeResult]:
+    """
+    Handle a TradingView alert that is traded on every exchange it is routed
+    to in alert_exchange_routes. In sync mode the exchanges are traded
+    concurrently, so a slow or failing exchange does not hold up the others,
+    and an exchange is executed once its opening order is placed. Otherwise
+    one job per exchange is queued like single alerts
+
+    Parameters:
+    - webhook_message: JSON body of {ticker, side}
+
+    Returns:
+    - A list with the AlertExchangeResult of each exchange of the route
+
+    Raises:
+    - BadRequestError: If the side is invalid or the ticker has no route
+    """
+
+    try:
+        tradingview_symbol: str = validate_alert_message(webhook_message)
+        side: Any = webhook_message.get("side")
+        if side not in alert_sides:
+            raise ValueError("Alert side must be buy or sell")
+        exchange_route: Dict[str, str] | None = alert_exchange_routes.get(
+            tradingview_symbol
+        )
+        if not exchange_route:
+            raise ValueError(f"No exchange route for {tradingview_symbol}")
+        alert_jobs: List[AlertJob] = [
+            create_alert_job(
+                exchange,
+                {"ticker": exchange_symbol},
+                buy_alert=alert_sides[side],
+            )
+            for exchange, exchange_symbol in exchange_route.items()
+        ]
+    except ValueError as e:
+        print(f"Alert rejected: {e}")
+        raise BadRequestError(str(e))
+
+    results: List[AlertExchangeResult] = [
+        {
+            "exchange": alert_job["exchange"],
+            "ticker": alert_job["tradingview_symbol"],
+            "status": "queued",
+            "job_id": alert_job["job_id"],
+            "error": None,
+            "duration_seconds": None,
+        }
+        for alert_job in alert_jobs
+    ]
+
+    intake_mode: str = get_alert_intake_mode()
+    if intake_mode == alert_intake_mode_sqs:
+        send_errors: Dict[str, str | None] = send_alert_jobs_to_sqs(alert_jobs)
+        for result in results:
+            result["error"] = send_errors[result["job_id"]]
+            if result["error"]:
+                result["status"] = "failed"
+    elif intake_mode == alert_intake_mode_local:
+        for alert_job in alert_jobs:
+            send_alert_job_to_local_queue(alert_job)
+    else:
+        for result, (error, duration_seconds) in zip(
+            results,
+            alert_batch_executor.map(execute_alert_job_timed, alert_jobs),
+        ):
+            result["status"] = "failed" if error else "executed"
+            result["error"] = error
+            result["duration_seconds"] = duration_seconds
+
+    return results
@@ -0,0 +1,351 @@
+import json
+import time
+from decimal import Decimal
+from threading import Lock
+from unittest.mock import MagicMock
+
+import pytest
+from chalice import BadRequestError
+from chalicelib.src.alerts.alerts_utils import (
+    alert_queue_urls,
+    create_alert_job,
+    execute_alert_job,
+    local_alert_queues,
+    submit_alert,
+    submit_alert_batch,
+    submit_alert_cross_exchange,
+    submit_alert_fanout,
+)
+
+module = "chalicelib.src.alerts.alerts_utils"
+
+
+def test_create_alert_job_validates_message():
+    alert_job = create_alert_job("bybit", {"ticker": "BTCUSDT"}, False)
+
+    assert alert_job["tradingview_symbol"] == "BTCUSDT"
+    assert alert_job["buy_alert"] is False
+    assert json.loads(json.dumps(alert_job)) == alert_job
+
+    with pytest.raises(ValueError):
+        create_alert_job("bybit", {"close": "1.0"})
+    with pytest.raises(ValueError):
+        create_alert_job("unknown", {"ticker": "BTCUSDT"})
+    with pytest.raises(BadRequestError):
+        submit_alert("bybit", None)
+
+
+def test_execute_alert_job_passes_exchange_parameters(mocker):
+    mock_module = MagicMock()
+    mock_import_module = mocker.patch(
+        f"{module}.import_module", return_value=mock_module
+    )
+
+    opening_order = execute_alert_job(
+        create_alert_job(
+            "kucoin",
+            {"ticker": "ETHUSDT"},
+            calculate_tax=False,
+            capital_to_deploy=0.98,
+            account="sub_account_1",
+        )
+    )
+
+    mock_import_module.assert_called_once_with(
+        "chalicelib.src.exchanges.kucoin.kucoin_utils"
+    )
+    mock_module.submit_pair_trade_order.assert_called_once_with(
+        tradingview_symbol="ETHUSDT",
+        calculate_tax=False,
+        buy_alert=True,
+        capital_to_deploy=Decimal("0.98"),
+        account="sub_account_1",
+    )
+    assert opening_order is mock_module.submit_pair_trade_order.return_value
+
+
+def test_submit_alert_sync_mode(mocker, monkeypatch):
+    monkeypatch.delenv("ALERT_INTAKE_MODE", raising=False)
+    mock_execute = mocker.patch(f"{module}.execute_alert_job")
+
+    alert_job = submit_alert("alpaca", {"ticker": "QQQ"})
+
+    mock_execute.assert_called_once_with(alert_job)
+
+
+def test_submit_alert_sqs_mode_groups_messages_per_pair(mocker, monkeypatch):
+    monkeypatch.setenv("ALERT_INTAKE_MODE", "sqs")
+    alert_queue_urls.clear()
+    mock_sqs_client = MagicMock()
+    mock_sqs_client.get_queue_url.return_value = {"QueueUrl": "queue-url"}
+    mock_sqs_client.send_message.return_value = {"MessageId": "1"}
+    mocker.patch(
+        f"{module}.get_alert_sqs_client", return_value=mock_sqs_client
+    )
+    mock_execute = mocker.patch(f"{module}.execute_alert_job")
+
+    alert_job = submit_alert("alpaca", {"ticker": "QQQ"}, buy_alert=False)
+    submit_alert("alpaca", {"ticker": "QQQ"})
+
+    mock_execute.assert_not_called()
+    mock_sqs_client.get_queue_url.assert_called_once_with(
+        QueueName="orders-alpaca-alerts.fifo"
+    )
+    message = mock_sqs_client.send_message.call_args_list[0].kwargs
+    assert message["QueueUrl"] == "queue-url"
+    assert message["MessageGroupId"] == "alpaca#default#QQQ"
+    assert message["MessageDeduplicationId"] == alert_job["job_id"]
+    assert json.loads(message["MessageBody"]) == alert_job
+    alert_queue_urls.clear()
+
+
+def test_submit_alert_local_mode_orders_jobs_per_pair(mocker, monkeypatch):
+    monkeypatch.setenv("ALERT_INTAKE_MODE", "local")
+    executed_jobs = []
+    executed_jobs_lock = Lock()
+
+    def slow_execute(alert_job):
+        time.sleep(0.05)
+        with executed_jobs_lock:
+            executed_jobs.append(alert_job)
+
+    mocker.patch(f"{module}.execute_alert_job", side_effect=slow_execute)
+
+    start_time = time.monotonic()
+    first_job = submit_alert("bybit", {"ticker": "BTCUSDT"})
+    second_job = submit_alert("bybit", {"ticker": "BTCUSDT"}, False)
+    other_pair_job = submit_alert("bybit", {"ticker": "ETHUSDT"})
+    intake_seconds = time.monotonic() - start_time
+
+    while local_alert_queues and time.monotonic() - start_time < 2:
+        time.sleep(0.01)
+
+    # The webhook returns before the jobs run
+    assert intake_seconds < 0.05
+    assert len(executed_jobs) == 3
+    btc_jobs = [job for job in executed_jobs if job is not other_pair_job]
+    assert btc_jobs == [first_job, second_job]
+    # Different pairs run in parallel
+    assert executed_jobs.index(other_pair_job) < 2
+
+
+def test_submit_alert_batch_deduplicates_and_runs_pairs_concurrently(
+    mocker, monkeypatch
+):
+    monkeypatch.delenv("ALERT_INTAKE_MODE", raising=False)
+
+    def slow_execute(alert_job):
+        time.sleep(0.2)
+        if alert_job["tradingview_symbol"] == "ETHUSDT":
+            raise ValueError("Insufficient funds")
+        # The exchanges return None or an error when no order is placed
+        if alert_job["tradingview_symbol"] == "XRPUSDT":
+            return "Order quantity below minimum"
+        if alert_job["tradingview_symbol"] == "ADAUSDT":
+            return None
+        return {"orderId": "1"}
+
+    mock_execute = mocker.patch(
+        f"{module}.execute_alert_job", side_effect=slow_execute
+    )
+
+    start_time = time.monotonic()
+    results = submit_alert_batch(
+        [
+            {"exchange": "alpaca", "ticker": "QQQ", "side": "buy"},
+            {"exchange": "bybit", "ticker": "BTCUSDT", "side": "buy"},
+            {"exchange": "alpaca", "ticker": "QQQ", "side": "sell"},
+            {"exchange": "bybit", "ticker": "ETHUSDT", "side": "sell"},
+            {"exchange": "bybit", "ticker": "SOLUSDT", "side": "hold"},
+            "not an alert",
+            {"exchange": "bybit", "ticker": "XRPUSDT", "side": "buy"},
+            {"exchange": "kucoin", "ticker": "ADAUSDT", "side": "buy"},
+        ]
+    )
+
+    assert [result["status"] for result in results] == [
+        "duplicate",
+        "executed",
+        "executed",
+        "failed",
+        "rejected",
+        "rejected",
+        "failed",
+        "failed",
+    ]
+    assert results[3]["error"] == "Insufficient funds"
+    assert results[6]["error"] == "Order quantity below minimum"
+    assert results[7]["error"] == "Opening order not placed"
+    assert mock_execute.call_count == 5
+    # The last alert of a pair is the one traded
+    executed_jobs = [call.args[0] for call in mock_execute.call_args_list]
+    assert [
+        job["buy_alert"]
+        for job in executed_jobs
+        if job["tradingview_symbol"] == "QQQ"
+    ] == [False]
+    assert time.monotonic() - start_time < 0.5
+
+    with pytest.raises(BadRequestError):
+        submit_alert_batch({"exchange": "alpaca"})
+
+
+def test_submit_alert_batch_sqs_mode(mocker, monkeypatch):
+    monkeypatch.setenv("ALERT_INTAKE_MODE", "sqs")
+    alert_queue_urls.clear()
+    mock_sqs_client = MagicMock()
+    mock_sqs_client.get_queue_url.return_value = {"QueueUrl": "queue-url"}
+    mock_sqs_client.send_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "Code": "InternalError"}],
+    }
+    mocker.patch(
+        f"{module}.get_alert_sqs_client", return_value=mock_sqs_client
+    )
+
+    results = submit_alert_batch(
+        [
+            {"exchange": "bybit", "ticker": "BTCUSDT", "side": "buy"},
+            {"exchange": "bybit", "ticker": "ETHUSDT", "side": "buy"},
+        ]
+    )
+
+    # Both alerts of the exchange are sent in one request
+    mock_sqs_client.send_message_batch.assert_called_once()
+    assert [result["status"] for result in results] == ["queued", "failed"]
+    assert results[1]["error"] == "InternalError"
+    alert_queue_urls.clear()
+
+
+def test_submit_alert_fanout_trades_accounts_concurrently(mocker, monkeypatch):
+    monkeypatch.delenv("ALERT_INTAKE_MODE", raising=False)
+    mock_load_metadata = mocker.patch(f"{module}.load_alert_metadata")
+
+    def slow_execute(alert_job):
+        time.sleep(0.2)
+        if alert_job["account"] == "sub_account_2":
+            raise ValueError("Insufficient funds")
+        if alert_job["account"] == "sub_account_1":
+            return None
+        return {"orderId": "1"}
+
+    mock_execute = mocker.patch(
+        f"{module}.execute_alert_job", side_effect=slow_execute
+    )
+
+    start_time = time.monotonic()
+    results = submit_alert_fanout(
+        {
+            "exchange": "kucoin",
+            "ticker": "BTCUSDT",
+            "side": "sell",
+            "accounts": ["main", "sub_account_1", "main", "sub_account_2"],
+        }
+    )
+
+    assert time.monotonic() - start_time < 0.5
+    # Metadata is loaded once for every account
+    mock_load_metadata.assert_called_once_with("kucoin", "main")
+    assert mock_execute.call_count == 3
+    assert [result["account"] for result in results] == [
+        "main",
+        "sub_account_1",
+        "sub_account_2",
+    ]
+    assert [result["status"] for result in results] == [
+        "executed",
+        "failed",
+        "failed",
+    ]
+    # An account where no order was placed is not reported as executed
+    assert results[1]["error"] == "Opening order not placed"
+    assert results[2]["error"] == "Insufficient funds"
+    assert all(result["duration_seconds"] >= 0.2 for result in results)
+    assert all(
+        call.args[0]["buy_alert"] is False
+        for call in mock_execute.call_args_list
+    )
+
+
+def test_submit_alert_fanout_rejects_invalid_accounts(mocker):
+    mock_execute = mocker.patch(f"{module}.execute_alert_job")
+    alert = {"exchange": "bybit", "ticker": "BTCUSDT", "side": "buy"}
+
+    with pytest.raises(BadRequestError):
+        submit_alert_fanout(alert)
+    with pytest.raises(BadRequestError):
+        submit_alert_fanout({**alert, "accounts": ["main", 1]})
+    with pytest.raises(BadRequestError):
+        submit_alert_fanout(
+            {**alert, "accounts": [f"sub{i}" for i in range(11)]}
+        )
+    # Accounts must be accounts of the exchange
+    with pytest.raises(BadRequestError, match="Unknown bybit accounts: main"):
+        submit_alert_fanout({**alert, "accounts": ["live", "main"]})
+    with pytest.raises(BadRequestError, match="Unknown exchange"):
+        submit_alert_fanout(
+            {**alert, "exchange": "binance", "accounts": ["live"]}
+        )
+    mock_execute.assert_not_called()
+
+
+def test_submit_alert_cross_exchange_isolates_failures(mocker, monkeypatch):
+    monkeypatch.delenv("ALERT_INTAKE_MODE", raising=False)
+    mocker.patch.dict(
+        f"{module}.alert_exchange_routes",
+        {"QQQ": {"alpaca": "QQQ", "bybit": "BTCUSDT"}},
+    )
+
+    def slow_execute(alert_job):
+        time.sleep(0.2)
+        if alert_job["exchange"] == "alpaca":
+            raise ValueError("Market closed")
+        return {"orderId": "1"}
+
+    mock_execute = mocker.patch(
+        f"{module}.execute_alert_job", side_effect=slow_execute
+    )
+
+    start_time = time.monotonic()
+    results = submit_alert_cross_exchange({"ticker": "QQQ", "side": "buy"})
+
+    assert time.monotonic() - start_time < 0.35
+    assert mock_execute.call_count == 2
+    assert [(result["exchange"], result["ticker"]) for result in results] == [
+        ("alpaca", "QQQ"),
+        ("bybit", "BTCUSDT"),
+    ]
+    assert [result["status"] for result in results] == ["failed", "executed"]
+    assert results[0]["error"] == "Market closed"
+    assert all(result["duration_seconds"] >= 0.2 for result in results)
+
+    with pytest.raises(BadRequestError):
+        submit_alert_cross_exchange({"ticker": "SPY", "side": "buy"})
+
+
+def test_submit_alert_cross_exchange_reports_orders_not_placed(
+    mocker, monkeypatch
+):
+    monkeypatch.delenv("ALERT_INTAKE_MODE", raising=False)
+    mocker.patch.dict(
+        f"{module}.alert_exchange_routes",
+        {"QQQ": {"alpaca": "QQQ", "bybit": "BTCUSDT", "kucoin": "BTCUSDT"}},
+    )
+    # The exchanges print order errors and return None or the error
+    opening_orders = {
+        "alpaca": None,
+        "bybit": "Insufficient balance",
+        "kucoin": {"orderId": "1"},
+    }
+    mocker.patch(
+        f"{module}.execute_alert_job",
+        side_effect=lambda alert_job: opening_orders[alert_job["exchange"]],
+    )
+
+    results = submit_alert_cross_exchange({"ticker": "QQQ", "side": "buy"})
+
+    assert [(result["status"], result["error"]) for result in results] == [
+        ("failed", "Opening order not placed"),
+        ("failed", "Insufficient balance"),
+        ("executed", None),
+    ]
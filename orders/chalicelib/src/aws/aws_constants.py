@@ -3,6 +3,44 @@ class dynamodb_table_names:
         self.ptos_model_alerts = "ptos_model_alerts"
         self.ptos_signal_alerts = "ptos_signal_alerts"
         self.alpaca_markets_profits = "alpaca_markets_profits"
+        self.position_state = "position_state"
+        self.pending_tax_tasks = "pending_tax_tasks"
 
 
 dynamodb_table_names_instance = dynamodb_table_names()
+
+# Running totals are kept in aggregate items next to the ledger rows, under
+# this sort key. The running total across all assets uses the ALL partition
+dynamodb_running_total_sort_key: str = "RUNNING_TOTAL"
+dynamodb_running_total_all_assets: str = "ALL"
+
+# Ledger rows are spread over shards of the DateIndex GSI instead of a single
+# DateKey, so writes and reads do not land on one partition. Rows written
+# before sharding remain in the legacy ALL partition
+dynamodb_date_index_name: str = "DateIndex"
+dynamodb_date_index_shard_count: int = 10
+dynamodb_date_index_legacy_key: str = "ALL"
+
+# Botocore settings of the shared DynamoDB resource. The pool covers the
+# concurrent DateIndex shard queries, and the timeouts fail fast enough to
+# retry within a Lambda invocation
+dynamodb_max_pool_connections: int = 16
+dynamodb_connect_timeout_seconds: int = 2
+dynamodb_read_timeout_seconds: int = 5
+dynamodb_max_retry_attempts: int = 3
+
+# Every save updates the running total of all assets, so saves made at the
+# same time can cancel each other's transaction. botocore does not retry a
+# cancelled transaction, so it is retried with a jittered, growing backoff
+dynamodb_transaction_conflict_max_attempts: int = 5
+dynamodb_transaction_conflict_backoff_seconds: float = 0.05
+
+# Position state items record the leg held per exchange, account and
+# TradingView symbol. State older than this is reconciled against the order
+# history of the exchange before it is trusted again
+dynamodb_position_state_max_age_seconds: int = 60 * 60 * 24
+
+# Tax tasks are saved as pending items before the opening leg is submitted,
+# and deleted once the tax is saved. Pending items older than this were not
+# completed by the alert or the tax queue, and are run again
+dynamodb_pending_tax_task_max_age_seconds: int = 60 * 15
@@ -6,5 +6,25 @@ class AWSDynamoDbItem(TypedDict):
     Asset: str
     TransactionDate: str
     Profit: Decimal
-    RunningTotal: Decimal
     DateKey: str
+
+
+class AWSDynamoDbRunningTotalKey(TypedDict):
+    Asset: str
+    TransactionDate: str
+
+
+class AWSDynamoDbPositionState(TypedDict):
+    PositionKey: str
+    Exchange: str
+    Account: str
+    TradingViewSymbol: str
+    HeldSymbol: str
+    UpdatedAt: Decimal
+
+
+class AWSDynamoDbPendingTaxTask(TypedDict):
+    Exchange: str
+    TaskKey: str
+    Task: str
+    CreatedAt: Decimal
@@ -1,20 +1,293 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import ROUND_DOWN, Decimal
-from typing import Dict
+from threading import Lock
+from typing import Any, Dict, List, Set, Tuple
+from zlib import crc32
 
 import boto3
-from boto3.dynamodb.conditions import Key
-from chalicelib.src.aws.aws_types import AWSDynamoDbItem
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from chalicelib.src.aws.aws_constants import (
+    dynamodb_connect_timeout_seconds,
+    dynamodb_date_index_legacy_key,
+    dynamodb_date_index_name,
+    dynamodb_date_index_shard_count,
+    dynamodb_max_pool_connections,
+    dynamodb_max_retry_attempts,
+    dynamodb_pending_tax_task_max_age_seconds,
+    dynamodb_position_state_max_age_seconds,
+    dynamodb_read_timeout_seconds,
+    dynamodb_running_total_all_assets,
+    dynamodb_running_total_sort_key,
+    dynamodb_table_names_instance,
+    dynamodb_transaction_conflict_backoff_seconds,
+    dynamodb_transaction_conflict_max_attempts,
+)
+from chalicelib.src.aws.aws_types import (
+    AWSDynamoDbItem,
+    AWSDynamoDbPendingTaxTask,
+    AWSDynamoDbPositionState,
+    AWSDynamoDbRunningTotalKey,
+)
+
+# DynamoDB resource and its client, created on first use and kept for the
+# lifetime of the Lambda container
+dynamodb_resource: Any = None
+dynamodb_client: Any = None
+dynamodb_resource_lock: Lock = Lock()
+
+# Running total aggregate items known to exist, keyed by table name and asset.
+# Saves to them do not need the legacy running total to seed the aggregate
+dynamodb_running_totals_seeded: Set[Tuple[str, str]] = set()
+dynamodb_running_totals_lock: Lock = Lock()
+
+
+def get_dynamodb_resource() -> Any:
+    """
+    Retrieves the shared DynamoDB resource, creating it on first use.
+    Building a resource loads the service model and opens a new connection
+    pool, so it is done once per container
+
+    Returns:
+    - A boto3 DynamoDb ServiceResource
+    """
+
+    global dynamodb_resource
+
+    with dynamodb_resource_lock:
+        if dynamodb_resource is None:
+            dynamodb_resource = boto3.resource(
+                "dynamodb",
+                config=Config(
+                    max_pool_connections=dynamodb_max_pool_connections,
+                    connect_timeout=dynamodb_connect_timeout_seconds,
+                    read_timeout=dynamodb_read_timeout_seconds,
+                    retries={
+                        "max_attempts": dynamodb_max_retry_attempts,
+                        "mode": "standard",
+                    },
+                ),
+            )
+        return dynamodb_resource
+
+
+def get_dynamodb_client() -> Any:
+    """
+    Retrieves the client of the shared DynamoDB resource. Clients are thread
+    safe, unlike Table resources, so it is shared by the pre-flight, fan-out
+    and tax threads. It takes and returns Python types like a Table
+
+    Returns:
+    - A boto3 DynamoDb client
+    """
+
+    global dynamodb_client
+
+    if dynamodb_client is None:
+        client: Any = get_dynamodb_resource().meta.client
+        with dynamodb_resource_lock:
+            if dynamodb_client is None:
+                dynamodb_client = client
+    return dynamodb_client
+
+
+def get_dynamodb_table(table_name: str) -> Any:
+    """
+    Creates a Table handle of the shared DynamoDB resource. Table resources
+    are not thread safe, so a handle is not cached or shared across threads,
+    see get_dynamodb_client
+
+    Parameters:
+    - table_name: DynamoDb table name
+
+    Returns:
+    - A boto3 DynamoDb Table
+    """
+
+    return get_dynamodb_resource().Table(table_name)
+
+
+def clear_dynamodb_resource() -> None:
+    """
+    Drops the cached DynamoDB resource, client and the running total
+    aggregate items known to exist
+    """
+
+    global dynamodb_resource, dynamodb_client
+
+    with dynamodb_resource_lock:
+        dynamodb_resource = None
+        dynamodb_client = None
+    with dynamodb_running_totals_lock:
+        dynamodb_running_totals_seeded.clear()
+
+
+def get_running_total_key(asset: str = None) -> AWSDynamoDbRunningTotalKey:
+    """
+    Key of the aggregate item holding a running total
+
+    Parameters:
+    - asset: The name of the asset, or None for the total of all assets
+
+    Returns:
+    - A AWSDynamoDbRunningTotalKey object to pass to DynamoDb
+    """
+
+    return {
+        "Asset": asset or dynamodb_running_total_all_assets,
+        "TransactionDate": dynamodb_running_total_sort_key,
+    }
+
+
+def get_date_key(
+    asset: str,
+    transaction_date: str,
+    shard_count: int = dynamodb_date_index_shard_count,
+) -> str:
+    """
+    DateIndex GSI partition of a ledger row. Rows are spread over the shards
+    by a hash of the asset and transaction date
+
+    Parameters:
+    - asset: The name of the asset
+    - transaction_date: Transaction date of trade
+    - shard_count: Number of DateIndex shards
+
+    Returns:
+    - A string with the DateKey of the row eg. SHARD#3
+    """
+
+    shard: int = crc32(f"{asset}#{transaction_date}".encode()) % shard_count
+    return f"SHARD#{shard}"
+
+
+def get_date_keys(
+    shard_count: int = dynamodb_date_index_shard_count,
+) -> List[str]:
+    """
+    Every DateIndex GSI partition that can hold ledger rows, including the
+    legacy partition of rows written before sharding
+
+    Parameters:
+    - shard_count: Number of DateIndex shards
+
+    Returns:
+    - A list of DateKey values
+    """
+
+    return [f"SHARD#{shard}" for shard in range(shard_count)] + [
+        dynamodb_date_index_legacy_key
+    ]
+
+
+def query_date_index(
+    table_name: str,
+    start_date: str = None,
+    end_date: str = None,
+    limit: int = None,
+    newest_first: bool = True,
+    shard_count: int = dynamodb_date_index_shard_count,
+) -> List[Dict[str, Any]]:
+    """
+    Query ledger rows across all assets from the DateIndex GSI. Every shard
+    is queried concurrently and the results are merged by transaction date
+
+    Parameters:
+    - table_name: DynamoDb table name to read from
+    - start_date: Earliest transaction date to include
+    - end_date: Latest transaction date to include
+    - limit: Maximum number of rows to return, or None for all rows
+    - newest_first: Order rows from the most recent transaction date
+    - shard_count: Number of DateIndex shards
+
+    Returns:
+    - A list of ledger rows ordered by transaction date
+    """
+
+    client: Any = get_dynamodb_client()
+
+    def query_shard(date_key: str) -> List[Dict[str, Any]]:
+        key_condition = Key("DateKey").eq(date_key)
+        if start_date and end_date:
+            key_condition &= Key("TransactionDate").between(
+                start_date, end_date
+            )
+        elif start_date:
+            key_condition &= Key("TransactionDate").gte(start_date)
+        elif end_date:
+            key_condition &= Key("TransactionDate").lte(end_date)
+
+        query_arguments: Dict[str, Any] = {
+            "TableName": table_name,
+            "IndexName": dynamodb_date_index_name,
+            "KeyConditionExpression": key_condition,
+            "ScanIndexForward": not newest_first,
+        }
+        if limit:
+            query_arguments["Limit"] = limit
+
+        items: List[Dict[str, Any]] = []
+        while True:
+            response = client.query(**query_arguments)
+            items.extend(response["Items"])
+            if "LastEvaluatedKey" not in response:
+                return items
+            if limit and len(items) >= limit:
+                return items
+            query_arguments["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    date_keys: List[str] = get_date_keys(shard_count)
+    with ThreadPoolExecutor(max_workers=len(date_keys)) as executor:
+        shard_items: List[List[Dict[str, Any]]] = list(
+            executor.map(query_shard, date_keys)
+        )
+
+    items: List[Dict[str, Any]] = sorted(
+        (item for items in shard_items for item in items),
+        key=lambda item: item["TransactionDate"],
+        reverse=newest_first,
+    )
+    return items[:limit] if limit else items
+
+
+def get_latest_item_across_assets(
+    table_name: str,
+    shard_count: int = dynamodb_date_index_shard_count,
+) -> Dict[str, Any] | None:
+    """
+    Most recent ledger row across all assets
+
+    Parameters:
+    - table_name: DynamoDb table name to read from
+    - shard_count: Number of DateIndex shards
+
+    Returns:
+    - The most recent ledger row, or None if the table has no rows
+    """
+
+    items: List[Dict[str, Any]] = query_date_index(
+        table_name, limit=1, shard_count=shard_count
+    )
+    return items[0] if items else None
 
 
 def get_last_running_total(
-    table_name: str, asset: str = None, gsi_name: str = "DateIndex"
+    table_name: str,
+    asset: str = None,
+    gsi_name: str = dynamodb_date_index_name,
 ) -> Decimal:
     """
-    Calculate the Capital Gains Tax using the running total in the database
+    Calculate the Capital Gains Tax using the running total in the database.
+    Tables written before running totals were kept in aggregate items have
+    no aggregate item until the first save or seed_running_total_items, so
+    the running total of the last ledger row is read instead
 
     Parameters:
-    - table_name: Forcely enable development mode
-    - asset: The name of the account to trade with
+    - table_name: DynamoDb table name to read from
+    - asset: The name of the asset, or None for the total of all assets
     - gsi_name: Index name for DynamoDb table
 
     Returns:
@@ -22,21 +295,60 @@ def get_last_running_total(
     database for a single asset or an entire trading database
     """
 
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(table_name)
+    client: Any = get_dynamodb_client()
+
+    # Single read of the aggregate item, kept up to date by every save
+    response = client.get_item(
+        TableName=table_name,
+        Key=get_running_total_key(asset),
+        ConsistentRead=True,
+    )
+
+    if "Item" in response:
+        running_total = Decimal(response["Item"].get("RunningTotal", 0))
+        print("Last running total:", running_total)
+        return running_total
+
+    print("Running total item not found, reading the last ledger row")
+    return get_legacy_running_total(table_name, asset, gsi_name)
+
+
+def get_legacy_running_total(
+    table_name: str,
+    asset: str = None,
+    gsi_name: str = dynamodb_date_index_name,
+) -> Decimal:
+    """
+    Running total of the last ledger row, as written before running totals
+    were kept in aggregate items
+
+    Parameters:
+    - table_name: DynamoDb table name to read from
+    - asset: The name of the asset, or None for the total of all assets
+    - gsi_name: Index name for DynamoDb table
 
+    Returns:
+    - A Decimal with the running total of the last ledger row, or 0 if the
+    table has no rows
+    """
+
+    client: Any = get_dynamodb_client()
     if asset:
         # Query for a specific asset
-        response = table.query(
+        response = client.query(
+            TableName=table_name,
             KeyConditionExpression=Key("Asset").eq(asset),
             ScanIndexForward=False,
             Limit=1,
         )
     else:
         # Query the GSI for the last entry across all assets
-        response = table.query(
+        response = client.query(
+            TableName=table_name,
             IndexName=gsi_name,
-            KeyConditionExpression=Key("DateKey").eq("ALL"),
+            KeyConditionExpression=Key("DateKey").eq(
+                dynamodb_date_index_legacy_key
+            ),
             ScanIndexForward=False,
             Limit=1,
         )
@@ -50,67 +362,398 @@ def get_last_running_total(
         return Decimal(0)
 
 
+def get_legacy_asset_profit_total(table_name: str, asset: str) -> Decimal:
+    """
+    Sum of the profits of the ledger rows of an asset
+
+    Parameters:
+    - table_name: DynamoDb table name to read from
+    - asset: The name of the asset
+
+    Returns:
+    - A Decimal with the total profit of the asset
+    """
+
+    client: Any = get_dynamodb_client()
+    query_arguments: Dict[str, Any] = {
+        "TableName": table_name,
+        "KeyConditionExpression": Key("Asset").eq(asset),
+        "ProjectionExpression": "Profit",
+    }
+    total: Decimal = Decimal(0)
+    while True:
+        response = client.query(**query_arguments)
+        for item in response["Items"]:
+            total += Decimal(item.get("Profit", 0))
+        if "LastEvaluatedKey" not in response:
+            return total
+        query_arguments["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def get_running_total_seed(
+    table_name: str,
+    asset: str = None,
+    gsi_name: str = dynamodb_date_index_name,
+) -> Decimal:
+    """
+    Value an aggregate item starts from when a save creates it. An aggregate
+    missing from a table written before aggregates existed starts from the
+    legacy running total, so the total of the old ledger rows is not lost.
+    Aggregates known to exist are not read again
+
+    Parameters:
+    - table_name: DynamoDb table name to save to
+    - asset: The name of the asset, or None for the total of all assets
+    - gsi_name: Index name for DynamoDb table
+
+    Returns:
+    - A Decimal with the legacy running total, or 0 if the aggregate exists
+    """
+
+    seeded_key: Tuple[str, str] = (
+        table_name,
+        asset or dynamodb_running_total_all_assets,
+    )
+    if seeded_key in dynamodb_running_totals_seeded:
+        return Decimal(0)
+
+    response = get_dynamodb_client().get_item(
+        TableName=table_name,
+        Key=get_running_total_key(asset),
+        ConsistentRead=True,
+    )
+    if "Item" not in response:
+        # Legacy rows hold the running total of all assets, so the total of
+        # an asset is the sum of its profits, like seed_running_total_items
+        if asset:
+            return get_legacy_asset_profit_total(table_name, asset)
+        return get_legacy_running_total(table_name, gsi_name=gsi_name)
+
+    with dynamodb_running_totals_lock:
+        dynamodb_running_totals_seeded.add(seeded_key)
+    return Decimal(0)
+
+
 def save_CGT_amount_to_dynamoDB(
     asset: str,
     transaction_date: str,
     profit: float,
     table_name: str,
-    gsi_name: str = "DateIndex",
 ) -> Dict:
     """
-    Add new item to DynamoDb database
+    Add new item to DynamoDb database. The ledger row and the running totals
+    of the asset and of all assets are written in one transaction, and the
+    running totals are incremented atomically so concurrent saves cannot
+    overwrite each other. A missing running total is created from the
+    legacy running total of the ledger rows, see get_running_total_seed.
+    Transactions cancelled by a concurrent save are retried
 
     Parameters:
     - asset: The name of the asset
     - transaction_date: Transaction date of trade
     - profit: Profit made from closing trade
     - table_name: DynamoDb table name to save to
-    - gsi_name: Index column of DynamoDb database
 
     Returns:
-    - A Decimal which is the running total of the CGT amount stored in the
-    database for a single asset or an entire trading database
+    - A AWSDynamoDbItem with the ledger row saved to the database
     """
 
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(table_name)
-
-    # Fetch the last entry across all assets using the GSI
-    response = table.query(
-        IndexName=gsi_name,
-        KeyConditionExpression=Key("DateKey").eq("ALL"),
-        ScanIndexForward=False,
-        Limit=1,
-    )
-
-    # Calculate the new running total
-    if response["Items"]:
-        last_item = response["Items"][0]
-        running_total = Decimal(last_item.get("RunningTotal", 0)) + Decimal(
-            profit
-        )
-    else:
-        running_total = Decimal(profit)
-
     # Round to two decimal places
     rounded_profit = Decimal(profit).quantize(
         Decimal("0.01"), rounding=ROUND_DOWN
     )
-    rounded_running_total = running_total.quantize(
-        Decimal("0.01"), rounding=ROUND_DOWN
-    )
 
-    # Prepare the new item with DateKey for the GSI
+    # Prepare the new item with a sharded DateKey for the GSI
     new_item: AWSDynamoDbItem = {
         "Asset": asset,
         "TransactionDate": transaction_date,
         "Profit": rounded_profit,
-        "RunningTotal": rounded_running_total,
-        "DateKey": "ALL",  # Constant value for all items for the GSI
+        "DateKey": get_date_key(asset, transaction_date),
     }
 
-    # Add the new item to the table
-    table.put_item(Item=new_item)
+    transact_items: List[Dict[str, Any]] = [
+        {
+            # A retried save of the same trade must not add the profit twice
+            "Put": {
+                "TableName": table_name,
+                "Item": new_item,
+                "ConditionExpression": "attribute_not_exists(Asset)",
+            }
+        },
+        *(
+            {
+                "Update": {
+                    "TableName": table_name,
+                    "Key": running_total_key,
+                    "UpdateExpression": (
+                        "SET RunningTotal = "
+                        "if_not_exists(RunningTotal, :seed) + :profit"
+                    ),
+                    "ExpressionAttributeValues": {
+                        ":profit": rounded_profit,
+                        ":seed": get_running_total_seed(
+                            table_name, running_total_asset
+                        ),
+                    },
+                }
+            }
+            for running_total_key, running_total_asset in (
+                (get_running_total_key(), None),
+                (get_running_total_key(asset), asset),
+            )
+        ),
+    ]
+
+    for attempt in range(dynamodb_transaction_conflict_max_attempts):
+        try:
+            get_dynamodb_client().transact_write_items(
+                TransactItems=transact_items
+            )
+            break
+        except ClientError as e:
+            cancellation_codes: List[str] = [
+                reason.get("Code")
+                for reason in e.response.get("CancellationReasons", [])
+            ]
+            if "ConditionalCheckFailed" in cancellation_codes:
+                print(
+                    "Item already saved, running totals not changed", new_item
+                )
+                return new_item
+
+            # A save of another trade updated a running total at the same
+            # time. Nothing was written, so the transaction is sent again
+            if (
+                "TransactionConflict" not in cancellation_codes
+                or attempt + 1 == dynamodb_transaction_conflict_max_attempts
+            ):
+                raise
+            backoff_seconds: float = (
+                dynamodb_transaction_conflict_backoff_seconds * 2**attempt
+            )
+            print(f"Transaction conflict, retrying within {backoff_seconds}s")
+            time.sleep(random.uniform(0, backoff_seconds))
+
+    # Both aggregates exist after the first save to them
+    with dynamodb_running_totals_lock:
+        dynamodb_running_totals_seeded.update(
+            {
+                (table_name, dynamodb_running_total_all_assets),
+                (table_name, asset),
+            }
+        )
 
     print("New item added to DynamoDB table", new_item)
     return new_item
+
+
+def get_position_state_key(
+    exchange: str, account: str, tradingview_symbol: str
+) -> str:
+    """
+    Key of the position state item of a pair
+
+    Parameters:
+    - exchange: Name of the exchange eg. alpaca
+    - account: Account trading the pair
+    - tradingview_symbol: Tradingview symbol of the pair
+
+    Returns:
+    - A string with the PositionKey eg. alpaca#live#QQQ
+    """
+
+    return f"{exchange}#{account}#{tradingview_symbol}"
+
+
+def get_position_state(
+    exchange: str,
+    account: str,
+    tradingview_symbol: str,
+    max_age_seconds: int = dynamodb_position_state_max_age_seconds,
+    table_name: str = dynamodb_table_names_instance.position_state,
+) -> AWSDynamoDbPositionState | None:
+    """
+    Retrieves the leg currently held for a pair, so an alert can act without
+    reading the order history of the exchange
+
+    Parameters:
+    - exchange: Name of the exchange eg. alpaca
+    - account: Account trading the pair
+    - tradingview_symbol: Tradingview symbol of the pair
+    - max_age_seconds: Age after which the state is no longer trusted
+    - table_name: DynamoDb table name to read from
+
+    Returns:
+    - A AWSDynamoDbPositionState object, or None if the state is missing,
+    stale or could not be read
+    """
+
+    try:
+        response = get_dynamodb_client().get_item(
+            TableName=table_name,
+            Key={
+                "PositionKey": get_position_state_key(
+                    exchange, account, tradingview_symbol
+                )
+            },
+            ConsistentRead=True,
+        )
+    except ClientError as e:
+        print(f"Error reading position state: {e}")
+        return None
+
+    position_state: AWSDynamoDbPositionState | None = response.get("Item")
+    if position_state is None:
+        return None
+
+    if time.time() - float(position_state["UpdatedAt"]) > max_age_seconds:
+        print("Position state is stale", position_state)
+        return None
+
+    print("Position state found", position_state)
+    return position_state
+
+
+def save_position_state(
+    exchange: str,
+    account: str,
+    tradingview_symbol: str,
+    held_symbol: str,
+    table_name: str = dynamodb_table_names_instance.position_state,
+) -> AWSDynamoDbPositionState | None:
+    """
+    Record the leg held for a pair once an order is confirmed. A failed save
+    only means the next alert reads the order history again, so the error
+    is not raised
+
+    Parameters:
+    - exchange: Name of the exchange eg. alpaca
+    - account: Account trading the pair
+    - tradingview_symbol: Tradingview symbol of the pair
+    - held_symbol: Exchange symbol of the leg held
+    - table_name: DynamoDb table name to save to
+
+    Returns:
+    - The AWSDynamoDbPositionState saved, or None if the save failed
+    """
+
+    position_state: AWSDynamoDbPositionState = {
+        "PositionKey": get_position_state_key(
+            exchange, account, tradingview_symbol
+        ),
+        "Exchange": exchange,
+        "Account": account,
+        "TradingViewSymbol": tradingview_symbol,
+        "HeldSymbol": held_symbol,
+        "UpdatedAt": Decimal(int(time.time())),
+    }
+
+    try:
+        get_dynamodb_client().put_item(
+            TableName=table_name, Item=position_state
+        )
+    except ClientError as e:
+        print(f"Error saving position state: {e}")
+        return None
+
+    print("Position state saved", position_state)
+    return position_state
+
+
+def save_pending_tax_task(
+    exchange: str,
+    task_key: str,
+    task: str,
+    table_name: str = dynamodb_table_names_instance.pending_tax_tasks,
+) -> AWSDynamoDbPendingTaxTask:
+    """
+    Record a tax task before the orders it belongs to are placed, so a task
+    that is never saved can be found and run again. Errors are raised
+
+    Parameters:
+    - exchange: Name of the exchange eg. alpaca
+    - task_key: Key of the task, unique per exchange
+    - task: Serialised task, read back by the exchange that saved it
+    - table_name: DynamoDb table name to save to
+
+    Returns:
+    - The AWSDynamoDbPendingTaxTask saved
+    """
+
+    pending_tax_task: AWSDynamoDbPendingTaxTask = {
+        "Exchange": exchange,
+        "TaskKey": task_key,
+        "Task": task,
+        "CreatedAt": Decimal(int(time.time())),
+    }
+    get_dynamodb_client().put_item(TableName=table_name, Item=pending_tax_task)
+    return pending_tax_task
+
+
+def delete_pending_tax_task(
+    exchange: str,
+    task_key: str,
+    table_name: str = dynamodb_table_names_instance.pending_tax_tasks,
+) -> bool:
+    """
+    Mark a tax task done once its tax is saved. A task left pending is run
+    again, and saving a task twice keeps one ledger row, so the error is not
+    raised
+
+    Parameters:
+    - exchange: Name of the exchange eg. alpaca
+    - task_key: Key of the task
+    - table_name: DynamoDb table name to delete from
+
+    Returns:
+    - A Boolean, true if the pending task was deleted
+    """
+
+    try:
+        get_dynamodb_client().delete_item(
+            TableName=table_name,
+            Key={"Exchange": exchange, "TaskKey": task_key},
+        )
+    except ClientError as e:
+        print(f"Error deleting pending tax task {task_key}: {e}")
+        return False
+    return True
+
+
+def get_stale_pending_tax_tasks(
+    exchange: str,
+    max_age_seconds: int = dynamodb_pending_tax_task_max_age_seconds,
+    table_name: str = dynamodb_table_names_instance.pending_tax_tasks,
+) -> List[AWSDynamoDbPendingTaxTask]:
+    """
+    Retrieves the tax tasks of an exchange that have been pending for longer
+    than an alert or the tax queue takes to complete them
+
+    Parameters:
+    - exchange: Name of the exchange eg. alpaca
+    - max_age_seconds: Age after which a pending task is stale
+    - table_name: DynamoDb table name to read from
+
+    Returns:
+    - A list of AWSDynamoDbPendingTaxTask objects, empty if they could not be
+    read
+    """
+
+    query_arguments: Dict[str, Any] = {
+        "TableName": table_name,
+        "KeyConditionExpression": Key("Exchange").eq(exchange),
+        "FilterExpression": Attr("CreatedAt").lt(
+            Decimal(int(time.time()) - max_age_seconds)
+        ),
+    }
+    pending_tax_tasks: List[AWSDynamoDbPendingTaxTask] = []
+    try:
+        while True:
+            response = get_dynamodb_client().query(**query_arguments)
+            pending_tax_tasks.extend(response["Items"])
+            if "LastEvaluatedKey" not in response:
+                return pending_tax_tasks
+            query_arguments["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    except ClientError as e:
+        print(f"Error reading pending tax tasks: {e}")
+        return []
@@ -1,9 +1,17 @@
 import datetime
+from decimal import Decimal
 
-import boto3
 from boto3.dynamodb.conditions import Attr, Key
-
-dynamodb = boto3.resource("dynamodb")
+from chalicelib.src.aws.aws_constants import (
+    dynamodb_date_index_legacy_key,
+    dynamodb_date_index_name,
+    dynamodb_running_total_sort_key,
+)
+from chalicelib.src.aws.aws_utils import (
+    get_dynamodb_resource,
+    get_dynamodb_table,
+    get_running_total_key,
+)
 
 """
 Collection of useful developer functions to create and test DynamoDb
@@ -12,7 +20,7 @@ Collection of useful developer functions to create and test DynamoDb
 
 # Developer function, create DynamoDB instance
 def create_new_dynamodb_instance(table_name: str):
-    dynamodb = boto3.resource("dynamodb")
+    dynamodb = get_dynamodb_resource()
 
     # Create a new DynamoDB table with a Global Secondary Index
     table = dynamodb.create_table(
@@ -39,11 +47,13 @@ def create_new_dynamodb_instance(table_name: str):
             {
                 "AttributeName": "DateKey",
                 "AttributeType": "S",
-            },  # Additional attribute for GSI
+            },  # GSI shard of the row eg. SHARD#3, see get_date_key
         ],
+        # Rows are spread over dynamodb_date_index_shard_count partitions of
+        # the GSI, read back across all assets with query_date_index
         GlobalSecondaryIndexes=[
             {
-                "IndexName": "DateIndex",
+                "IndexName": dynamodb_date_index_name,
                 "KeySchema": [
                     {
                         "AttributeName": "DateKey",
@@ -73,10 +83,130 @@ def create_new_dynamodb_instance(table_name: str):
     return f"DynamoDB table '{table_name}' created"
 
 
-# Get DynamoDB instance by table name
-def get_dynamodb_table(table_name):
-    table = dynamodb.Table(table_name)
-    return table
+# Developer function, create the position state table. One item per
+# exchange, account and TradingView symbol, see save_position_state
+def create_position_state_dynamodb_instance(table_name: str):
+    dynamodb = get_dynamodb_resource()
+
+    table = dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {
+                "AttributeName": "PositionKey",
+                "KeyType": "HASH",
+            },  # Partition key: exchange#account#tradingview_symbol
+        ],
+        AttributeDefinitions=[
+            {
+                "AttributeName": "PositionKey",
+                "AttributeType": "S",
+            },
+        ],
+        ProvisionedThroughput={
+            "ReadCapacityUnits": 5,
+            "WriteCapacityUnits": 5,
+        },
+    )
+
+    # Wait until the table exists.
+    table.meta.client.get_waiter("table_exists").wait(TableName=table_name)
+
+    return f"DynamoDB table '{table_name}' created"
+
+
+# Developer function, create the pending tax tasks table. One partition per
+# exchange, one item per tax task not saved yet, see save_pending_tax_task
+def create_pending_tax_tasks_dynamodb_instance(table_name: str):
+    dynamodb = get_dynamodb_resource()
+
+    table = dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {
+                "AttributeName": "Exchange",
+                "KeyType": "HASH",
+            },  # Partition key: Name of the exchange
+            {
+                "AttributeName": "TaskKey",
+                "KeyType": "RANGE",
+            },  # Sort key: account#symbol#transaction_date
+        ],
+        AttributeDefinitions=[
+            {
+                "AttributeName": "Exchange",
+                "AttributeType": "S",
+            },
+            {
+                "AttributeName": "TaskKey",
+                "AttributeType": "S",
+            },
+        ],
+        ProvisionedThroughput={
+            "ReadCapacityUnits": 5,
+            "WriteCapacityUnits": 5,
+        },
+    )
+
+    # Wait until the table exists.
+    table.meta.client.get_waiter("table_exists").wait(TableName=table_name)
+
+    return f"DynamoDB table '{table_name}' created"
+
+
+# Developer function, create the running total items of a table that was
+# written before running totals were kept in aggregate items. The total of
+# all assets is copied from the latest row of the DateIndex GSI, the total of
+# each asset is the sum of its profits
+def seed_running_total_items(
+    table_name: str, gsi_name: str = dynamodb_date_index_name
+):
+    table = get_dynamodb_table(table_name)
+
+    latest_response = table.query(
+        IndexName=gsi_name,
+        KeyConditionExpression=Key("DateKey").eq(
+            dynamodb_date_index_legacy_key
+        ),
+        ScanIndexForward=False,
+        Limit=1,
+    )
+    running_totals = {
+        None: (
+            Decimal(latest_response["Items"][0].get("RunningTotal", 0))
+            if latest_response["Items"]
+            else Decimal(0)
+        )
+    }
+
+    scan_arguments = {
+        "FilterExpression": Attr("TransactionDate").ne(
+            dynamodb_running_total_sort_key
+        )
+    }
+    while True:
+        response = table.scan(**scan_arguments)
+        for item in response["Items"]:
+            running_totals[item["Asset"]] = running_totals.get(
+                item["Asset"], Decimal(0)
+            ) + Decimal(item.get("Profit", 0))
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_arguments["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    # Existing running total items are never overwritten
+    for asset, running_total in running_totals.items():
+        try:
+            table.put_item(
+                Item={
+                    **get_running_total_key(asset),
+                    "RunningTotal": running_total,
+                },
+                ConditionExpression="attribute_not_exists(Asset)",
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            print("Running total already exists for", asset or "all assets")
+
+    return f"Running totals seeded for {len(running_totals) - 1} assets"
 
 
 # Add concatenated property interval, alert type, and time for querying
@@ -107,8 +237,7 @@ def query_dynamodb_table(
     time_range_hours=36,
     limit=20,
 ):
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(table_name)
+    table = get_dynamodb_table(table_name)
 
     # Calculate the timestamp for the start of the time range (36 hours ago)
     start_timestamp = (
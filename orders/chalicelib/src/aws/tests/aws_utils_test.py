@@ -1,71 +1,116 @@
+import time
 from decimal import ROUND_DOWN, Decimal
 from unittest import TestCase, mock
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 import pytest
+from botocore.exceptions import ClientError
 from chalicelib.src.aws.aws_utils import (
+    clear_dynamodb_resource,
+    delete_pending_tax_task,
+    get_date_key,
+    get_date_keys,
+    get_dynamodb_client,
+    get_dynamodb_table,
     get_last_running_total,
+    get_latest_item_across_assets,
+    get_position_state,
+    get_stale_pending_tax_tasks,
+    query_date_index,
     save_CGT_amount_to_dynamoDB,
+    save_pending_tax_task,
+    save_position_state,
 )
 
 
 class TestGetLastRunningTotal(TestCase):
+    def setUp(self):
+        clear_dynamodb_resource()
+
+    def tearDown(self):
+        clear_dynamodb_resource()
+
     @mock.patch("boto3.resource")
     def test_get_last_running_total_specific_asset(self, mock_boto3_resource):
         # Mock DynamoDB Table and response
-        mock_table = mock.MagicMock()
-        mock_boto3_resource.return_value.Table.return_value = mock_table
-        mock_response = {"Items": [{"Asset": "BTC", "RunningTotal": "100.50"}]}
-        mock_table.query.return_value = mock_response
+        mock_table = mock_boto3_resource.return_value.meta.client
+        mock_response = {"Item": {"Asset": "BTC", "RunningTotal": "100.50"}}
+        mock_table.get_item.return_value = mock_response
         result = get_last_running_total(table_name="Assets", asset="BTC")
-        mock_table.query.assert_called_once()
+        mock_table.get_item.assert_called_once_with(
+            TableName="Assets",
+            Key={"Asset": "BTC", "TransactionDate": "RUNNING_TOTAL"},
+            ConsistentRead=True,
+        )
         self.assertEqual(result, Decimal("100.50"))
 
     @mock.patch("boto3.resource")
     def test_get_last_running_total_all_assets(self, mock_boto3_resource):
-        mock_table = mock.MagicMock()
-        mock_boto3_resource.return_value.Table.return_value = mock_table
-        mock_response = {
-            "Items": [{"DateKey": "ALL", "RunningTotal": "1000.75"}]
-        }
-        mock_table.query.return_value = mock_response
+        mock_table = mock_boto3_resource.return_value.meta.client
+        mock_response = {"Item": {"Asset": "ALL", "RunningTotal": "1000.75"}}
+        mock_table.get_item.return_value = mock_response
         result = get_last_running_total(table_name="Assets")
 
-        mock_table.query.assert_called_once()
+        mock_table.get_item.assert_called_once_with(
+            TableName="Assets",
+            Key={"Asset": "ALL", "TransactionDate": "RUNNING_TOTAL"},
+            ConsistentRead=True,
+        )
+        mock_table.query.assert_not_called()
         self.assertEqual(result, Decimal("1000.75"))
 
     @mock.patch("boto3.resource")
     def test_get_last_running_total_no_items(self, mock_boto3_resource):
-        mock_table = mock.MagicMock()
-        mock_boto3_resource.return_value.Table.return_value = mock_table
-        mock_response = {"Items": []}
-        mock_table.query.return_value = mock_response
+        mock_table = mock_boto3_resource.return_value.meta.client
+        mock_table.get_item.return_value = {}
+        mock_table.query.return_value = {"Items": []}
         result = get_last_running_total(table_name="Assets", asset="BTC")
 
-        mock_table.query.assert_called_once()
+        mock_table.get_item.assert_called_once()
         self.assertEqual(result, Decimal("0"))
 
+    @mock.patch("boto3.resource")
+    def test_get_last_running_total_before_seeding(self, mock_boto3_resource):
+        # Tables written before the aggregate items existed keep the running
+        # total on each ledger row
+        mock_table = mock_boto3_resource.return_value.meta.client
+        mock_table.get_item.return_value = {}
+        mock_table.query.return_value = {
+            "Items": [{"Asset": "BTC", "RunningTotal": "250.25"}]
+        }
+
+        asset_total = get_last_running_total(table_name="Assets", asset="BTC")
+        query_arguments = mock_table.query.call_args.kwargs
+        self.assertNotIn("IndexName", query_arguments)
+        self.assertEqual(query_arguments["Limit"], 1)
+        self.assertFalse(query_arguments["ScanIndexForward"])
+
+        total = get_last_running_total(table_name="Assets")
+        query_arguments = mock_table.query.call_args.kwargs
+        self.assertEqual(query_arguments["IndexName"], "DateIndex")
+        self.assertEqual(
+            query_arguments["KeyConditionExpression"].get_expression()[
+                "values"
+            ][1],
+            "ALL",
+        )
+
+        self.assertEqual(asset_total, Decimal("250.25"))
+        self.assertEqual(total, Decimal("250.25"))
+
 
 @pytest.fixture
 def mock_dynamodb_resource():
+    clear_dynamodb_resource()
     with patch("boto3.resource") as mock_resource:
-        mock_table = MagicMock()
-        mock_resource.return_value.Table.return_value = mock_table
-
-        mock_query_response = {
-            "Items": [
-                {
-                    "Asset": "AAPL",
-                    "TransactionDate": "2024-03-24",
-                    "RunningTotal": "100.00",
-                }
-            ]
+        mock_client = mock_resource.return_value.meta.client
+        mock_client.transact_write_items.return_value = {}
+        mock_client.get_item.return_value = {
+            "Item": {"RunningTotal": Decimal("10")}
         }
 
-        mock_table.query.return_value = mock_query_response
-        mock_table.put_item.return_value = None
-
-        yield mock_table
+        yield mock_client
+    clear_dynamodb_resource()
 
 
 @pytest.fixture
@@ -89,17 +134,291 @@ def test_save_CGT_amount_to_dynamoDB(create_table, mock_dynamodb_resource):
         table_name=table_name,
     )
 
+    rounded_profit = Decimal(profit).quantize(
+        Decimal("0.01"), rounding=ROUND_DOWN
+    )
     expected_item = {
         "Asset": asset,
         "TransactionDate": transaction_date,
-        "Profit": Decimal(profit).quantize(
-            Decimal("0.01"), rounding=ROUND_DOWN
-        ),
-        "RunningTotal": Decimal(300).quantize(
-            Decimal("0.01"), rounding=ROUND_DOWN
-        ),
-        "DateKey": "ALL",
+        "Profit": rounded_profit,
+        "DateKey": get_date_key(asset, transaction_date),
     }
     assert result == expected_item
+    assert result["DateKey"].startswith("SHARD#")
+
+    # Ledger row and both running totals are written in one transaction
+    mock_dynamodb_resource.query.assert_not_called()
+    mock_dynamodb_resource.put_item.assert_not_called()
+    transact_items = (
+        mock_dynamodb_resource.transact_write_items.call_args.kwargs[
+            "TransactItems"
+        ]
+    )
+    assert transact_items[0]["Put"]["Item"] == expected_item
+    assert [item["Update"]["Key"] for item in transact_items[1:]] == [
+        {"Asset": "ALL", "TransactionDate": "RUNNING_TOTAL"},
+        {"Asset": asset, "TransactionDate": "RUNNING_TOTAL"},
+    ]
+    for item in transact_items[1:]:
+        assert item["Update"]["UpdateExpression"] == (
+            "SET RunningTotal = if_not_exists(RunningTotal, :seed) + :profit"
+        )
+        assert item["Update"]["ExpressionAttributeValues"] == {
+            ":profit": rounded_profit,
+            ":seed": Decimal(0),
+        }
+
+    # Aggregates known to exist are not read again
+    save_CGT_amount_to_dynamoDB(
+        asset=asset,
+        transaction_date="2024-03-25",
+        profit=profit,
+        table_name=table_name,
+    )
+    assert mock_dynamodb_resource.get_item.call_count == 2
+
+
+def test_save_CGT_amount_to_dynamoDB_before_seeding(
+    create_table, mock_dynamodb_resource
+):
+    # A table written before the aggregate items existed keeps the running
+    # total on each ledger row
+    mock_dynamodb_resource.get_item.return_value = {}
+    mock_dynamodb_resource.query.side_effect = [
+        {"Items": [{"Asset": "MSFT", "RunningTotal": Decimal("500.00")}]},
+        {
+            "Items": [{"Profit": Decimal("100.00")}],
+            "LastEvaluatedKey": {"Asset": "AAPL"},
+        },
+        {"Items": [{"Profit": Decimal("20.00")}]},
+    ]
+
+    save_CGT_amount_to_dynamoDB(
+        asset="AAPL",
+        transaction_date="2024-03-24",
+        profit=200.00,
+        table_name=create_table,
+    )
+
+    transact_items = (
+        mock_dynamodb_resource.transact_write_items.call_args.kwargs[
+            "TransactItems"
+        ]
+    )
+    # The aggregates are created from the legacy totals, not from 0. The
+    # total of the asset is the sum of its profits
+    assert [
+        item["Update"]["ExpressionAttributeValues"][":seed"]
+        for item in transact_items[1:]
+    ] == [Decimal("500.00"), Decimal("120.00")]
+
+
+def test_save_CGT_amount_to_dynamoDB_already_saved(
+    create_table, mock_dynamodb_resource
+):
+    mock_dynamodb_resource.transact_write_items.side_effect = ClientError(
+        {
+            "Error": {"Code": "TransactionCanceledException"},
+            "CancellationReasons": [
+                {"Code": "ConditionalCheckFailed"},
+                {"Code": "None"},
+                {"Code": "None"},
+            ],
+        },
+        "TransactWriteItems",
+    )
+
+    result = save_CGT_amount_to_dynamoDB(
+        asset="AAPL",
+        transaction_date="2024-03-24",
+        profit=200.00,
+        table_name=create_table,
+    )
+
+    assert result["Profit"] == Decimal("200.00")
+
+
+def test_save_CGT_amount_to_dynamoDB_transaction_conflict(
+    mocker, create_table, mock_dynamodb_resource
+):
+    mock_sleep = mocker.patch("chalicelib.src.aws.aws_utils.time.sleep")
+    transaction_conflict = ClientError(
+        {
+            "Error": {"Code": "TransactionCanceledException"},
+            "CancellationReasons": [
+                {"Code": "None"},
+                {"Code": "TransactionConflict"},
+                {"Code": "None"},
+            ],
+        },
+        "TransactWriteItems",
+    )
+
+    # A save cancelled by a concurrent save of the running totals is retried
+    mock_dynamodb_resource.transact_write_items.side_effect = [
+        transaction_conflict,
+        transaction_conflict,
+        {},
+    ]
+    result = save_CGT_amount_to_dynamoDB(
+        asset="AAPL",
+        transaction_date="2024-03-24",
+        profit=200.00,
+        table_name=create_table,
+    )
+    assert result["Profit"] == Decimal("200.00")
+    assert mock_dynamodb_resource.transact_write_items.call_count == 3
+    assert mock_sleep.call_count == 2
+
+    # Conflicts that do not clear are raised
+    mock_dynamodb_resource.transact_write_items.reset_mock()
+    mock_dynamodb_resource.transact_write_items.side_effect = (
+        transaction_conflict
+    )
+    with pytest.raises(ClientError):
+        save_CGT_amount_to_dynamoDB(
+            asset="AAPL",
+            transaction_date="2024-03-25",
+            profit=200.00,
+            table_name=create_table,
+        )
+    assert mock_dynamodb_resource.transact_write_items.call_count == 5
 
-    mock_dynamodb_resource.put_item.assert_called_once_with(Item=expected_item)
+    # Other errors are not retried
+    mock_dynamodb_resource.transact_write_items.reset_mock()
+    mock_dynamodb_resource.transact_write_items.side_effect = ClientError(
+        {"Error": {"Code": "ValidationException"}}, "TransactWriteItems"
+    )
+    with pytest.raises(ClientError):
+        save_CGT_amount_to_dynamoDB(
+            asset="AAPL",
+            transaction_date="2024-03-26",
+            profit=200.00,
+            table_name=create_table,
+        )
+    mock_dynamodb_resource.transact_write_items.assert_called_once()
+
+
+def test_get_date_key_spreads_rows_over_shards():
+    date_keys = {
+        get_date_key("AAPL", f"2024-03-{day:02d} 10:00:00", shard_count=4)
+        for day in range(1, 29)
+    }
+
+    assert date_keys == {"SHARD#0", "SHARD#1", "SHARD#2", "SHARD#3"}
+    assert get_date_keys(shard_count=2) == ["SHARD#0", "SHARD#1", "ALL"]
+
+
+def test_query_date_index_merges_shards(mock_dynamodb_resource):
+    shard_items = {
+        "SHARD#0": [{"Asset": "AAPL", "TransactionDate": "2024-03-24"}],
+        "SHARD#1": [{"Asset": "TSLA", "TransactionDate": "2024-03-26"}],
+        "ALL": [{"Asset": "NVDA", "TransactionDate": "2024-03-20"}],
+    }
+
+    def query_shard(**kwargs):
+        # Key("DateKey").eq(date_key) holds the key and its value
+        date_key = kwargs["KeyConditionExpression"].get_expression()["values"][
+            1
+        ]
+        return {"Items": shard_items[date_key]}
+
+    mock_dynamodb_resource.query.side_effect = query_shard
+
+    items = query_date_index("TestTable", shard_count=2)
+    latest_item = get_latest_item_across_assets("TestTable", shard_count=2)
+
+    assert [item["Asset"] for item in items] == ["TSLA", "AAPL", "NVDA"]
+    assert latest_item["Asset"] == "TSLA"
+
+
+@patch("boto3.resource")
+def test_get_dynamodb_client_reuses_resource(mock_boto3_resource):
+    clear_dynamodb_resource()
+
+    client = get_dynamodb_client()
+    get_dynamodb_client()
+    get_dynamodb_table("TestTable")
+    get_dynamodb_table("TestTable")
+
+    # One resource with the Lambda tuned config, shared through its thread
+    # safe client. Table handles are not cached, they are not thread safe
+    mock_boto3_resource.assert_called_once()
+    config = mock_boto3_resource.call_args.kwargs["config"]
+    assert config.max_pool_connections == 16
+    assert config.retries == {"max_attempts": 3, "mode": "standard"}
+    assert client is mock_boto3_resource.return_value.meta.client
+    assert mock_boto3_resource.return_value.Table.call_count == 2
+    clear_dynamodb_resource()
+
+
+def test_save_and_get_position_state(mock_dynamodb_resource):
+    saved_state = save_position_state("alpaca", "live", "QQQ", "TQQQ")
+
+    assert saved_state["PositionKey"] == "alpaca#live#QQQ"
+    mock_dynamodb_resource.put_item.assert_called_once_with(
+        TableName="position_state", Item=saved_state
+    )
+
+    mock_dynamodb_resource.get_item.return_value = {"Item": saved_state}
+    position_state = get_position_state("alpaca", "live", "QQQ")
+
+    mock_dynamodb_resource.get_item.assert_called_once_with(
+        TableName="position_state",
+        Key={"PositionKey": "alpaca#live#QQQ"},
+        ConsistentRead=True,
+    )
+    assert position_state["HeldSymbol"] == "TQQQ"
+
+
+def test_get_position_state_missing_or_stale(mock_dynamodb_resource):
+    mock_dynamodb_resource.get_item.return_value = {}
+    assert get_position_state("bybit", "live", "BTCUSDT") is None
+
+    # Stale state is not trusted, so the caller reads the order history
+    mock_dynamodb_resource.get_item.return_value = {
+        "Item": {
+            "PositionKey": "bybit#live#BTCUSDT",
+            "HeldSymbol": "BTCUSDT",
+            "UpdatedAt": Decimal(int(time.time()) - 120),
+        }
+    }
+    assert get_position_state("bybit", "live", "BTCUSDT", 60) is None
+    assert get_position_state("bybit", "live", "BTCUSDT", 600) is not None
+
+    mock_dynamodb_resource.get_item.side_effect = ClientError(
+        {"Error": {"Code": "ResourceNotFoundException"}}, "GetItem"
+    )
+    assert get_position_state("bybit", "live", "BTCUSDT") is None
+
+
+def test_pending_tax_tasks(mock_dynamodb_resource):
+    pending_tax_task = save_pending_tax_task("alpaca", "live#QQQ", "{}")
+    mock_dynamodb_resource.put_item.assert_called_once_with(
+        TableName="pending_tax_tasks", Item=pending_tax_task
+    )
+
+    mock_dynamodb_resource.query.side_effect = [
+        {"Items": [pending_tax_task], "LastEvaluatedKey": {"TaskKey": "1"}},
+        {"Items": [pending_tax_task]},
+    ]
+    assert get_stale_pending_tax_tasks("alpaca", max_age_seconds=60) == [
+        pending_tax_task,
+        pending_tax_task,
+    ]
+
+    assert delete_pending_tax_task("alpaca", "live#QQQ")
+    mock_dynamodb_resource.delete_item.assert_called_once_with(
+        TableName="pending_tax_tasks",
+        Key={"Exchange": "alpaca", "TaskKey": "live#QQQ"},
+    )
+
+    # A failed read or delete leaves the task pending for a later alert
+    mock_dynamodb_resource.query.side_effect = ClientError(
+        {"Error": {"Code": "ResourceNotFoundException"}}, "Query"
+    )
+    mock_dynamodb_resource.delete_item.side_effect = ClientError(
+        {"Error": {"Code": "ResourceNotFoundException"}}, "DeleteItem"
+    )
+    assert get_stale_pending_tax_tasks("alpaca") == []
+    assert not delete_pending_tax_task("alpaca", "live#QQQ")
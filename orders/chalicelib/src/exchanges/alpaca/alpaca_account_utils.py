@@ -1,4 +1,5 @@
 from decimal import Decimal
+from threading import Lock
 from typing import Literal
 
 from alpaca.common import RawData
@@ -18,6 +19,12 @@ from chalicelib.src.exchanges.alpaca.alpaca_types import (
     AlpacaGetAccountBalance,
 )
 
+# Warm TradingClient instances keyed by account name and paper flag. Each
+# client holds its own keep-alive connection pool and survives across warm
+# Lambda invocations
+alpaca_trading_clients: dict[tuple[str, bool], TradingClient] = {}
+alpaca_trading_clients_lock: Lock = Lock()
+
 
 def alpaca_get_credentials(
     account_name: str = alpaca_trading_account_name_live,
@@ -53,6 +60,60 @@ def alpaca_get_credentials(
         )
 
 
+def alpaca_get_trading_client(
+    account_name: str = alpaca_trading_account_name_live,
+    development_mode_toggle: bool = development_mode,
+) -> TradingClient | None:
+    """
+    Retrieves a warm TradingClient for an account, creating it on first use.
+    Reusing the client avoids a new HTTP session and TLS handshake for every
+    request on the order path
+
+    Parameters:
+    - account_name: The name of the account to trade with
+    - development_mode_toggle: Forcely enable development mode
+
+    Returns:
+    - A TradingClient for the account, or None if no credentials are found
+    """
+
+    credentials: AlpacaAccountCredentials = alpaca_get_credentials(
+        account_name, development_mode_toggle
+    )
+    if not credentials:
+        return None
+
+    client_key: tuple[str, bool] = (account_name, credentials["paper"])
+    with alpaca_trading_clients_lock:
+        trading_client: TradingClient | None = alpaca_trading_clients.get(
+            client_key
+        )
+        if trading_client is None:
+            trading_client = TradingClient(
+                api_key=credentials["key"],
+                secret_key=credentials["secret"],
+                paper=credentials["paper"],
+            )
+            alpaca_trading_clients[client_key] = trading_client
+
+    return trading_client
+
+
+def alpaca_invalidate_trading_clients(account_name: str | None = None) -> None:
+    """
+    Drops cached TradingClients so the next request builds a new one, eg.
+    after API credentials have been rotated
+
+    Parameters:
+    - account_name: The account to invalidate, or None to invalidate all
+    """
+
+    with alpaca_trading_clients_lock:
+        for client_key in list(alpaca_trading_clients):
+            if account_name is None or client_key[0] == account_name:
+                del alpaca_trading_clients[client_key]
+
+
 def alpaca_get_account_balance(
     account_name: str = alpaca_trading_account_name_live,
     development_mode_toggle: bool = development_mode,
@@ -69,24 +130,10 @@ def alpaca_get_account_balance(
     and paper, to pass to the Alpaca SDK API
     """
 
-    account_credentials: AlpacaAccountCredentials = alpaca_get_credentials(
-        account_name
+    trading_client: TradingClient | None = alpaca_get_trading_client(
+        account_name, development_mode_toggle
     )
-    if account_credentials:
-        trading_client: TradingClient = (
-            TradingClient(
-                api_key=account_credentials["key"],
-                secret_key=account_credentials["secret"],
-                paper=account_credentials["paper"],
-            )
-            if not development_mode_toggle
-            else TradingClient(
-                api_key=account_credentials["key"],
-                secret_key=account_credentials["secret"],
-                paper=account_credentials["paper"],
-            )
-        )
-
+    if trading_client:
         # Get account details
         account: TradeAccount | RawData = trading_client.get_account()
 
@@ -134,16 +181,10 @@ def alpaca_get_available_asset_balance(
     - A Decimal with the num
     """
 
-    credentials: AlpacaAccountCredentials = alpaca_get_credentials(
+    trading_client: TradingClient | None = alpaca_get_trading_client(
         account_name
     )
-    if credentials:
-        trading_client = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
-
+    if trading_client:
         try:
             position: Position | RawData = trading_client.get_open_position(
                 symbol
@@ -162,3 +203,39 @@ def alpaca_get_available_asset_balance(
         except Exception as e:
             print(f"Error getting position for {symbol}: {e}")
             return None
+
+
+def alpaca_holds_asset_position(
+    symbol: str, account_name: str = alpaca_trading_account_name_live
+) -> bool | None:
+    """
+    Checks the open positions of an account for a symbol. Unlike
+    alpaca_get_available_asset_balance, a missing position is told apart from
+    a failed request
+
+    Parameters:
+    - symbol: The symbol to search for an open position
+    - account_name: The name of the account to search with
+
+    Returns:
+    - A Boolean, true if the symbol is held, or None if the positions could
+    not be read
+    """
+
+    trading_client: TradingClient | None = alpaca_get_trading_client(
+        account_name
+    )
+    if not trading_client:
+        return None
+    try:
+        positions: list[Position] | RawData = (
+            trading_client.get_all_positions()
+        )
+    except Exception as e:
+        print(f"Error getting positions: {e}")
+        return None
+
+    return any(
+        position.symbol == symbol and Decimal(position.qty) != 0
+        for position in positions
+    )
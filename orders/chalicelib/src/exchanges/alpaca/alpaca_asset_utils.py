@@ -0,0 +1,220 @@
+import json
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, List
+
+from alpaca.common import RawData
+from alpaca.trading.client import TradingClient
+from alpaca.trading.enums import AssetClass, AssetStatus
+from alpaca.trading.models import Asset
+from alpaca.trading.requests import GetAssetsRequest
+from chalicelib.src.exchanges.alpaca.alpaca_account_utils import (
+    alpaca_get_trading_client,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_constants import (
+    alpaca_asset_cache_file_path,
+    alpaca_asset_cache_retry_seconds,
+    alpaca_asset_cache_ttl_seconds,
+    alpaca_trading_account_name_live,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_types import AlpacaAssetMetadata
+
+# Asset metadata indexed by symbol, shared by every account and kept for the
+# lifetime of the Lambda container
+alpaca_asset_metadata: Dict[str, AlpacaAssetMetadata] = {}
+alpaca_asset_metadata_loaded_at: float = 0
+alpaca_asset_metadata_failed_at: float = 0
+alpaca_asset_metadata_loading: bool = False
+alpaca_asset_metadata_lock: Lock = Lock()
+
+
+def alpaca_read_asset_metadata_file(
+    file_path: str, ttl_seconds: int
+) -> Dict[str, Any] | None:
+    """
+    Read the persisted asset metadata index, if it is still fresh
+
+    Parameters:
+    - file_path: Path of the asset metadata file
+    - ttl_seconds: Maximum age of the file contents
+
+    Returns:
+    - A dictionary with the load time and the asset index, or None if the
+    file is missing, unreadable or expired
+    """
+
+    try:
+        with open(file_path) as metadata_file:
+            persisted_metadata: Dict[str, Any] = json.load(metadata_file)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - persisted_metadata.get("loaded_at", 0) > ttl_seconds:
+        return None
+
+    return persisted_metadata
+
+
+def alpaca_write_asset_metadata_file(
+    file_path: str,
+    loaded_at: float,
+    asset_metadata: Dict[str, AlpacaAssetMetadata],
+) -> None:
+    """
+    Persist the asset metadata index so recycled containers can reuse it.
+    The file is replaced atomically so readers never see a partial write
+
+    Parameters:
+    - file_path: Path of the asset metadata file
+    - loaded_at: Time the index was loaded from Alpaca
+    - asset_metadata: Asset metadata indexed by symbol
+    """
+
+    temporary_file_path: str = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_file_path, "w") as metadata_file:
+            json.dump(
+                {"loaded_at": loaded_at, "assets": asset_metadata},
+                metadata_file,
+            )
+        os.replace(temporary_file_path, file_path)
+    except OSError as e:
+        print(f"Error persisting asset metadata: {e}")
+
+
+def alpaca_fetch_asset_metadata(
+    account: str = alpaca_trading_account_name_live,
+) -> Dict[str, AlpacaAssetMetadata]:
+    """
+    Fetch every active US equity in a single bulk asset listing
+
+    Parameters:
+    - account: Account to use for the asset listing
+
+    Returns:
+    - A dictionary of asset metadata indexed by symbol
+    """
+
+    client: TradingClient | None = alpaca_get_trading_client(account)
+    if not client:
+        return {}
+
+    assets: List[Asset] | RawData = client.get_all_assets(
+        GetAssetsRequest(
+            asset_class=AssetClass.US_EQUITY, status=AssetStatus.ACTIVE
+        )
+    )
+
+    return {
+        asset.symbol: {
+            "symbol": asset.symbol,
+            "fractionable": asset.fractionable,
+            "tradable": asset.tradable,
+        }
+        for asset in assets
+    }
+
+
+def alpaca_load_asset_metadata(
+    account: str = alpaca_trading_account_name_live,
+    ttl_seconds: int = alpaca_asset_cache_ttl_seconds,
+    file_path: str = alpaca_asset_cache_file_path,
+    retry_seconds: int = alpaca_asset_cache_retry_seconds,
+) -> Dict[str, AlpacaAssetMetadata]:
+    """
+    Get the asset metadata index, reloading it once it is older than the TTL.
+    Looks in memory first, then in the file persisted in /tmp, and only then
+    fetches a bulk asset listing from Alpaca. One caller reloads the index
+    at a time, concurrent callers answer from the index already loaded. A
+    failed listing is not retried before the retry delay
+
+    Parameters:
+    - account: Account to use if the asset listing has to be fetched
+    - ttl_seconds: Maximum age of the asset metadata
+    - file_path: Path of the asset metadata file
+    - retry_seconds: Time to wait after a failed listing before retrying
+
+    Returns:
+    - A dictionary of asset metadata indexed by symbol, empty if it has not
+    been loaded yet
+    """
+
+    global alpaca_asset_metadata, alpaca_asset_metadata_loaded_at
+    global alpaca_asset_metadata_failed_at, alpaca_asset_metadata_loading
+
+    with alpaca_asset_metadata_lock:
+        if (
+            time.time() - alpaca_asset_metadata_loaded_at <= ttl_seconds
+            or alpaca_asset_metadata_loading
+            or time.time() - alpaca_asset_metadata_failed_at <= retry_seconds
+        ):
+            return alpaca_asset_metadata
+        alpaca_asset_metadata_loading = True
+
+    loaded_metadata: Dict[str, AlpacaAssetMetadata] = {}
+    loaded_at: float = 0
+    try:
+        persisted_metadata: Dict[str, Any] | None = (
+            alpaca_read_asset_metadata_file(file_path, ttl_seconds)
+        )
+        if persisted_metadata:
+            loaded_metadata = persisted_metadata["assets"]
+            loaded_at = persisted_metadata["loaded_at"]
+            print("Asset metadata loaded from", file_path)
+        else:
+            loaded_metadata = alpaca_fetch_asset_metadata(account)
+            loaded_at = time.time()
+            if loaded_metadata:
+                alpaca_write_asset_metadata_file(
+                    file_path, loaded_at, loaded_metadata
+                )
+                print(
+                    "Asset metadata loaded for", len(loaded_metadata), "assets"
+                )
+    except Exception as e:
+        print(f"Error fetching asset listing: {e}")
+
+    with alpaca_asset_metadata_lock:
+        alpaca_asset_metadata_loading = False
+        if loaded_metadata:
+            alpaca_asset_metadata = loaded_metadata
+            alpaca_asset_metadata_loaded_at = loaded_at
+            alpaca_asset_metadata_failed_at = 0
+        else:
+            alpaca_asset_metadata_failed_at = time.time()
+        return alpaca_asset_metadata
+
+
+def alpaca_get_asset_metadata(
+    symbol: str,
+    account: str = alpaca_trading_account_name_live,
+    ttl_seconds: int = alpaca_asset_cache_ttl_seconds,
+) -> AlpacaAssetMetadata | None:
+    """
+    Look up the cached metadata of a single asset
+
+    Parameters:
+    - symbol: Symbol to look up eg. AAPL
+    - account: Account to use if the asset listing has to be fetched
+    - ttl_seconds: Maximum age of the asset metadata
+
+    Returns:
+    - A AlpacaAssetMetadata object, or None if the symbol is not listed
+    """
+
+    return alpaca_load_asset_metadata(account, ttl_seconds).get(symbol)
+
+
+def alpaca_clear_asset_metadata() -> None:
+    """
+    Drop the in-memory asset metadata index so the next lookup reloads it
+    """
+
+    global alpaca_asset_metadata, alpaca_asset_metadata_loaded_at
+    global alpaca_asset_metadata_failed_at
+
+    with alpaca_asset_metadata_lock:
+        alpaca_asset_metadata = {}
+        alpaca_asset_metadata_loaded_at = 0
+        alpaca_asset_metadata_failed_at = 0
@@ -4,6 +4,9 @@ from chalicelib.src.exchanges.alpaca.alpaca_types import (
     AlpacaAccountCredentials,
 )
 
+# Exchange name used to key the position state of a pair
+alpaca_exchange_name: str = "alpaca"
+
 # Alpaca Credentials
 alpaca_trading_endpoint: str = "https://api.alpaca.markets"
 
@@ -15,6 +18,36 @@ alpaca_trading_account_name_paper: str = "paper"
 
 alpaca_tolerated_aftermarket_slippage: Decimal = 0.06
 
+# Asset metadata cache, filled from a bulk asset listing. The file in /tmp is
+# reused by warm and recycled Lambda containers
+alpaca_asset_cache_ttl_seconds: int = 12 * 60 * 60
+
+alpaca_asset_cache_file_path: str = "/tmp/alpaca_asset_metadata.json"
+
+# A failed asset listing is not retried before this delay, lookups answer
+# from the metadata already loaded, if any, in the meantime
+alpaca_asset_cache_retry_seconds: int = 60
+
+# Pre-flight reads of a pair trade alert run concurrently and are abandoned
+# once the per-alert deadline has passed
+alpaca_preflight_deadline_seconds: float = 8.0
+
+# Waiting for an order to fill polls the order with a growing interval, and
+# gives up after the timeout
+alpaca_order_fill_timeout_seconds: float = 10.0
+
+alpaca_order_fill_initial_poll_seconds: float = 0.1
+
+alpaca_order_fill_max_poll_seconds: float = 1.0
+
+alpaca_order_fill_poll_backoff: float = 1.5
+
+# Closed order history is loaded once per alert in pages of this size, and
+# extended with larger pages when older buys are needed to cover a sell
+alpaca_order_history_page_size: int = 10
+
+alpaca_order_history_extend_page_size: int = 50
+
 # Real credentials
 alpaca_accounts: dict[str, dict[AlpacaAccountCredentials]] = {
     alpaca_trading_account_name_live: {
@@ -40,3 +73,29 @@ alpaca_tradingview_symbols: dict[str, str] = {
 alpaca_tradingview_inverse_pairs: dict[str, str] = {
     "<insert>": "<insert>",
 }
+
+# Hedged quote retrieval fires the latest quote request, and launches the
+# fallback quote and bar requests in parallel if it has not answered with a
+# usable bid/ask after the hedge delay. The delay should sit at the p95
+# latency of the latest quote request (see alpaca_get_quote_source_stats),
+# so only its slow tail is hedged. Below the median most alerts would pay
+# for three requests
+alpaca_quote_hedged: bool = True
+
+alpaca_quote_hedge_delay_seconds: float = 0.5
+
+alpaca_quote_timeout_seconds: float = 5.0
+
+alpaca_quote_max_workers: int = 6
+
+# Fallback quote and bar requests look back this far and take the newest
+# result, which covers weekends and market holidays
+alpaca_quote_lookback_days: int = 4
+
+# Quotes of both legs of a pair are fetched in one request per alert, and
+# reused by the orders of the alert until they are older than the max age
+alpaca_quote_max_age_seconds: float = 30.0
+
+# Quotes are shared by the alerts of a container for a short time, so alerts
+# for related tickers at a bar close share one request per symbol
+alpaca_quote_cache_max_age_ms: int = 500
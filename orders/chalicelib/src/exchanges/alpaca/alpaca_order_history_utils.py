@@ -1,23 +1,203 @@
+from datetime import datetime
+from decimal import Decimal
 from typing import Any, Dict, List
 
 from alpaca.trading.client import TradingClient
-from alpaca.trading.enums import OrderSide, OrderStatus, QueryOrderStatus
+from alpaca.trading.enums import OrderSide, QueryOrderStatus
 from alpaca.trading.models import Order
 from alpaca.trading.requests import GetOrdersRequest
 from chalicelib.src.exchanges.alpaca.alpaca_account_utils import (
-    alpaca_get_credentials,
+    alpaca_get_trading_client,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_constants import (
+    alpaca_order_history_extend_page_size,
+    alpaca_order_history_page_size,
     alpaca_trading_account_name_live,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_types import (
-    AlpacaAccountCredentials,
+    AlpacaOrderHistorySnapshot,
 )
 
 
+def alpaca_fetch_closed_orders(
+    symbol: str,
+    account: str = alpaca_trading_account_name_live,
+    limit: int = alpaca_order_history_page_size,
+    until: datetime | None = None,
+) -> List[Order]:
+    """
+    Fetch a page of closed orders for an asset, most recent first
+
+    Parameters:
+    - symbol: The symbol to fetch the orders of eg. APPL
+    - account: Account to check the history of
+    - limit: Maximum number of orders to fetch
+    - until: Only fetch orders submitted before this time
+
+    Returns:
+    - A list of Order objects
+    """
+
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
+    if not trading_client:
+        return []
+
+    filters = GetOrdersRequest(
+        status=QueryOrderStatus.CLOSED,
+        limit=limit,
+        symbols=[symbol],
+        until=until,
+    )
+
+    closed_orders: List[Order] | Dict[str, Any] = trading_client.get_orders(
+        filters
+    )
+    print("Closed orders:", closed_orders)
+    return closed_orders
+
+
+def alpaca_merge_orders_into_snapshot(
+    snapshot: AlpacaOrderHistorySnapshot, orders: List[Order]
+) -> int:
+    """
+    Add orders to a snapshot, replacing orders already in it by id and
+    keeping the most recent order first
+
+    Parameters:
+    - snapshot: Order history snapshot to update
+    - orders: Orders to add
+
+    Returns:
+    - An int with the number of orders that were not in the snapshot
+    """
+
+    orders_by_id: Dict[str, Order] = {
+        str(order.id): order for order in snapshot["orders"]
+    }
+    new_order_count: int = sum(
+        1 for order in orders if str(order.id) not in orders_by_id
+    )
+    orders_by_id.update({str(order.id): order for order in orders})
+
+    snapshot["orders"] = sorted(
+        orders_by_id.values(),
+        key=lambda order: order.submitted_at,
+        reverse=True,
+    )
+    return new_order_count
+
+
+def alpaca_refresh_order_history_snapshot(
+    snapshot: AlpacaOrderHistorySnapshot,
+    limit: int = alpaca_order_history_page_size,
+) -> AlpacaOrderHistorySnapshot:
+    """
+    Fetch the most recent closed orders into a snapshot, eg. to pick up a
+    closing fill
+
+    Parameters:
+    - snapshot: Order history snapshot to update
+    - limit: Maximum number of orders to fetch
+
+    Returns:
+    - The updated snapshot
+    """
+
+    orders: List[Order] = alpaca_fetch_closed_orders(
+        snapshot["symbol"], snapshot["account"], limit
+    )
+    if not snapshot["orders"] and len(orders) < limit:
+        snapshot["complete"] = True
+    alpaca_merge_orders_into_snapshot(snapshot, orders)
+    return snapshot
+
+
+def alpaca_extend_order_history_snapshot(
+    snapshot: AlpacaOrderHistorySnapshot,
+    limit: int = alpaca_order_history_extend_page_size,
+) -> bool:
+    """
+    Fetch the page of closed orders before the oldest order in a snapshot
+
+    Parameters:
+    - snapshot: Order history snapshot to update
+    - limit: Maximum number of orders to fetch
+
+    Returns:
+    - A boolean, True if older orders were added to the snapshot
+    """
+
+    if snapshot["complete"]:
+        return False
+    if not snapshot["orders"]:
+        alpaca_refresh_order_history_snapshot(snapshot, limit)
+        return bool(snapshot["orders"])
+
+    orders: List[Order] = alpaca_fetch_closed_orders(
+        snapshot["symbol"],
+        snapshot["account"],
+        limit,
+        until=snapshot["orders"][-1].submitted_at,
+    )
+    new_order_count: int = alpaca_merge_orders_into_snapshot(snapshot, orders)
+    if len(orders) < limit or new_order_count == 0:
+        snapshot["complete"] = True
+
+    return new_order_count > 0
+
+
+def alpaca_create_order_history_snapshot(
+    symbol: str,
+    account: str = alpaca_trading_account_name_live,
+    limit: int = alpaca_order_history_page_size,
+) -> AlpacaOrderHistorySnapshot:
+    """
+    Load the closed order history of an asset once, so every step of an
+    alert reads the same orders instead of fetching them again
+
+    Parameters:
+    - symbol: The symbol to load the history of eg. APPL
+    - account: Account to check the history of
+    - limit: Number of recent orders to load
+
+    Returns:
+    - A AlpacaOrderHistorySnapshot with the most recent order first
+    """
+
+    snapshot: AlpacaOrderHistorySnapshot = {
+        "symbol": symbol,
+        "account": account,
+        "orders": [],
+        "complete": False,
+    }
+    return alpaca_refresh_order_history_snapshot(snapshot, limit)
+
+
+def alpaca_get_filled_orders(
+    snapshot: AlpacaOrderHistorySnapshot,
+) -> List[Order]:
+    """
+    Orders of a snapshot that filled, including partially filled orders
+    that were cancelled afterwards
+
+    Parameters:
+    - snapshot: Order history snapshot to read
+
+    Returns:
+    - A list of Order objects, most recent first
+    """
+
+    return [
+        order
+        for order in snapshot["orders"]
+        if order.filled_qty and Decimal(order.filled_qty) > 0
+    ]
+
+
 def alpaca_check_last_filled_order_type(
     symbol: str,
     account: str = alpaca_trading_account_name_live,
+    snapshot: AlpacaOrderHistorySnapshot | None = None,
 ) -> OrderSide | str:
     """
     Check if last filled order for an asset was a buy or a sell
@@ -25,53 +205,33 @@ def alpaca_check_last_filled_order_type(
     Parameters:
     - symbol: The symbol to check if it was a by or sell eg. APPL
     - account: Account to check the history of
+    - snapshot: Order history snapshot of the alert, loaded if not given
 
     Returns:
     - A an OrderSide object ("buy" or "sell") or string "none"
     """
 
-    credentials: AlpacaAccountCredentials = alpaca_get_credentials(account)
-    if credentials:
-        trading_client = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
-
-        # Create filter to get last filled order of an asset
-        filters = GetOrdersRequest(
-            status=QueryOrderStatus.CLOSED, limit=10, symbols=[symbol]
-        )
-
-        # Fetch the list of closed orders for the specified symbol
-        closed_orders: List[Order] | Dict[str, Any] = (
-            trading_client.get_orders(filters)
-        )
-
-        print("Closed orders:", closed_orders)
-
-        # Filter out only filled orders
-        filled_orders: List[Order | str] = [
-            order
-            for order in closed_orders
-            if order.status is OrderStatus.FILLED
-        ]
-
-        print("Filled orders:", filled_orders)
-
-        # Check if there are any filled orders
-        if not filled_orders:
-            return "none"
-
-        # Get the most recent filled order
-        last_filled_order: Order | str = filled_orders[0]
-
-        # Return 'buy' or 'sell' based on the side of the last filled order
-        order_side: OrderSide = (
-            OrderSide.BUY
-            if last_filled_order.side == OrderSide.BUY
-            else OrderSide.SELL
-        )
-
-        print("Last order was a", order_side)
-        return order_side
+    if snapshot is None:
+        snapshot = alpaca_create_order_history_snapshot(symbol, account)
+
+    # Filter out only filled orders
+    filled_orders: List[Order] = alpaca_get_filled_orders(snapshot)
+
+    print("Filled orders:", filled_orders)
+
+    # Check if there are any filled orders
+    if not filled_orders:
+        return "none"
+
+    # Get the most recent filled order
+    last_filled_order: Order = filled_orders[0]
+
+    # Return 'buy' or 'sell' based on the side of the last filled order
+    order_side: OrderSide = (
+        OrderSide.BUY
+        if last_filled_order.side == OrderSide.BUY
+        else OrderSide.SELL
+    )
+
+    print("Last order was a", order_side)
+    return order_side
@@ -1,31 +1,51 @@
-from decimal import ROUND_HALF_UP, Decimal
-from typing import Any, Dict, List
+import time
+from decimal import Decimal
+from typing import Dict, List
 
 from alpaca.common import RawData
-from alpaca.data import Quote
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.models import BarSet, QuoteSet
-from alpaca.data.requests import (
-    StockBarsRequest,
-    StockLatestQuoteRequest,
-    StockQuotesRequest,
-)
-from alpaca.data.timeframe import TimeFrame
 from alpaca.trading.client import TradingClient
-from alpaca.trading.enums import OrderSide, QueryOrderStatus
+from alpaca.trading.enums import OrderSide, OrderStatus
 from alpaca.trading.models import Asset, Order
-from alpaca.trading.requests import GetOrdersRequest
 from chalicelib.src.exchanges.alpaca.alpaca_account_utils import (
-    alpaca_get_credentials,
+    alpaca_get_trading_client,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_asset_utils import (
+    alpaca_get_asset_metadata,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_constants import (
+    alpaca_order_fill_initial_poll_seconds,
+    alpaca_order_fill_max_poll_seconds,
+    alpaca_order_fill_poll_backoff,
+    alpaca_order_fill_timeout_seconds,
+    alpaca_quote_hedged,
     alpaca_trading_account_name_live,
 )
+from chalicelib.src.exchanges.alpaca.alpaca_order_history_utils import (
+    alpaca_create_order_history_snapshot,
+    alpaca_extend_order_history_snapshot,
+    alpaca_get_filled_orders,
+    alpaca_refresh_order_history_snapshot,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_quote_utils import (
+    alpaca_get_cached_quotes,
+)
 from chalicelib.src.exchanges.alpaca.alpaca_types import (
-    AlpacaAccountCredentials,
+    AlpacaAssetMetadata,
     AlpacaGetLatestQuote,
+    AlpacaOrderHistorySnapshot,
 )
 
+# Order states after which an order will not fill any further
+alpaca_order_final_statuses: set[OrderStatus] = {
+    OrderStatus.FILLED,
+    OrderStatus.CANCELED,
+    OrderStatus.EXPIRED,
+    OrderStatus.REJECTED,
+    OrderStatus.SUSPENDED,
+    OrderStatus.DONE_FOR_DAY,
+    OrderStatus.REPLACED,
+}
+
 
 def alpaca_is_asset_fractionable(
     symbol: str,
@@ -43,13 +63,17 @@ def alpaca_is_asset_fractionable(
     accepted)
     """
 
-    credentials: AlpacaAccountCredentials = alpaca_get_credentials(account)
-    if credentials:
-        client = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
+    # Served from the asset metadata cache, which is filled from a bulk
+    # asset listing, so most orders skip the get_asset round trip
+    asset_metadata: AlpacaAssetMetadata | None = alpaca_get_asset_metadata(
+        symbol, account
+    )
+    if asset_metadata:
+        print("asset fractionable:", asset_metadata["fractionable"])
+        return asset_metadata["fractionable"]
+
+    client: TradingClient | None = alpaca_get_trading_client(account)
+    if client:
         try:
             asset: Asset | RawData = client.get_asset(symbol)
             print("asset fractionable:", asset.fractionable)
@@ -59,37 +83,36 @@ def alpaca_is_asset_fractionable(
 
 
 def alpaca_calculate_profit_loss(
-    symbol: str, account: str = alpaca_trading_account_name_live
+    symbol: str,
+    account: str = alpaca_trading_account_name_live,
+    snapshot: AlpacaOrderHistorySnapshot | None = None,
 ) -> Decimal:
     """
     Calculate the profit/loss amount on an asset's last trade. Looks at last
     open and close of an asset
 
     Parameters:
-    - symbol: Symbol to check if asset is fractionable
-    - account: Account to use to check if asset if fractionable
+    - symbol: Symbol to calculate the profit/loss of
+    - account: Account to use to calculate the profit/loss
+    - snapshot: Order history snapshot of the alert, loaded if not given
 
     Returns:
     - A Decimal, a negative or positive number based on profit or loss
     calculation
     """
 
-    credentials: AlpacaAccountCredentials = alpaca_get_credentials(account)
-    trading_client = TradingClient(
-        api_key=credentials["key"],
-        secret_key=credentials["secret"],
-        paper=credentials["paper"],
-    )
+    if snapshot is None:
+        snapshot = alpaca_create_order_history_snapshot(symbol, account)
 
-    # Fetch the most recent orders, considering a reasonable limit
-    orders_request = GetOrdersRequest(
-        status=QueryOrderStatus.CLOSED, symbols=[symbol], limit=5
-    )
-    orders: List[Order] = trading_client.get_orders(filter=orders_request)
+    # The closing fill may have landed after the snapshot was loaded
+    filled_orders: List[Order] = alpaca_get_filled_orders(snapshot)
+    if not filled_orders or filled_orders[0].side != OrderSide.SELL:
+        alpaca_refresh_order_history_snapshot(snapshot)
+        filled_orders = alpaca_get_filled_orders(snapshot)
 
-    # Find the most recent sell order
-    recent_sell_order = next(
-        (order for order in reversed(orders) if order.side == OrderSide.SELL),
+    # Find the most recent sell order, orders are most recent first
+    recent_sell_order: Order | None = next(
+        (order for order in filled_orders if order.side == OrderSide.SELL),
         None,
     )
     if not recent_sell_order:
@@ -100,8 +123,18 @@ def alpaca_calculate_profit_loss(
     accumulated_buy_quantity = Decimal("0")
     total_buy_cost = Decimal("0")
 
-    # Accumulate buy orders starting from the most recent
-    for order in reversed(orders):
+    # Accumulate buy orders starting from the most recent before the sell,
+    # loading older history when the snapshot does not cover the sell
+    position: int = filled_orders.index(recent_sell_order) + 1
+    while accumulated_buy_quantity < sell_quantity_needed:
+        if position >= len(filled_orders):
+            if not alpaca_extend_order_history_snapshot(snapshot):
+                break
+            filled_orders = alpaca_get_filled_orders(snapshot)
+            continue
+
+        order: Order = filled_orders[position]
+        position += 1
         if order.side == OrderSide.BUY:
             buy_quantity = Decimal(order.filled_qty)
             buy_price = Decimal(order.filled_avg_price)
@@ -114,9 +147,6 @@ def alpaca_calculate_profit_loss(
             total_buy_cost += quantity_to_use * buy_price
             accumulated_buy_quantity += quantity_to_use
 
-            if accumulated_buy_quantity >= sell_quantity_needed:
-                break
-
     if accumulated_buy_quantity < sell_quantity_needed:
         raise ValueError("Not enough buy orders to match the sell quantity.")
 
@@ -130,113 +160,28 @@ def alpaca_calculate_profit_loss(
 
 # TO DO - Add unit tests
 def alpaca_get_latest_quote(
-    symbol: str, account: str = alpaca_trading_account_name_live
+    symbol: str,
+    account: str = alpaca_trading_account_name_live,
+    hedged: bool = alpaca_quote_hedged,
 ) -> AlpacaGetLatestQuote | Dict[str, str]:
     """
-    Get the latest quote data for an asset, with two additional backup methods
+    Get the latest quote data for an asset, with two additional backup
+    methods, the most recent historical quote and the latest minute bar
 
     Parameters:
-    - symbol: Symbol to check if asset is fractionable
-    - account: Account to use to check if asset if fractionable
+    - symbol: Symbol to get the quote of
+    - account: Account to use to get the quote
+    - hedged: Request the backup methods in parallel once the latest quote
+    is late, instead of one after another
 
     Returns:
     - A AlpacaGetLatestQuote object containing the ask price, bid price, ask
-    size, and bid size
+    size, bid size and the timestamp of the quote
     """
 
-    credentials: AlpacaAccountCredentials = alpaca_get_credentials(account)
-    print("credentials", credentials)
-    if credentials:
-        client: StockHistoricalDataClient = StockHistoricalDataClient(
-            api_key=credentials["key"], secret_key=credentials["secret"]
-        )
-
-        try:
-            # Primary method: StockLatestQuoteRequest
-            request_params_latest: StockLatestQuoteRequest = (
-                StockLatestQuoteRequest(symbol_or_symbols=[symbol])
-            )
-            latest_quote: Dict[str, Quote] | RawData = (
-                client.get_stock_latest_quote(request_params_latest)
-            )
-
-            print("latest quote", latest_quote)
-
-            symbol_quote_latest: Quote | Any = latest_quote[symbol]
-            if (
-                symbol_quote_latest.bid_price > 0
-                or symbol_quote_latest.ask_price > 0
-            ):
-                latest_quote: AlpacaGetLatestQuote = {
-                    "ask_price": Decimal(
-                        symbol_quote_latest.ask_price
-                    ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
-                    "bid_price": Decimal(
-                        symbol_quote_latest.bid_price
-                    ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
-                    "ask_size": symbol_quote_latest.ask_size,
-                    "bid_size": symbol_quote_latest.bid_size,
-                }
-
-                print("Quote Method 1 - Latest quote found:", latest_quote)
-                return latest_quote
-
-            # Backup method: StockQuotesRequest
-            request_params_quotes: StockQuotesRequest = StockQuotesRequest(
-                symbol_or_symbols=[symbol], limit=1
-            )
-            quotes: QuoteSet | RawData = client.get_stock_quotes(
-                request_params_quotes
-            )
-            quote: Any = quotes[symbol][0]
-            if quote.bid_price and quote.ask_price:
-                latest_quote: AlpacaGetLatestQuote = {
-                    "ask_price": Decimal(quote.ask_price).quantize(
-                        Decimal("0.01"), rounding=ROUND_HALF_UP
-                    ),
-                    "bid_price": Decimal(quote.bid_price).quantize(
-                        Decimal("0.01"), rounding=ROUND_HALF_UP
-                    ),
-                    "ask_size": quote.ask_size,
-                    "bid_size": quote.bid_size,
-                }
-
-                print(
-                    "Quote Method 2 - Latest quote not found, most recent Stock Quote:",  # noqa: E501
-                    latest_quote,
-                )
-                return latest_quote
-
-            # Secondary backup: StockBarsRequest
-            bar_request_params: StockBarsRequest = StockBarsRequest(
-                symbol_or_symbols=[symbol], timeframe=TimeFrame.Minute, limit=1
-            )
-            bars: BarSet | RawData = client.get_stock_bars(bar_request_params)
-            bar: Any = bars[symbol][0]
-            latest_quote: AlpacaGetLatestQuote = {
-                "ask_price": Decimal(bar.close).quantize(
-                    Decimal("0.01"), rounding=ROUND_HALF_UP
-                ),
-                "bid_price": Decimal(bar.close).quantize(
-                    Decimal("0.01"), rounding=ROUND_HALF_UP
-                ),
-                "close_price": Decimal(bar.close),
-                "volume": bar.volume,
-            }
-
-            print(
-                "Quote Method 3 - Quote not found, latest historical bar close minute price:",  # noqa: E501
-                latest_quote,
-            )
-            return latest_quote
-
-        except Exception as e:
-            print(f"An error occurred while fetching data for {symbol}: {e}")
-            return {"error": str(e)}
-
-    else:
-        print("No credentials available.")
-        return {"error": "No credentials"}
+    # Served from the quote cache, a quote fetched by another alert in the
+    # last few hundred milliseconds is reused
+    return alpaca_get_cached_quotes([symbol], account, hedged)[symbol]
 
 
 # TO DO: ADD DESCRIPTION AND TESTS
@@ -244,17 +189,9 @@ def alpaca_are_holdings_closed(
     symbol: str,
     account: str = alpaca_trading_account_name_live,
 ) -> bool:
-    credentials: AlpacaAccountCredentials | None = alpaca_get_credentials(
-        account
-    )
-
-    if credentials:
-        trading_client = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
 
+    if trading_client:
         try:
             # Fetch the list of open positions
             open_positions = trading_client.get_all_positions()
@@ -277,3 +214,61 @@ def alpaca_are_holdings_closed(
     else:
         print("No credentials available.")
         return False  # Cannot check without credentials
+
+
+def alpaca_wait_for_order_fill(
+    order_id: str,
+    account: str = alpaca_trading_account_name_live,
+    timeout_seconds: float = alpaca_order_fill_timeout_seconds,
+    initial_poll_seconds: float = alpaca_order_fill_initial_poll_seconds,
+    max_poll_seconds: float = alpaca_order_fill_max_poll_seconds,
+    poll_backoff: float = alpaca_order_fill_poll_backoff,
+) -> Order | None:
+    """
+    Wait for an order to fill by polling the order itself. The poll interval
+    starts short, since market orders usually fill within milliseconds, and
+    grows up to a maximum while the order is still open
+
+    Parameters:
+    - order_id: Id of the order returned by submit_order or close_position
+    - account: Account the order was submitted with
+    - timeout_seconds: Time to wait before giving up
+    - initial_poll_seconds: Interval before the first poll
+    - max_poll_seconds: Longest interval between two polls
+    - poll_backoff: Factor the interval grows by after each poll
+
+    Returns:
+    - The last state of the order, or None if it could not be fetched. The
+    order status tells if the order filled or the timeout was reached
+    """
+
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
+    if not trading_client:
+        print("No credentials available.")
+        return None
+
+    start_time: float = time.monotonic()
+    poll_seconds: float = initial_poll_seconds
+    order: Order | None = None
+
+    while True:
+        try:
+            order = trading_client.get_order_by_id(order_id)
+        except Exception as e:
+            print(f"An error occurred while fetching order {order_id}: {e}")
+
+        elapsed_seconds: float = time.monotonic() - start_time
+        if order is not None and order.status in alpaca_order_final_statuses:
+            print(
+                f"Order {order_id} {order.status} after",
+                f"{elapsed_seconds:.3f}s",
+            )
+            return order
+
+        remaining_seconds: float = timeout_seconds - elapsed_seconds
+        if remaining_seconds <= 0:
+            print(f"Order {order_id} not filled after {timeout_seconds}s")
+            return order
+
+        time.sleep(min(poll_seconds, remaining_seconds))
+        poll_seconds = min(poll_seconds * poll_backoff, max_poll_seconds)
@@ -1,7 +1,6 @@
 import time
-from datetime import datetime
 from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
-from typing import Any, Dict, Literal
+from typing import Any, Callable, Dict, Literal
 
 from alpaca.common import RawData
 from alpaca.trading.client import TradingClient
@@ -12,19 +11,20 @@ from alpaca.trading.requests import (
     MarketOrderRequest,
     OrderRequest,
 )
-from chalicelib.src.aws.aws_constants import dynamodb_table_names_instance
-from chalicelib.src.aws.aws_utils import save_CGT_amount_to_dynamoDB
-from chalicelib.src.constants import (
-    capital_gains_tax_rate,
-    capital_to_deploy_percentage,
-    local_tz,
+from chalicelib.src.aws.aws_types import AWSDynamoDbPositionState
+from chalicelib.src.aws.aws_utils import (
+    get_position_state,
+    save_position_state,
 )
+from chalicelib.src.constants import capital_to_deploy_percentage
 from chalicelib.src.exchanges.alpaca.alpaca_account_utils import (
     alpaca_get_account_balance,
     alpaca_get_available_asset_balance,
-    alpaca_get_credentials,
+    alpaca_holds_asset_position,
+    alpaca_get_trading_client,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_constants import (
+    alpaca_exchange_name,
     alpaca_tolerated_aftermarket_slippage,
     alpaca_trading_account_name_live,
     alpaca_tradingview_inverse_pairs,
@@ -32,16 +32,38 @@ from chalicelib.src.exchanges.alpaca.alpaca_constants import (
 )
 from chalicelib.src.exchanges.alpaca.alpaca_order_history_utils import (
     alpaca_check_last_filled_order_type,
+    alpaca_create_order_history_snapshot,
+    alpaca_merge_orders_into_snapshot,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_orders_helper import (
     alpaca_are_holdings_closed,
-    alpaca_calculate_profit_loss,
     alpaca_get_latest_quote,
     alpaca_is_asset_fractionable,
+    alpaca_wait_for_order_fill,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_preflight_utils import (
+    alpaca_gather_preflight_data,
+    alpaca_run_preflight_reads,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_quote_utils import (
+    alpaca_create_quote_snapshot,
+    alpaca_get_snapshot_quote,
+    alpaca_log_quote_used,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_tax_utils import (
+    alpaca_create_tax_task,
+    alpaca_defer_tax_task,
+    alpaca_persist_tax_task,
+    alpaca_reserve_tax_task,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_types import (
-    AlpacaAccountCredentials,
+    AlpacaAvailableAssetBalance,
+    AlpacaGetAccountBalance,
     AlpacaGetLatestQuote,
+    AlpacaOrderHistorySnapshot,
+    AlpacaPreflightData,
+    AlpacaQuoteSnapshot,
+    AlpacaTaxTask,
 )
 from chalicelib.src.exchanges.exchanges_utils import (
     is_outside_nasdaq_trading_hours,
@@ -58,7 +80,7 @@ def alpaca_submit_pair_trade_order(
     calculate_tax: bool = True,
     buy_alert: bool = True,
     account: str = alpaca_trading_account_name_live,
-):
+) -> Order | None:
     print("Alpaca Order Begin - alpaca_submit_pair_trade_order")
     log_times_in_new_york_and_local_timezone()
 
@@ -76,64 +98,189 @@ def alpaca_submit_pair_trade_order(
 
     isOutsideNormalTradingHours: bool = is_outside_nasdaq_trading_hours()
 
+    # The held leg is read from the position state. The order history is only
+    # read when there is no fresh state, or the state disagrees with the
+    # inverse position read in the pre-flight stage
+    position_state: AWSDynamoDbPositionState | None = get_position_state(
+        alpaca_exchange_name, account, tradingview_symbol
+    )
+
+    # Independent reads needed to size the orders are fetched concurrently.
+    # Reads that miss the deadline are fetched again where they are needed
+    preflight_data: AlpacaPreflightData = alpaca_gather_preflight_data(
+        alpaca_symbol,
+        alpaca_inverse_symbol,
+        account,
+        include_order_history=position_state is None,
+    )
+    order_history: AlpacaOrderHistorySnapshot | None = preflight_data[
+        "order_history"
+    ]
+
+    # Quotes missing from the pre-flight snapshot are fetched on first use
+    quote_snapshot: AlpacaQuoteSnapshot | None = preflight_data[
+        "quote_snapshot"
+    ]
+    if quote_snapshot is None:
+        quote_snapshot = alpaca_create_quote_snapshot([], account)
+
+    holding_inverse_asset: bool | None = None
+    if position_state is not None:
+        holding_inverse_asset = (
+            position_state["HeldSymbol"] == alpaca_inverse_symbol
+        )
+        inverse_position: AlpacaAvailableAssetBalance | None = preflight_data[
+            "inverse_asset_balance"
+        ]
+        holds_inverse_position: bool | None = (
+            inverse_position is not None
+            and Decimal(inverse_position["position_qty"]) != 0
+        )
+
+        # A missing position read is either no position or a failed read. A
+        # state that says the inverse asset is not held is only trusted when
+        # the open positions confirm it
+        if inverse_position is None and not holding_inverse_asset:
+            holds_inverse_position = alpaca_holds_asset_position(
+                alpaca_inverse_symbol, account
+            )
+        if holds_inverse_position != holding_inverse_asset:
+            print("Position state mismatch - reconciling with order history")
+            holding_inverse_asset = None
+
+    if holding_inverse_asset is None:
+        if order_history is None:
+            order_history = alpaca_create_order_history_snapshot(
+                alpaca_inverse_symbol, account
+            )
+        last_filled_order_side: OrderSide | str = (
+            alpaca_check_last_filled_order_type(
+                symbol=alpaca_inverse_symbol,
+                account=account,
+                snapshot=order_history,
+            )
+        )
+        holding_inverse_asset = last_filled_order_side == OrderSide.BUY
+
+    tax_task: AlpacaTaxTask | None = None
+
     # If there is no sell order found for inverse pair symbol,
     # sell all holdings of the inverse pair and save CGT to DynamoDB
     # Assumes there is only one order open at a time
-    if (
-        alpaca_check_last_filled_order_type(
-            symbol=alpaca_inverse_symbol, account=account
-        )
-        == OrderSide.BUY
-    ):
+    if holding_inverse_asset:
         if isOutsideNormalTradingHours:
-            asset_balance: float | Any = alpaca_get_available_asset_balance(
-                alpaca_inverse_symbol
-            )["position_qty"]
-            alpaca_submit_limit_order_custom_quantity(
-                alpaca_inverse_symbol,
-                asset_balance,
-                buy_side_order=False,
-                setSlippagePercentage=alpaca_tolerated_aftermarket_slippage,
+            inverse_asset_balance: AlpacaAvailableAssetBalance | None = (
+                preflight_data["inverse_asset_balance"]
+            )
+            if inverse_asset_balance is None:
+                inverse_asset_balance = alpaca_get_available_asset_balance(
+                    alpaca_inverse_symbol, account
+                )
+            asset_balance: float | Any = inverse_asset_balance["position_qty"]
+            closing_order: Order | None = (
+                alpaca_submit_limit_order_custom_quantity(
+                    alpaca_inverse_symbol,
+                    asset_balance,
+                    buy_side_order=False,
+                    account=account,
+                    setSlippagePercentage=alpaca_tolerated_aftermarket_slippage,  # noqa: E501
+                    latest_quote=alpaca_get_snapshot_quote(
+                        quote_snapshot, alpaca_inverse_symbol
+                    ),
+                )
             )
         else:
-            alpaca_close_all_holdings_of_asset(alpaca_inverse_symbol, account)
+            closing_order: Order | None = alpaca_close_all_holdings_of_asset(
+                alpaca_inverse_symbol, account
+            )
 
-        # Wait for up to 10 seconds for holdings to close
-        timeout: int = 10  # timeout in seconds
-        start_time: float = time.time()
-        while time.time() - start_time < timeout:
-            if alpaca_are_holdings_closed(alpaca_inverse_symbol, account):
-                break
-            time.sleep(1)  # Wait for 1 second before checking again
+        # Wait for up to 10 seconds for the closing order to fill. Without
+        # an order id, fall back to polling the open positions
+        if closing_order is not None:
+            filled_order: Order | None = alpaca_wait_for_order_fill(
+                closing_order.id, account
+            )
 
-        # Calculate and save tax, if applicable
+            # The closing fill is added to the order history snapshot, so
+            # the profit/loss does not need to fetch the history again
+            if filled_order is not None and order_history is not None:
+                alpaca_merge_orders_into_snapshot(
+                    order_history, [filled_order]
+                )
+        else:
+            timeout: int = 10  # timeout in seconds
+            start_time: float = time.time()
+            while time.time() - start_time < timeout:
+                if alpaca_are_holdings_closed(alpaca_inverse_symbol, account):
+                    break
+                time.sleep(1)  # Wait for 1 second before checking again
+
+        # Closing the inverse leg changes the cash balance, so it is read
+        # again while the tax of the closed leg is calculated. The quote is
+        # only read again once it is older than the max quote age, eg. after
+        # a slow close
+        refresh_reads: Dict[str, Callable[[], Any]] = {
+            "account_balance": lambda: alpaca_get_account_balance(
+                account_name=account
+            ),
+            "latest_quote": lambda: alpaca_get_snapshot_quote(
+                quote_snapshot, alpaca_symbol
+            ),
+        }
         if calculate_tax:
-            profit_loss_amount: Decimal = alpaca_calculate_profit_loss(
-                alpaca_inverse_symbol, account
-            )
-            tax_amount: Decimal = Decimal(profit_loss_amount) * Decimal(
-                capital_gains_tax_rate
+            refresh_reads["tax_task"] = lambda: alpaca_create_tax_task(
+                alpaca_inverse_symbol, account, order_history
             )
-            print("tax_amount", profit_loss_amount, "\n")
+        refreshed_data: Dict[str, Any] = alpaca_run_preflight_reads(
+            refresh_reads
+        )
+        account_balance: AlpacaGetAccountBalance | None = (
+            refreshed_data["account_balance"]
+            if isinstance(refreshed_data["account_balance"], dict)
+            else None
+        )
+        preflight_data["latest_quote"] = refreshed_data["latest_quote"]
 
-            if tax_amount > 0:
-                timestamp: str = datetime.now(local_tz).strftime(
-                    "%Y-%m-%d %H:%M:%S"
+        if calculate_tax:
+            # A calculation that failed or missed the deadline is run again
+            # on a fresh order history, the first one may still be running
+            tax_task = refreshed_data["tax_task"]
+            if tax_task is None:
+                try:
+                    tax_task = alpaca_create_tax_task(
+                        alpaca_inverse_symbol, account
+                    )
+                except Exception as e:
+                    print(f"Error calculating tax: {e}")
+
+        # The tax is only saved once the opening leg is submitted, so it is
+        # held back from the balance used to size the opening leg, and kept
+        # as a pending task until it is saved
+        if tax_task is not None:
+            alpaca_persist_tax_task(tax_task)
+            if account_balance is None:
+                balance: AlpacaGetAccountBalance | str = (
+                    alpaca_get_account_balance(account_name=account)
+                )
+                account_balance = (
+                    balance if isinstance(balance, dict) else None
                 )
-                save_CGT_amount_to_dynamoDB(
-                    asset=alpaca_inverse_symbol,
-                    profit=tax_amount,
-                    transaction_date=timestamp,
-                    table_name=dynamodb_table_names_instance.alpaca_markets_profits,  # noqa: E501
+            if account_balance is not None:
+                account_balance = alpaca_reserve_tax_task(
+                    account_balance, tax_task
                 )
+        preflight_data["account_balance"] = account_balance
 
-    (
+    opening_order: Order | None = (
         alpaca_submit_limit_order_custom_percentage(
             alpaca_symbol,
             True,
             capital_percentage_to_deploy=capital_to_deploy,
             account=account,
             setSlippagePercentage=alpaca_tolerated_aftermarket_slippage,
+            account_info=preflight_data["account_balance"],
+            latest_quote=preflight_data["latest_quote"],
+            fractionable=preflight_data["fractionable"],
         )
         if isOutsideNormalTradingHours
         else alpaca_submit_market_order_custom_percentage(  # noqa: E501
@@ -141,9 +288,23 @@ def alpaca_submit_pair_trade_order(
             True,
             capital_percentage_to_deploy=capital_to_deploy,
             account=account,
+            account_info=preflight_data["account_balance"],
+            latest_quote=preflight_data["latest_quote"],
+            fractionable=preflight_data["fractionable"],
         )
     )
 
+    # The next alert on the pair can skip the order history lookup
+    if opening_order is not None:
+        save_position_state(
+            alpaca_exchange_name, account, tradingview_symbol, alpaca_symbol
+        )
+
+    if tax_task is not None:
+        alpaca_defer_tax_task(tax_task)
+
+    return opening_order
+
 
 # Submit a limit order for the custom quantity of a stock
 def alpaca_submit_limit_order_custom_quantity(
@@ -154,30 +315,25 @@ def alpaca_submit_limit_order_custom_quantity(
     account: str = alpaca_trading_account_name_live,
     time_in_force: TimeInForce = TimeInForce.DAY,
     setSlippagePercentage: Decimal = 0,
-) -> None:
+    latest_quote: AlpacaGetLatestQuote | None = None,
+) -> Order | None:
     print("Alpaca Order Begin - alpaca_submit_limit_order_custom_quantity")
     log_times_in_new_york_and_local_timezone()
-    credentials: AlpacaAccountCredentials | None = alpaca_get_credentials(
-        account
-    )
-
-    if credentials:
-        trading_client: TradingClient = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
 
+    if trading_client:
         # Check if the asset is fractionable
         fractionable: bool = alpaca_is_asset_fractionable(
             alpaca_symbol, account
         )
 
-        # Set the default limit price using the latest quote
+        # Set the default limit price using the latest quote, which may be
+        # passed in from the quote snapshot of the alert
         if limit_price is None:
-            latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
-                alpaca_get_latest_quote(alpaca_symbol, account)
-            )
+            if latest_quote is None:
+                latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
+                    alpaca_get_latest_quote(alpaca_symbol, account)
+                )
             if buy_side_order:
                 quote_price: Decimal = (
                     Decimal(latest_quote["ask_price"])
@@ -198,6 +354,9 @@ def alpaca_submit_limit_order_custom_quantity(
                     Decimal(quote_price)
                     - (Decimal(quote_price) * Decimal(setSlippagePercentage))
                 ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            alpaca_log_quote_used(
+                f"Limit price {limit_price}", alpaca_symbol, latest_quote
+            )
 
         # Set the order side
         order_side: OrderSide = "buy" if buy_side_order else "sell"
@@ -233,9 +392,12 @@ def alpaca_submit_limit_order_custom_quantity(
                 order_request
             )
             print(f"Limit {order_side} order submitted: \n", order_response)
+            return order_response
         except Exception as e:
             print(f"An error occurred while submitting the order: {e}")
 
+    return None
+
 
 # Submit limit order based on custom percentage of entire portfolio value
 def alpaca_submit_limit_order_custom_percentage(
@@ -246,23 +408,21 @@ def alpaca_submit_limit_order_custom_percentage(
     time_in_force: TimeInForce = TimeInForce.DAY,
     limit_price: Decimal = None,
     setSlippagePercentage: Decimal = 0,
-) -> None:
+    account_info: AlpacaGetAccountBalance | None = None,
+    latest_quote: AlpacaGetLatestQuote | None = None,
+    fractionable: bool | None = None,
+) -> Order | None:
     print("Alpaca Order Begin - alpaca_submit_limit_order_custom_percentage")
     log_times_in_new_york_and_local_timezone()
-    credentials: AlpacaAccountCredentials | None = alpaca_get_credentials(
-        account
-    )
-
-    if credentials:
-        trading_client: TradingClient = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
-
-        account_info: dict[str, Any] | Literal["Account not found"] = (
-            alpaca_get_account_balance(account_name=account)
-        )
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
+
+    if trading_client:
+        # Balance, quote and fractionability may be passed in from the
+        # pre-flight stage, otherwise they are fetched here
+        if account_info is None:
+            account_info: dict[str, Any] | Literal["Account not found"] = (
+                alpaca_get_account_balance(account_name=account)
+            )
         account_equity: Any | str = account_info["account_equity"]
         account_cash: Any | str = account_info["account_cash"]
 
@@ -276,7 +436,7 @@ def alpaca_submit_limit_order_custom_percentage(
         # Check if funds are sufficient
         if funds_to_deploy <= 0:
             print("Insufficient funds to deploy")
-            return
+            return None
 
         # If funds are less that funds to deploy, deploy all cash
         # Can be useful if funds are still settling
@@ -284,9 +444,10 @@ def alpaca_submit_limit_order_custom_percentage(
             funds_to_deploy: Decimal = Decimal(account_cash)
 
         if limit_price is None:
-            latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
-                alpaca_get_latest_quote(alpaca_symbol, account)
-            )
+            if latest_quote is None:
+                latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
+                    alpaca_get_latest_quote(alpaca_symbol, account)
+                )
             if buy_side_order:
                 quote_price: Decimal = (
                     Decimal(latest_quote["ask_price"])
@@ -307,14 +468,18 @@ def alpaca_submit_limit_order_custom_percentage(
                     Decimal(quote_price)
                     + (Decimal(quote_price) * Decimal(setSlippagePercentage))
                 ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            alpaca_log_quote_used(
+                f"Limit price {limit_price}", alpaca_symbol, latest_quote
+            )
 
         # Set the order side
         order_side: OrderSide = "buy" if buy_side_order else "sell"
 
         # Check if asset is fractionable
-        fractionable: bool = alpaca_is_asset_fractionable(
-            alpaca_symbol, account
-        )
+        if fractionable is None:
+            fractionable: bool = alpaca_is_asset_fractionable(
+                alpaca_symbol, account
+            )
 
         # Prepare order parameters
         if fractionable:
@@ -329,9 +494,10 @@ def alpaca_submit_limit_order_custom_percentage(
         else:
             # For non-fractionable assets, calculate quantity using latest
             # quote
-            latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
-                alpaca_get_latest_quote(alpaca_symbol, account)
-            )
+            if latest_quote is None:
+                latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
+                    alpaca_get_latest_quote(alpaca_symbol, account)
+                )
             price: Decimal = Decimal(
                 latest_quote["ask_price"]
                 if latest_quote["bid_price"] == Decimal(0)
@@ -343,6 +509,9 @@ def alpaca_submit_limit_order_custom_percentage(
                     0.97
                 )  # 3% margin of error for latest quote unreliabiity
             ) / price
+            alpaca_log_quote_used(
+                f"Quantity {quantity}", alpaca_symbol, latest_quote
+            )
 
             order_request = LimitOrderRequest(
                 symbol=alpaca_symbol,
@@ -362,9 +531,12 @@ def alpaca_submit_limit_order_custom_percentage(
                 order_request
             )
             print(f"Limit {order_side} order submitted: \n", order_response)
+            return order_response
         except Exception as e:
             print(f"An error occurred while submitting the order: {e}")
 
+    return None
+
 
 # Submit market order based on custom percentage of entire portfolio value
 def alpaca_submit_market_order_custom_percentage(
@@ -373,23 +545,21 @@ def alpaca_submit_market_order_custom_percentage(
     capital_percentage_to_deploy: float = 1.0,
     account: str = alpaca_trading_account_name_live,
     time_in_force: TimeInForce = TimeInForce.DAY,
-) -> None:
+    account_info: AlpacaGetAccountBalance | None = None,
+    latest_quote: AlpacaGetLatestQuote | None = None,
+    fractionable: bool | None = None,
+) -> Order | None:
     print("Alpaca Order Begin - alpaca_submit_market_order_custom_percentage")
     log_times_in_new_york_and_local_timezone()
-    credentials: AlpacaAccountCredentials | None = alpaca_get_credentials(
-        account
-    )
-
-    if credentials:
-        trading_client: TradingClient = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
-
-        account_info: dict[str, Any] | Literal["Account not found"] = (
-            alpaca_get_account_balance(account_name=account)
-        )
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
+
+    if trading_client:
+        # Balance, quote and fractionability may be passed in from the
+        # pre-flight stage, otherwise they are fetched here
+        if account_info is None:
+            account_info: dict[str, Any] | Literal["Account not found"] = (
+                alpaca_get_account_balance(account_name=account)
+            )
         account_equity: Any | str = account_info["account_equity"]
         account_cash: Any | str = account_info["account_cash"]
 
@@ -403,7 +573,7 @@ def alpaca_submit_market_order_custom_percentage(
         # Check if funds are sufficient
         if funds_to_deploy <= 0:
             print("Insufficient funds to deploy")
-            return
+            return None
 
         # If funds are less that funds to deploy, deploy all cash
         # Can be useful if funds are still settling
@@ -414,9 +584,10 @@ def alpaca_submit_market_order_custom_percentage(
         order_side: OrderSide = "buy" if buy_side_order else "sell"
 
         # Check if asset is fractionable
-        fractionable: bool = alpaca_is_asset_fractionable(
-            alpaca_symbol, account
-        )
+        if fractionable is None:
+            fractionable: bool = alpaca_is_asset_fractionable(
+                alpaca_symbol, account
+            )
 
         # Prepare order parameters
         if fractionable:
@@ -430,9 +601,10 @@ def alpaca_submit_market_order_custom_percentage(
         else:
             # For non-fractionable assets, calculate quantity using latest
             # quote
-            latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
-                alpaca_get_latest_quote(alpaca_symbol, account)
-            )
+            if latest_quote is None:
+                latest_quote: AlpacaGetLatestQuote | Dict[str, str] = (
+                    alpaca_get_latest_quote(alpaca_symbol, account)
+                )
             price: Decimal = Decimal(
                 latest_quote["ask_price"]
                 if latest_quote["bid_price"] == Decimal(0)
@@ -444,6 +616,9 @@ def alpaca_submit_market_order_custom_percentage(
                     0.97
                 )  # 3% margin of error for latest quote unreliabiity
             ) / price
+            alpaca_log_quote_used(
+                f"Quantity {quantity}", alpaca_symbol, latest_quote
+            )
 
             order_request: MarketOrderRequest = MarketOrderRequest(
                 symbol=alpaca_symbol,
@@ -463,9 +638,12 @@ def alpaca_submit_market_order_custom_percentage(
                 order_request
             )
             print(f"Market {order_side} order submitted: \n", order_response)
+            return order_response
         except Exception as e:
             print(f"An error occurred while submitting the order: {e}")
 
+    return None
+
 
 # Submit a market order with a custom $ amount
 def alpaca_submit_market_order_custom_amount(
@@ -477,17 +655,9 @@ def alpaca_submit_market_order_custom_amount(
 ) -> None:
     print("Alpaca Order Begin - alpaca_submit_market_order_custom_amount")
     log_times_in_new_york_and_local_timezone()
-    credentials: AlpacaAccountCredentials | None = alpaca_get_credentials(
-        account
-    )
-
-    if credentials:
-        trading_client: TradingClient = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
 
+    if trading_client:
         # Check if asset is fractionable
         fractionable: bool = alpaca_is_asset_fractionable(
             alpaca_symbol, account
@@ -531,6 +701,9 @@ def alpaca_submit_market_order_custom_amount(
                     0.97
                 )  # 3% margin of error for latest quote unreliabiity
             ) / price
+            alpaca_log_quote_used(
+                f"Quantity {quantity}", alpaca_symbol, latest_quote
+            )
 
             order_request: OrderRequest = OrderRequest(
                 symbol=alpaca_symbol,
@@ -557,25 +730,22 @@ def alpaca_submit_market_order_custom_amount(
 def alpaca_close_all_holdings_of_asset(
     symbol: str,
     account: str = alpaca_trading_account_name_live,
-) -> None:
+) -> Order | None:
     print("Alpaca Order Begin - alpaca_close_all_holdings_of_asset")
     log_times_in_new_york_and_local_timezone()
-    credentials: AlpacaAccountCredentials | None = alpaca_get_credentials(
-        account
-    )
-
-    if credentials:
-        trading_client: TradingClient = TradingClient(
-            api_key=credentials["key"],
-            secret_key=credentials["secret"],
-            paper=credentials["paper"],
-        )
+    trading_client: TradingClient | None = alpaca_get_trading_client(account)
 
+    if trading_client:
         print("Alpaca Order End - alpaca_close_all_holdings_of_asset")
 
         try:
-            trading_client.close_position(symbol)
+            order_response: Order | RawData = trading_client.close_position(
+                symbol
+            )
             print(f"Submitted request to close all holdings of {symbol}")
+            return order_response
 
         except Exception as e:
             print(f"An error occurred: {e}")
+
+    return None
@@ -0,0 +1,158 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict
+
+from chalicelib.src.exchanges.alpaca.alpaca_account_utils import (
+    alpaca_get_account_balance,
+    alpaca_get_available_asset_balance,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_constants import (
+    alpaca_preflight_deadline_seconds,
+    alpaca_trading_account_name_live,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_order_history_utils import (
+    alpaca_check_last_filled_order_type,
+    alpaca_create_order_history_snapshot,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_orders_helper import (
+    alpaca_is_asset_fractionable,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_quote_utils import (
+    alpaca_create_quote_snapshot,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_types import (
+    AlpacaOrderHistorySnapshot,
+    AlpacaPreflightData,
+    AlpacaQuoteSnapshot,
+)
+
+
+def alpaca_run_preflight_reads(
+    reads: Dict[str, Callable[[], Any]],
+    deadline_seconds: float = alpaca_preflight_deadline_seconds,
+) -> Dict[str, Any]:
+    """
+    Run independent reads concurrently and collect the results that are
+    ready before the deadline. A read that fails or misses the deadline is
+    returned as None, so the caller can fetch it again when it is needed.
+    Each call has its own worker per read, so reads of alerts traded at the
+    same time by a batch or fan-out never queue behind each other, and a
+    read left running past the deadline only holds its own thread
+
+    Parameters:
+    - reads: Functions without arguments to run, keyed by result name
+    - deadline_seconds: Time to wait for all reads to complete
+
+    Returns:
+    - A dictionary with the result of each read, keyed by result name
+    """
+
+    start_time: float = time.monotonic()
+    preflight_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+        max_workers=max(len(reads), 1),
+        thread_name_prefix="alpaca-preflight",
+    )
+    futures: Dict[str, Future] = {
+        name: preflight_executor.submit(read) for name, read in reads.items()
+    }
+    wait(futures.values(), timeout=deadline_seconds)
+    # Late reads are not waited for, their threads exit once they return
+    preflight_executor.shutdown(wait=False, cancel_futures=True)
+
+    results: Dict[str, Any] = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            print(f"Pre-flight read {name} missed the deadline")
+            results[name] = None
+        elif future.exception():
+            print(f"Pre-flight read {name} failed: {future.exception()}")
+            results[name] = None
+        else:
+            results[name] = future.result()
+
+    print(
+        "Pre-flight reads completed in",
+        f"{time.monotonic() - start_time:.3f}s",
+    )
+    return results
+
+
+def alpaca_gather_preflight_data(
+    alpaca_symbol: str,
+    alpaca_inverse_symbol: str,
+    account: str = alpaca_trading_account_name_live,
+    deadline_seconds: float = alpaca_preflight_deadline_seconds,
+    include_order_history: bool = True,
+) -> AlpacaPreflightData:
+    """
+    Fetch everything a pair trade alert needs before placing orders in one
+    concurrent stage, so the alert waits for the slowest read instead of the
+    sum of all of them
+
+    Parameters:
+    - alpaca_symbol: Symbol of the leg to open eg. AAPL
+    - alpaca_inverse_symbol: Symbol of the inverse leg to close
+    - account: Account to read from
+    - deadline_seconds: Time to wait for all reads to complete
+    - include_order_history: Read the order history of the inverse leg, not
+    needed when the held leg is known from the position state
+
+    Returns:
+    - A AlpacaPreflightData object, with None for reads that did not complete
+    """
+
+    reads: Dict[str, Callable[[], Any]] = {
+        "inverse_asset_balance": lambda: (
+            alpaca_get_available_asset_balance(alpaca_inverse_symbol, account)
+        ),
+        "account_balance": lambda: alpaca_get_account_balance(
+            account_name=account
+        ),
+        "quote_snapshot": lambda: alpaca_create_quote_snapshot(
+            [alpaca_symbol, alpaca_inverse_symbol], account
+        ),
+        "fractionable": lambda: alpaca_is_asset_fractionable(
+            alpaca_symbol, account
+        ),
+    }
+    if include_order_history:
+        reads["order_history"] = lambda: alpaca_create_order_history_snapshot(
+            alpaca_inverse_symbol, account
+        )
+    results: Dict[str, Any] = alpaca_run_preflight_reads(
+        reads, deadline_seconds
+    )
+
+    # The order history snapshot is shared with the profit/loss calculation
+    order_history: AlpacaOrderHistorySnapshot | None = results.get(
+        "order_history"
+    )
+    # Quotes of both legs are fetched in one request, and reused by the
+    # orders of the alert
+    quote_snapshot: AlpacaQuoteSnapshot | None = results["quote_snapshot"]
+    return {
+        "order_history": order_history,
+        "last_filled_order_side": (
+            alpaca_check_last_filled_order_type(
+                alpaca_inverse_symbol,
+                account,
+                snapshot=order_history,
+            )
+            if order_history
+            else None
+        ),
+        "inverse_asset_balance": results["inverse_asset_balance"],
+        "account_balance": (
+            results["account_balance"]
+            if isinstance(results["account_balance"], dict)
+            else None
+        ),
+        "quote_snapshot": quote_snapshot,
+        "latest_quote": (
+            quote_snapshot["quotes"].get(alpaca_symbol)
+            if quote_snapshot
+            else None
+        ),
+        "fractionable": results["fractionable"],
+    }
@@ -0,0 +1,858 @@
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from threading import Lock
+from typing import Any, Callable, Dict, List
+
+from alpaca.common import RawData
+from alpaca.common.enums import Sort
+from alpaca.data import Quote
+from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.models import BarSet, QuoteSet
+from alpaca.data.requests import (
+    StockBarsRequest,
+    StockLatestQuoteRequest,
+    StockQuotesRequest,
+)
+from alpaca.data.timeframe import TimeFrame
+from chalicelib.src.exchanges.alpaca.alpaca_account_utils import (
+    alpaca_get_credentials,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_constants import (
+    alpaca_quote_cache_max_age_ms,
+    alpaca_quote_hedge_delay_seconds,
+    alpaca_quote_hedged,
+    alpaca_quote_lookback_days,
+    alpaca_quote_max_age_seconds,
+    alpaca_quote_max_workers,
+    alpaca_quote_timeout_seconds,
+    alpaca_trading_account_name_live,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_types import (
+    AlpacaAccountCredentials,
+    AlpacaCachedQuote,
+    AlpacaGetLatestQuote,
+    AlpacaQuoteSnapshot,
+    AlpacaQuoteSourceStats,
+)
+
+# Quote sources, in order of preference. The bar source has no bid/ask and
+# is only used when neither quote source has a usable one
+alpaca_quote_source_latest: str = "latest_quote"
+alpaca_quote_source_quotes: str = "stock_quotes"
+alpaca_quote_source_bars: str = "stock_bars"
+
+# Worker threads shared by every quote request of the Lambda container
+alpaca_quote_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=alpaca_quote_max_workers,
+    thread_name_prefix="alpaca-quote",
+)
+
+# Market data clients, one per account and paper flag
+alpaca_data_clients: Dict[tuple[str, bool], StockHistoricalDataClient] = {}
+alpaca_data_clients_lock: Lock = Lock()
+
+# Quotes shared by every alert of the Lambda container, keyed by symbol.
+# A symbol being fetched has a future in the in-flight requests, which
+# concurrent lookups of the symbol wait on instead of fetching it again
+alpaca_quote_cache: Dict[str, AlpacaCachedQuote] = {}
+alpaca_quote_requests_in_flight: Dict[str, Future] = {}
+alpaca_quote_cache_lock: Lock = Lock()
+
+# Hit counts and latency of each quote source, kept for the lifetime of the
+# Lambda container
+alpaca_quote_source_stats: Dict[str, AlpacaQuoteSourceStats] = {}
+alpaca_quote_source_stats_lock: Lock = Lock()
+
+
+def alpaca_round_quote_price(price: Any) -> Decimal:
+    """
+    Round a quote price to cents
+
+    Parameters:
+    - price: Price returned by Alpaca
+
+    Returns:
+    - A Decimal rounded to two decimal places
+    """
+
+    return Decimal(price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def alpaca_format_quote_timestamp(timestamp: Any) -> str | None:
+    """
+    Format the exchange timestamp of a quote or bar
+
+    Parameters:
+    - timestamp: Timestamp returned by Alpaca
+
+    Returns:
+    - A string in ISO format, or None if there is no timestamp
+    """
+
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, datetime):
+        return timestamp.isoformat()
+    return str(timestamp)
+
+
+def alpaca_fetch_latest_quote(
+    client: StockHistoricalDataClient, symbol: str
+) -> AlpacaGetLatestQuote | None:
+    """
+    Get the latest quote of an asset
+
+    Parameters:
+    - client: Market data client
+    - symbol: Symbol to get the quote of
+
+    Returns:
+    - A AlpacaGetLatestQuote object, or None if it has no bid or ask
+    """
+
+    request_params_latest: StockLatestQuoteRequest = StockLatestQuoteRequest(
+        symbol_or_symbols=[symbol]
+    )
+    latest_quote: Dict[str, Quote] | RawData = client.get_stock_latest_quote(
+        request_params_latest
+    )
+    print("latest quote", latest_quote)
+
+    symbol_quote_latest: Quote | Any = latest_quote[symbol]
+    if not (
+        symbol_quote_latest.bid_price > 0 or symbol_quote_latest.ask_price > 0
+    ):
+        return None
+
+    quote: AlpacaGetLatestQuote = {
+        "ask_price": alpaca_round_quote_price(symbol_quote_latest.ask_price),
+        "bid_price": alpaca_round_quote_price(symbol_quote_latest.bid_price),
+        "ask_size": symbol_quote_latest.ask_size,
+        "bid_size": symbol_quote_latest.bid_size,
+        "timestamp": alpaca_format_quote_timestamp(
+            symbol_quote_latest.timestamp
+        ),
+    }
+    print("Quote Method 1 - Latest quote found:", quote)
+    return quote
+
+
+def alpaca_fetch_recent_quote(
+    client: StockHistoricalDataClient, symbol: str
+) -> AlpacaGetLatestQuote | None:
+    """
+    Get the most recent historical quote of an asset
+
+    Parameters:
+    - client: Market data client
+    - symbol: Symbol to get the quote of
+
+    Returns:
+    - A AlpacaGetLatestQuote object, or None if it has no bid and ask
+    """
+
+    # Without a start and descending sort the oldest quote of the day is
+    # returned
+    request_params_quotes: StockQuotesRequest = StockQuotesRequest(
+        symbol_or_symbols=[symbol],
+        start=datetime.now(timezone.utc)
+        - timedelta(days=alpaca_quote_lookback_days),
+        limit=1,
+        sort=Sort.DESC,
+    )
+    quotes: QuoteSet | RawData = client.get_stock_quotes(request_params_quotes)
+    recent_quote: Any = quotes[symbol][0]
+    if not (recent_quote.bid_price and recent_quote.ask_price):
+        return None
+
+    quote: AlpacaGetLatestQuote = {
+        "ask_price": alpaca_round_quote_price(recent_quote.ask_price),
+        "bid_price": alpaca_round_quote_price(recent_quote.bid_price),
+        "ask_size": recent_quote.ask_size,
+        "bid_size": recent_quote.bid_size,
+        "timestamp": alpaca_format_quote_timestamp(recent_quote.timestamp),
+    }
+    print("Quote Method 2 - Most recent Stock Quote:", quote)
+    return quote
+
+
+def alpaca_fetch_bar_quote(
+    client: StockHistoricalDataClient, symbol: str
+) -> AlpacaGetLatestQuote | None:
+    """
+    Build a quote from the close of the latest minute bar of an asset
+
+    Parameters:
+    - client: Market data client
+    - symbol: Symbol to get the quote of
+
+    Returns:
+    - A AlpacaGetLatestQuote object with the close as bid and ask price
+    """
+
+    bar_request_params: StockBarsRequest = StockBarsRequest(
+        symbol_or_symbols=[symbol],
+        timeframe=TimeFrame.Minute,
+        start=datetime.now(timezone.utc)
+        - timedelta(days=alpaca_quote_lookback_days),
+        limit=1,
+        sort=Sort.DESC,
+    )
+    bars: BarSet | RawData = client.get_stock_bars(bar_request_params)
+    bar: Any = bars[symbol][0]
+    quote: AlpacaGetLatestQuote = {
+        "ask_price": alpaca_round_quote_price(bar.close),
+        "bid_price": alpaca_round_quote_price(bar.close),
+        "close_price": Decimal(bar.close),
+        "volume": bar.volume,
+        "timestamp": alpaca_format_quote_timestamp(bar.timestamp),
+    }
+    print("Quote Method 3 - Latest historical bar close minute price:", quote)
+    return quote
+
+
+alpaca_quote_sources: Dict[
+    str,
+    Callable[[StockHistoricalDataClient, str], AlpacaGetLatestQuote | None],
+] = {
+    alpaca_quote_source_latest: alpaca_fetch_latest_quote,
+    alpaca_quote_source_quotes: alpaca_fetch_recent_quote,
+    alpaca_quote_source_bars: alpaca_fetch_bar_quote,
+}
+
+
+def alpaca_get_quote_age_seconds(quote: AlpacaGetLatestQuote) -> float | None:
+    """
+    Age of a quote, from its exchange timestamp
+
+    Parameters:
+    - quote: Quote to get the age of
+
+    Returns:
+    - A float with the age in seconds, or None if the quote has no timestamp
+    """
+
+    try:
+        timestamp: datetime = datetime.fromisoformat(quote["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - timestamp).total_seconds()
+
+
+def alpaca_select_newest_quote(
+    quotes: Dict[str, AlpacaGetLatestQuote],
+) -> str:
+    """
+    Pick the quote with the newest timestamp. Ties and quotes without a
+    timestamp go to the source earliest in the order of preference
+
+    Parameters:
+    - quotes: Usable quotes keyed by source
+
+    Returns:
+    - A string with the source of the selected quote
+    """
+
+    sources: List[str] = [
+        source for source in alpaca_quote_sources if source in quotes
+    ]
+    ages: Dict[str, float] = {}
+    for source in sources:
+        age_seconds: float | None = alpaca_get_quote_age_seconds(
+            quotes[source]
+        )
+        ages[source] = float("inf") if age_seconds is None else age_seconds
+    return min(sources, key=lambda source: ages[source])
+
+
+def alpaca_record_quote_source(
+    source: str,
+    latency_seconds: float,
+    hit: bool = False,
+    error: bool = False,
+    selected: bool = False,
+) -> None:
+    """
+    Add a request, or the selection of its quote, to the stats of a source
+
+    Parameters:
+    - source: Quote source, a key of alpaca_quote_sources
+    - latency_seconds: Duration of the request
+    - hit: The request returned a usable quote
+    - error: The request raised an error
+    - selected: The quote of the source was returned to the caller
+    """
+
+    with alpaca_quote_source_stats_lock:
+        stats: AlpacaQuoteSourceStats = alpaca_quote_source_stats.setdefault(
+            source,
+            {
+                "requests": 0,
+                "hits": 0,
+                "errors": 0,
+                "selected": 0,
+                "total_latency_seconds": 0.0,
+                "max_latency_seconds": 0.0,
+            },
+        )
+        if selected:
+            stats["selected"] += 1
+            return
+        stats["requests"] += 1
+        stats["hits"] += int(hit)
+        stats["errors"] += int(error)
+        stats["total_latency_seconds"] += latency_seconds
+        stats["max_latency_seconds"] = max(
+            stats["max_latency_seconds"], latency_seconds
+        )
+
+
+def alpaca_get_quote_source_stats() -> Dict[str, AlpacaQuoteSourceStats]:
+    """
+    Get a copy of the hit counts and latency of each quote source
+
+    Returns:
+    - A dictionary of AlpacaQuoteSourceStats indexed by source
+    """
+
+    with alpaca_quote_source_stats_lock:
+        return {
+            source: dict(stats)
+            for source, stats in alpaca_quote_source_stats.items()
+        }
+
+
+def alpaca_clear_quote_source_stats() -> None:
+    """
+    Reset the stats of every quote source
+    """
+
+    with alpaca_quote_source_stats_lock:
+        alpaca_quote_source_stats.clear()
+
+
+def alpaca_run_quote_source(
+    source: str, client: StockHistoricalDataClient, symbol: str
+) -> AlpacaGetLatestQuote | None:
+    """
+    Request a quote from one source and record its hit and latency
+
+    Parameters:
+    - source: Quote source, a key of alpaca_quote_sources
+    - client: Market data client
+    - symbol: Symbol to get the quote of
+
+    Returns:
+    - A AlpacaGetLatestQuote object, or None if the source has no quote
+    """
+
+    start_time: float = time.monotonic()
+    try:
+        quote: AlpacaGetLatestQuote | None = alpaca_quote_sources[source](
+            client, symbol
+        )
+    except Exception:
+        alpaca_record_quote_source(
+            source, time.monotonic() - start_time, error=True
+        )
+        raise
+
+    alpaca_record_quote_source(
+        source, time.monotonic() - start_time, hit=quote is not None
+    )
+    return quote
+
+
+def alpaca_retrieve_quote_serial(
+    client: StockHistoricalDataClient,
+    symbol: str,
+    include_latest: bool = True,
+) -> AlpacaGetLatestQuote | Dict[str, str]:
+    """
+    Request the quote sources one after another, in order of preference
+
+    Parameters:
+    - client: Market data client
+    - symbol: Symbol to get the quote of
+    - include_latest: Request the latest quote, skipped when a batched
+    latest quote request already had no quote for the symbol
+
+    Returns:
+    - A AlpacaGetLatestQuote object, or a dictionary with the error
+    """
+
+    try:
+        for source in alpaca_quote_sources:
+            if source == alpaca_quote_source_latest and not include_latest:
+                continue
+            quote: AlpacaGetLatestQuote | None = alpaca_run_quote_source(
+                source, client, symbol
+            )
+            if quote is not None:
+                alpaca_record_quote_source(source, 0, selected=True)
+                return quote
+    except Exception as e:
+        print(f"An error occurred while fetching data for {symbol}: {e}")
+        return {"error": str(e)}
+
+    return {"error": f"No quote found for {symbol}"}
+
+
+def alpaca_retrieve_quote_hedged(
+    client: StockHistoricalDataClient,
+    symbol: str,
+    hedge_delay_seconds: float = alpaca_quote_hedge_delay_seconds,
+    timeout_seconds: float = alpaca_quote_timeout_seconds,
+    include_latest: bool = True,
+) -> AlpacaGetLatestQuote | Dict[str, str]:
+    """
+    Request the latest quote, and the fallback sources in parallel once it
+    has not answered with a usable bid/ask after the hedge delay. The latest
+    quote is preferred, a fallback bid/ask is returned ahead of it only when
+    it is younger than the max quote age, and quotes that are both in are
+    compared by timestamp. A bar close is returned only if no source has a
+    bid/ask. Requests still running are left to finish in the background
+
+    Parameters:
+    - client: Market data client
+    - symbol: Symbol to get the quote of
+    - hedge_delay_seconds: Head start of the latest quote request
+    - timeout_seconds: Time to wait for a usable quote
+    - include_latest: Request the latest quote, otherwise the fallback
+    sources are requested straight away
+
+    Returns:
+    - A AlpacaGetLatestQuote object, or a dictionary with the error
+    """
+
+    deadline: float = time.monotonic() + timeout_seconds
+    pending_sources: Dict[Future, str] = {}
+    if include_latest:
+        pending_sources[
+            alpaca_quote_executor.submit(
+                alpaca_run_quote_source,
+                alpaca_quote_source_latest,
+                client,
+                symbol,
+            )
+        ] = alpaca_quote_source_latest
+        wait(pending_sources, hedge_delay_seconds, return_when=FIRST_COMPLETED)
+
+    hedged: bool = False
+    quotes: Dict[str, AlpacaGetLatestQuote] = {}
+    bar_quote: AlpacaGetLatestQuote | None = None
+    error: str | None = None
+    while pending_sources or not hedged:
+        done_futures: set[Future] = {
+            future for future in pending_sources if future.done()
+        }
+        for future in done_futures:
+            source: str = pending_sources.pop(future)
+            try:
+                quote: AlpacaGetLatestQuote | None = future.result()
+            except Exception as e:
+                print(f"Quote source {source} failed for {symbol}: {e}")
+                error = str(e)
+                continue
+            if quote is None:
+                continue
+            if source == alpaca_quote_source_bars:
+                bar_quote = quote
+                continue
+            quotes[source] = quote
+
+        latest_pending: bool = (
+            alpaca_quote_source_latest in pending_sources.values()
+        )
+        fallback_is_recent: bool = any(
+            (age_seconds := alpaca_get_quote_age_seconds(quote)) is not None
+            and age_seconds <= alpaca_quote_max_age_seconds
+            for quote in quotes.values()
+        )
+        if quotes and (
+            alpaca_quote_source_latest in quotes
+            or not latest_pending
+            or fallback_is_recent
+        ):
+            selected_source: str = alpaca_select_newest_quote(quotes)
+            alpaca_record_quote_source(selected_source, 0, selected=True)
+            return quotes[selected_source]
+
+        if not hedged:
+            hedged = True
+            for source in (
+                alpaca_quote_source_quotes,
+                alpaca_quote_source_bars,
+            ):
+                pending_sources[
+                    alpaca_quote_executor.submit(
+                        alpaca_run_quote_source, source, client, symbol
+                    )
+                ] = source
+
+        remaining_seconds: float = deadline - time.monotonic()
+        if remaining_seconds <= 0:
+            break
+        wait(pending_sources, remaining_seconds, return_when=FIRST_COMPLETED)
+
+    if quotes:
+        selected_source = alpaca_select_newest_quote(quotes)
+        alpaca_record_quote_source(selected_source, 0, selected=True)
+        return quotes[selected_source]
+    if bar_quote is not None:
+        alpaca_record_quote_source(alpaca_quote_source_bars, 0, selected=True)
+        return bar_quote
+    return {"error": error or f"No quote found for {symbol}"}
+
+
+def alpaca_get_data_client(
+    account: str = alpaca_trading_account_name_live,
+) -> StockHistoricalDataClient | None:
+    """
+    Retrieves a warm market data client for an account, creating it on
+    first use
+
+    Parameters:
+    - account: Account whose keys are used for market data
+
+    Returns:
+    - A StockHistoricalDataClient, or None if no credentials are found
+    """
+
+    credentials: AlpacaAccountCredentials = alpaca_get_credentials(account)
+    if not credentials:
+        print("No credentials available.")
+        return None
+
+    client_key: tuple[str, bool] = (account, credentials["paper"])
+    with alpaca_data_clients_lock:
+        data_client: StockHistoricalDataClient | None = (
+            alpaca_data_clients.get(client_key)
+        )
+        if data_client is None:
+            data_client = StockHistoricalDataClient(
+                api_key=credentials["key"], secret_key=credentials["secret"]
+            )
+            alpaca_data_clients[client_key] = data_client
+
+    return data_client
+
+
+def alpaca_fetch_latest_quotes(
+    client: StockHistoricalDataClient, symbols: List[str]
+) -> Dict[str, AlpacaGetLatestQuote]:
+    """
+    Get the latest quotes of several assets in one request
+
+    Parameters:
+    - client: Market data client
+    - symbols: Symbols to get the quotes of
+
+    Returns:
+    - A dictionary of AlpacaGetLatestQuote indexed by symbol, without the
+    symbols that have no bid or ask
+    """
+
+    request_params_latest: StockLatestQuoteRequest = StockLatestQuoteRequest(
+        symbol_or_symbols=symbols
+    )
+    latest_quotes: Dict[str, Quote] | RawData = client.get_stock_latest_quote(
+        request_params_latest
+    )
+    print("latest quotes", latest_quotes)
+
+    quotes: Dict[str, AlpacaGetLatestQuote] = {}
+    for symbol in symbols:
+        symbol_quote_latest: Quote | Any = latest_quotes.get(symbol)
+        if symbol_quote_latest is None or not (
+            symbol_quote_latest.bid_price > 0
+            or symbol_quote_latest.ask_price > 0
+        ):
+            continue
+        quotes[symbol] = {
+            "ask_price": alpaca_round_quote_price(
+                symbol_quote_latest.ask_price
+            ),
+            "bid_price": alpaca_round_quote_price(
+                symbol_quote_latest.bid_price
+            ),
+            "ask_size": symbol_quote_latest.ask_size,
+            "bid_size": symbol_quote_latest.bid_size,
+            "timestamp": alpaca_format_quote_timestamp(
+                symbol_quote_latest.timestamp
+            ),
+        }
+    return quotes
+
+
+def alpaca_get_latest_quotes(
+    symbols: List[str],
+    account: str = alpaca_trading_account_name_live,
+    hedged: bool = alpaca_quote_hedged,
+) -> Dict[str, AlpacaGetLatestQuote | Dict[str, str]]:
+    """
+    Get the latest quotes of several assets with one latest quote request.
+    Symbols without a latest quote are retrieved from the backup methods,
+    a single symbol is retrieved like alpaca_get_latest_quote
+
+    Parameters:
+    - symbols: Symbols to get the quotes of
+    - account: Account to use to get the quotes
+    - hedged: Request the backup methods of a symbol in parallel
+
+    Returns:
+    - A dictionary indexed by symbol, of AlpacaGetLatestQuote objects or
+    dictionaries with the error
+    """
+
+    unique_symbols: List[str] = list(dict.fromkeys(symbols))
+    if not unique_symbols:
+        return {}
+
+    client: StockHistoricalDataClient | None = alpaca_get_data_client(account)
+    if client is None:
+        return {symbol: {"error": "No credentials"} for symbol in symbols}
+
+    # A single symbol keeps the head start of its latest quote request
+    if len(unique_symbols) == 1:
+        symbol: str = unique_symbols[0]
+        return {
+            symbol: (
+                alpaca_retrieve_quote_hedged(client, symbol)
+                if hedged
+                else alpaca_retrieve_quote_serial(client, symbol)
+            )
+        }
+
+    start_time: float = time.monotonic()
+    try:
+        quotes: Dict[str, AlpacaGetLatestQuote | Dict[str, str]] = (
+            alpaca_fetch_latest_quotes(client, unique_symbols)
+        )
+        alpaca_record_quote_source(
+            alpaca_quote_source_latest,
+            time.monotonic() - start_time,
+            hit=bool(quotes),
+        )
+    except Exception as e:
+        print(f"An error occurred while fetching latest quotes: {e}")
+        alpaca_record_quote_source(
+            alpaca_quote_source_latest,
+            time.monotonic() - start_time,
+            error=True,
+        )
+        quotes = {}
+
+    for symbol in unique_symbols:
+        if symbol in quotes:
+            alpaca_record_quote_source(
+                alpaca_quote_source_latest, 0, selected=True
+            )
+        elif hedged:
+            quotes[symbol] = alpaca_retrieve_quote_hedged(
+                client, symbol, include_latest=False
+            )
+        else:
+            quotes[symbol] = alpaca_retrieve_quote_serial(
+                client, symbol, include_latest=False
+            )
+    return quotes
+
+
+def alpaca_get_cached_quotes(
+    symbols: List[str],
+    account: str = alpaca_trading_account_name_live,
+    hedged: bool = alpaca_quote_hedged,
+    max_age_ms: int = alpaca_quote_cache_max_age_ms,
+) -> Dict[str, AlpacaGetLatestQuote | Dict[str, str]]:
+    """
+    Get the latest quotes of several assets from the process-wide quote
+    cache. Quotes older than the max age are fetched in one request, and a
+    symbol already being fetched by another alert waits for that request
+
+    Parameters:
+    - symbols: Symbols to get the quotes of
+    - account: Account to use if the quotes have to be fetched
+    - hedged: Request the backup methods of a symbol in parallel
+    - max_age_ms: Age in milliseconds after which a quote is fetched again
+
+    Returns:
+    - A dictionary indexed by symbol, of AlpacaGetLatestQuote objects or
+    dictionaries with the error
+    """
+
+    quotes: Dict[str, AlpacaGetLatestQuote | Dict[str, str]] = {}
+    shared_requests: Dict[str, Future] = {}
+    symbols_to_fetch: List[str] = []
+
+    with alpaca_quote_cache_lock:
+        for symbol in dict.fromkeys(symbols):
+            cached_quote: AlpacaCachedQuote | None = alpaca_quote_cache.get(
+                symbol
+            )
+            if (
+                cached_quote is not None
+                and (time.monotonic() - cached_quote["fetched_at"]) * 1000
+                <= max_age_ms
+            ):
+                quotes[symbol] = cached_quote["quote"]
+            elif symbol in alpaca_quote_requests_in_flight:
+                shared_requests[symbol] = alpaca_quote_requests_in_flight[
+                    symbol
+                ]
+            else:
+                alpaca_quote_requests_in_flight[symbol] = Future()
+                symbols_to_fetch.append(symbol)
+
+    if symbols_to_fetch:
+        fetched_quotes: Dict[str, AlpacaGetLatestQuote | Dict[str, str]] = {}
+        try:
+            fetched_quotes = alpaca_get_latest_quotes(
+                symbols_to_fetch, account, hedged
+            )
+        except Exception as e:
+            print(f"An error occurred while fetching quotes: {e}")
+            fetched_quotes = {
+                symbol: {"error": str(e)} for symbol in symbols_to_fetch
+            }
+        finally:
+            fetched_at: float = time.monotonic()
+            with alpaca_quote_cache_lock:
+                for symbol in symbols_to_fetch:
+                    quote: AlpacaGetLatestQuote | Dict[str, str] = (
+                        fetched_quotes.get(
+                            symbol, {"error": f"No quote found for {symbol}"}
+                        )
+                    )
+                    if "error" not in quote:
+                        alpaca_quote_cache[symbol] = {
+                            "quote": quote,
+                            "fetched_at": fetched_at,
+                        }
+                    alpaca_quote_requests_in_flight.pop(symbol).set_result(
+                        quote
+                    )
+                    quotes[symbol] = quote
+
+    for symbol, shared_request in shared_requests.items():
+        quotes[symbol] = shared_request.result()
+
+    return quotes
+
+
+def alpaca_clear_quote_cache() -> None:
+    """
+    Drop every cached quote so the next lookup fetches it
+    """
+
+    with alpaca_quote_cache_lock:
+        alpaca_quote_cache.clear()
+
+
+def alpaca_log_quote_used(
+    decision: str,
+    symbol: str,
+    latest_quote: AlpacaGetLatestQuote | Dict[str, str] | None,
+) -> None:
+    """
+    Print the quote a sizing decision was based on, with its timestamp
+
+    Parameters:
+    - decision: Sizing decision eg. limit price, quantity
+    - symbol: Symbol of the order
+    - latest_quote: Quote used for the decision
+    """
+
+    quote: Dict[str, Any] = latest_quote or {}
+    print(
+        f"{decision} for {symbol} uses quote timestamp",
+        quote.get("timestamp"),
+        "bid",
+        quote.get("bid_price"),
+        "ask",
+        quote.get("ask_price"),
+    )
+
+
+def alpaca_create_quote_snapshot(
+    symbols: List[str],
+    account: str = alpaca_trading_account_name_live,
+    max_age_seconds: float = alpaca_quote_max_age_seconds,
+) -> AlpacaQuoteSnapshot:
+    """
+    Fetch the quotes of the symbols of an alert, eg. both legs of a pair,
+    to be reused by the orders of the alert
+
+    Parameters:
+    - symbols: Symbols to get the quotes of
+    - account: Account to use to get the quotes
+    - max_age_seconds: Age after which a quote is fetched again
+
+    Returns:
+    - A AlpacaQuoteSnapshot object with the usable quotes
+    """
+
+    snapshot: AlpacaQuoteSnapshot = {
+        "account": account,
+        "quotes": {},
+        "loaded_at": {},
+        "max_age_seconds": max_age_seconds,
+    }
+    alpaca_merge_quotes_into_snapshot(
+        snapshot, alpaca_get_cached_quotes(symbols, account)
+    )
+    return snapshot
+
+
+def alpaca_merge_quotes_into_snapshot(
+    snapshot: AlpacaQuoteSnapshot,
+    quotes: Dict[str, AlpacaGetLatestQuote | Dict[str, str]],
+) -> None:
+    """
+    Add the usable quotes to a snapshot, quotes holding an error are skipped
+
+    Parameters:
+    - snapshot: Quote snapshot of the alert
+    - quotes: Quotes indexed by symbol
+    """
+
+    loaded_at: float = time.monotonic()
+    for symbol, quote in quotes.items():
+        if quote and "error" not in quote:
+            snapshot["quotes"][symbol] = quote
+            snapshot["loaded_at"][symbol] = loaded_at
+
+
+def alpaca_get_snapshot_quote(
+    snapshot: AlpacaQuoteSnapshot, symbol: str
+) -> AlpacaGetLatestQuote | None:
+    """
+    Look up the quote of a symbol in a snapshot. A missing quote, or one
+    older than the max age of the snapshot, is fetched again
+
+    Parameters:
+    - snapshot: Quote snapshot of the alert
+    - symbol: Symbol to get the quote of
+
+    Returns:
+    - A AlpacaGetLatestQuote object, or None if no quote could be fetched
+    """
+
+    loaded_at: float | None = snapshot["loaded_at"].get(symbol)
+    if (
+        loaded_at is None
+        or time.monotonic() - loaded_at > snapshot["max_age_seconds"]
+    ):
+        alpaca_merge_quotes_into_snapshot(
+            snapshot, alpaca_get_cached_quotes([symbol], snapshot["account"])
+        )
+    return snapshot["quotes"].get(symbol)
@@ -0,0 +1,129 @@
+from chalice import Blueprint
+from chalice.app import Request, SQSEvent
+from chalicelib.src.alerts.alerts_constants import (
+    alert_exchange_alpaca,
+    alert_queue_names,
+    alert_tax_queue_names,
+)
+from chalicelib.src.alerts.alerts_types import AlertJob
+from chalicelib.src.alerts.alerts_utils import (
+    execute_alert_job_message,
+    submit_alert,
+)
+
+# Alpaca routes, registered by the combined orders app and deployed on their
+# own by the orders-alpaca unit (see scripts/build_deployment_units.py).
+# Exchange modules are imported on first use to keep cold starts short
+alpaca_routes: Blueprint = Blueprint(__name__)
+
+# SQS queue workers, registered only when ALERT_INTAKE_MODE is sqs so sync
+# and local deployments do not need the queues to exist
+alpaca_workers: Blueprint = Blueprint(__name__)
+
+
+@alpaca_routes.route("/alpacapairtradebuyalert", methods=["POST"])
+def alpaca_pair_trade_buy_alert():
+    request = alpaca_routes.current_request
+    tradingViewWebhookMessage = request.json_body
+    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+    alert_job: AlertJob = submit_alert(
+        alert_exchange_alpaca, tradingViewWebhookMessage
+    )
+
+    return {
+        "message": "alpacapairtradebuyalert - alert received",
+        "alertJobId": alert_job["job_id"],
+        "tradingViewWebhookMessage": tradingViewWebhookMessage,
+    }
+
+
+@alpaca_routes.route("/alpacapairtradesellalert", methods=["POST"])
+def alpaca_pair_trade_sell_alert():
+    request = alpaca_routes.current_request
+    tradingViewWebhookMessage = request.json_body
+    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+    alert_job: AlertJob = submit_alert(
+        alert_exchange_alpaca, tradingViewWebhookMessage, buy_alert=False
+    )
+
+    return {
+        "message": "alpacapairtradesellalert - alert received",
+        "alertJobId": alert_job["job_id"],
+        "tradingViewWebhookMessage": tradingViewWebhookMessage,
+    }
+
+
+# Worker of the alert queue. The queue is FIFO and grouped per pair, so a
+# pair is never traded by two workers at once
+@alpaca_workers.on_sqs_message(queue=alert_queue_names[alert_exchange_alpaca])
+def alpaca_alert_queue_worker(event: SQSEvent):
+    for record in event:
+        execute_alert_job_message(record.body)
+
+
+# Worker of the tax queue. Saving a task twice keeps one ledger row, so
+# retried messages do not double count tax
+@alpaca_workers.on_sqs_message(
+    queue=alert_tax_queue_names[alert_exchange_alpaca]
+)
+def alpaca_tax_queue_worker(event: SQSEvent):
+    from chalicelib.src.exchanges.alpaca.alpaca_tax_utils import (
+        alpaca_run_tax_task_message,
+    )
+
+    for record in event:
+        alpaca_run_tax_task_message(record.body)
+
+
+@alpaca_routes.route("/testcronjobschedule", methods=["POST"])
+def alpaca_pair_price_check_at_next_interval():
+    from chalicelib.src.exchanges.alpaca.alpaca_cron_jobs import (
+        alpaca_schedule_price_check_at_next_interval_cron_job,
+    )
+
+    request: Request | None = alpaca_routes.current_request
+    tradingViewWebhookMessage = request.json_body
+    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+    alpaca_schedule_price_check_at_next_interval_cron_job(
+        tradingViewWebhookMessage["ticker"],
+        tradingViewWebhookMessage["closePrice"],
+        tradingViewWebhookMessage["interval"],
+    )
+
+    return {
+        "message": "alpaca_schedule_price_check_at_next_interval_cron_job - cron job scheduled",  # noqa: E501
+        "tradingViewWebhookMessage": tradingViewWebhookMessage,
+    }
+
+
+# @alpaca_routes.route("/alpacapairtradebuyalertnotax", methods=["POST"])
+# def alpaca_pair_trade_buy_alert_no_tax():
+#     request = alpaca_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     alpaca_submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         calculate_tax=False,
+#     )
+
+#     return {
+#         "message": "alpacapairtradebuyalertnotax - alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @alpaca_routes.route("/alpacapairtradesellalertnotax", methods=["POST"])
+# def alpaca_pair_trade_sell_alert_no_tax():
+#     request = alpaca_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     alpaca_submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         calculate_tax=False,
+#         buy_alert=False,
+#     )
+
+#     return {
+#         "message": "alpacapairtradesellalertnotax - alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
@@ -0,0 +1,269 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+from chalicelib.src.alerts.alerts_constants import (
+    alert_exchange_alpaca,
+    alert_intake_mode_sqs,
+    alert_tax_queue_names,
+)
+from chalicelib.src.alerts.alerts_utils import (
+    get_alert_intake_mode,
+    get_alert_sqs_client,
+)
+from chalicelib.src.aws.aws_constants import dynamodb_table_names_instance
+from chalicelib.src.aws.aws_types import AWSDynamoDbPendingTaxTask
+from chalicelib.src.aws.aws_utils import (
+    delete_pending_tax_task,
+    get_stale_pending_tax_tasks,
+    save_CGT_amount_to_dynamoDB,
+    save_pending_tax_task,
+)
+from chalicelib.src.constants import capital_gains_tax_rate, local_tz
+from chalicelib.src.exchanges.alpaca.alpaca_constants import (
+    alpaca_exchange_name,
+    alpaca_trading_account_name_live,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_orders_helper import (
+    alpaca_calculate_profit_loss,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_types import (
+    AlpacaGetAccountBalance,
+    AlpacaOrderHistorySnapshot,
+    AlpacaTaxTask,
+)
+
+# URL of the tax queue, looked up on first use
+alpaca_tax_queue_url: str | None = None
+
+
+def alpaca_create_tax_task(
+    symbol: str,
+    account: str = alpaca_trading_account_name_live,
+    snapshot: AlpacaOrderHistorySnapshot | None = None,
+) -> AlpacaTaxTask:
+    """
+    Calculate the capital gains of a closed leg when it is closed. The tax
+    amount is held back from the balance used to size the opening leg, and
+    only saving it to DynamoDB is deferred. The transaction date keys the
+    ledger row, so a task that is saved twice saves the tax once
+
+    Parameters:
+    - symbol: Symbol of the closed leg
+    - account: Account the leg was closed on
+    - snapshot: Order history snapshot of the alert, loaded if not given
+
+    Returns:
+    - A AlpacaTaxTask object that can be serialised to JSON
+    """
+
+    profit_loss_amount: Decimal = alpaca_calculate_profit_loss(
+        symbol, account, snapshot=snapshot
+    )
+    tax_amount: Decimal = Decimal(profit_loss_amount) * Decimal(
+        capital_gains_tax_rate
+    )
+    print("tax_amount", tax_amount, "\n")
+
+    return {
+        "symbol": symbol,
+        "account": account,
+        "transaction_date": datetime.now(local_tz).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        ),
+        "tax_amount": str(tax_amount),
+    }
+
+
+def alpaca_reserve_tax_task(
+    account_balance: AlpacaGetAccountBalance,
+    tax_task: AlpacaTaxTask,
+) -> AlpacaGetAccountBalance:
+    """
+    Hold the tax of a closed leg back from an account balance. The balance
+    only subtracts the tax already saved to DynamoDB, so a task that is not
+    saved yet is subtracted here
+
+    Parameters:
+    - account_balance: Balance returned by alpaca_get_account_balance
+    - tax_task: Tax task of the closed leg
+
+    Returns:
+    - A AlpacaGetAccountBalance object with the tax subtracted
+    """
+
+    tax_amount: Decimal = Decimal(tax_task["tax_amount"])
+    if tax_amount <= 0:
+        return account_balance
+
+    return {
+        **account_balance,
+        "account_equity": account_balance["account_equity"] - tax_amount,
+        "account_cash": account_balance["account_cash"] - tax_amount,
+    }
+
+
+def alpaca_get_tax_task_key(tax_task: AlpacaTaxTask) -> str:
+    """
+    Key of the pending item of a tax task
+
+    Parameters:
+    - tax_task: Tax task of the closed leg
+
+    Returns:
+    - A string with the TaskKey eg. live#QQQ#2024-01-02 15:30:00
+    """
+
+    return (
+        f"{tax_task['account']}#{tax_task['symbol']}#"
+        f"{tax_task['transaction_date']}"
+    )
+
+
+def alpaca_persist_tax_task(tax_task: AlpacaTaxTask) -> bool:
+    """
+    Save a tax task as pending before the opening leg is submitted, so the
+    tax is not lost if the alert fails before the task is saved or queued.
+    Errors are printed, the orders are placed either way
+
+    Parameters:
+    - tax_task: Tax task of the closed leg
+
+    Returns:
+    - A Boolean, true if the task is pending
+    """
+
+    if Decimal(tax_task["tax_amount"]) <= 0:
+        return False
+
+    try:
+        save_pending_tax_task(
+            alpaca_exchange_name,
+            alpaca_get_tax_task_key(tax_task),
+            json.dumps(tax_task),
+        )
+    except Exception as e:
+        print(f"Error saving pending tax task: {e}", tax_task)
+        return False
+    return True
+
+
+def alpaca_run_tax_task(tax_task: AlpacaTaxTask) -> Decimal:
+    """
+    Save the capital gains of a tax task to DynamoDB, if there is tax to
+    pay, and mark the pending task done
+
+    Parameters:
+    - tax_task: Tax task of the closed leg
+
+    Returns:
+    - A Decimal with the tax amount
+    """
+
+    tax_amount: Decimal = Decimal(tax_task["tax_amount"])
+    if tax_amount > 0:
+        save_CGT_amount_to_dynamoDB(
+            asset=tax_task["symbol"],
+            profit=tax_amount,
+            transaction_date=tax_task["transaction_date"],
+            table_name=dynamodb_table_names_instance.alpaca_markets_profits,
+        )
+        delete_pending_tax_task(
+            alpaca_exchange_name, alpaca_get_tax_task_key(tax_task)
+        )
+    return tax_amount
+
+
+def alpaca_run_stale_tax_tasks() -> int:
+    """
+    Run the pending tax tasks that an alert or the tax queue did not
+    complete. Saving a task twice keeps one ledger row, so a task that is
+    still in flight is not double counted. Errors are printed
+
+    Returns:
+    - An integer with the number of tasks saved
+    """
+
+    pending_tax_tasks: list[AWSDynamoDbPendingTaxTask] = (
+        get_stale_pending_tax_tasks(alpaca_exchange_name)
+    )
+    saved_count: int = 0
+    for pending_tax_task in pending_tax_tasks:
+        try:
+            alpaca_run_tax_task(json.loads(pending_tax_task["Task"]))
+            saved_count += 1
+        except Exception as e:
+            print(
+                "Error saving pending tax task",
+                pending_tax_task["TaskKey"],
+                e,
+            )
+    return saved_count
+
+
+def alpaca_run_tax_task_message(message_body: str) -> None:
+    """
+    Save the tax task of a queue message. Errors are raised, so SQS retries
+    the message
+
+    Parameters:
+    - message_body: JSON body of the message, see alpaca_send_tax_task_to_sqs
+    """
+
+    alpaca_run_tax_task(json.loads(message_body))
+
+
+def alpaca_send_tax_task_to_sqs(tax_task: AlpacaTaxTask) -> str:
+    """
+    Send a tax task to the tax queue
+
+    Parameters:
+    - tax_task: Tax task to send
+
+    Returns:
+    - A string with the SQS message id
+    """
+
+    global alpaca_tax_queue_url
+
+    sqs_client: Any = get_alert_sqs_client()
+    if alpaca_tax_queue_url is None:
+        alpaca_tax_queue_url = sqs_client.get_queue_url(
+            QueueName=alert_tax_queue_names[alert_exchange_alpaca]
+        )["QueueUrl"]
+    response: dict[str, Any] = sqs_client.send_message(
+        QueueUrl=alpaca_tax_queue_url, MessageBody=json.dumps(tax_task)
+    )
+    return response["MessageId"]
+
+
+def alpaca_defer_tax_task(tax_task: AlpacaTaxTask) -> None:
+    """
+    Hand off a tax task once the opening leg is submitted. In sqs intake
+    mode the task is queued for the tax queue worker, and saved here if it
+    cannot be queued. Otherwise it is saved here. A task that is not saved
+    stays pending, see alpaca_persist_tax_task, and is run by a later alert.
+    Errors are printed, the orders are already placed
+
+    Parameters:
+    - tax_task: Tax task of the closed leg
+    """
+
+    queued: bool = False
+    if get_alert_intake_mode() == alert_intake_mode_sqs:
+        try:
+            message_id: str = alpaca_send_tax_task_to_sqs(tax_task)
+            print(f"Tax task for {tax_task['symbol']} queued as {message_id}")
+            queued = True
+        except Exception as e:
+            print(f"Error queueing tax task, saving it now: {e}")
+
+    if not queued:
+        try:
+            alpaca_run_tax_task(tax_task)
+        except Exception as e:
+            print(f"Error saving tax for {tax_task['symbol']}: {e}", tax_task)
+
+    # Tasks left pending by earlier alerts are run once the orders are placed
+    alpaca_run_stale_tax_tasks()
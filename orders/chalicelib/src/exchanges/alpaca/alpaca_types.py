@@ -1,8 +1,9 @@
 from decimal import Decimal
-from typing import TypedDict
+from typing import Dict, List, TypedDict
 
 from alpaca.common import RawData
-from alpaca.trading.models import TradeAccount
+from alpaca.trading.enums import OrderSide
+from alpaca.trading.models import Order, TradeAccount
 
 
 class AlpacaAccountCredentials(TypedDict):
@@ -29,3 +30,55 @@ class AlpacaGetLatestQuote(TypedDict):
     bid_price: Decimal
     ask_size: float
     bid_size: float
+    timestamp: str | None
+
+
+class AlpacaAssetMetadata(TypedDict):
+    symbol: str
+    fractionable: bool
+    tradable: bool
+
+
+class AlpacaOrderHistorySnapshot(TypedDict):
+    symbol: str
+    account: str
+    orders: List[Order]
+    complete: bool
+
+
+class AlpacaCachedQuote(TypedDict):
+    quote: AlpacaGetLatestQuote
+    fetched_at: float
+
+
+class AlpacaQuoteSnapshot(TypedDict):
+    account: str
+    quotes: Dict[str, AlpacaGetLatestQuote]
+    loaded_at: Dict[str, float]
+    max_age_seconds: float
+
+
+class AlpacaPreflightData(TypedDict):
+    order_history: AlpacaOrderHistorySnapshot | None
+    last_filled_order_side: OrderSide | str | None
+    inverse_asset_balance: AlpacaAvailableAssetBalance | None
+    account_balance: AlpacaGetAccountBalance | None
+    quote_snapshot: AlpacaQuoteSnapshot | None
+    latest_quote: AlpacaGetLatestQuote | None
+    fractionable: bool | None
+
+
+class AlpacaTaxTask(TypedDict):
+    symbol: str
+    account: str
+    transaction_date: str
+    tax_amount: str
+
+
+class AlpacaQuoteSourceStats(TypedDict):
+    requests: int
+    hits: int
+    errors: int
+    selected: int
+    total_latency_seconds: float
+    max_latency_seconds: float
@@ -1,11 +1,14 @@
 import datetime
 from decimal import Decimal
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 import requests_mock
 from chalicelib.src.exchanges.alpaca.alpaca_account_utils import (
     alpaca_get_credentials,
+    alpaca_get_trading_client,
+    alpaca_holds_asset_position,
+    alpaca_invalidate_trading_clients,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_constants import (
     alpaca_trading_account_name_live,
@@ -49,6 +52,44 @@ def test_alpaca_get_credentials(
     assert result == expected
 
 
+@patch(
+    "chalicelib.src.exchanges.alpaca.alpaca_account_utils.alpaca_accounts",
+    new=mock_alpaca_accounts,
+)
+def test_alpaca_get_trading_client_reuses_client_until_invalidated():
+    alpaca_invalidate_trading_clients()
+
+    first_client = alpaca_get_trading_client(alpaca_trading_account_name_live)
+    second_client = alpaca_get_trading_client(alpaca_trading_account_name_live)
+    assert first_client is second_client
+
+    alpaca_invalidate_trading_clients(alpaca_trading_account_name_live)
+    rebuilt_client = alpaca_get_trading_client(
+        alpaca_trading_account_name_live
+    )
+    assert rebuilt_client is not first_client
+
+    assert alpaca_get_trading_client("non_existent_account") is None
+
+
+def test_alpaca_holds_asset_position(mocker):
+    mock_trading_client = mocker.patch(
+        "chalicelib.src.exchanges.alpaca.alpaca_account_utils.alpaca_get_trading_client"  # noqa: E501
+    ).return_value
+    mock_trading_client.get_all_positions.return_value = [
+        MagicMock(symbol="AAPL", qty="2"),
+        MagicMock(symbol="SQQQ", qty="0"),
+    ]
+
+    assert alpaca_holds_asset_position("AAPL") is True
+    assert alpaca_holds_asset_position("SQQQ") is False
+    assert alpaca_holds_asset_position("TQQQ") is False
+
+    # A failed read is not mistaken for a missing position
+    mock_trading_client.get_all_positions.side_effect = Exception("Timeout")
+    assert alpaca_holds_asset_position("AAPL") is None
+
+
 @pytest.fixture
 def mock_alpaca_get_credentials(mocker):
     return mocker.patch(
@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from chalicelib.src.exchanges.alpaca import alpaca_asset_utils
+from chalicelib.src.exchanges.alpaca.alpaca_asset_utils import (
+    alpaca_clear_asset_metadata,
+    alpaca_get_asset_metadata,
+    alpaca_load_asset_metadata,
+)
+
+
+@pytest.fixture
+def mock_trading_client(mocker):
+    client = MagicMock()
+    client.get_all_assets.return_value = [
+        MagicMock(symbol="AAPL", fractionable=True, tradable=True),
+        MagicMock(symbol="BRK.A", fractionable=False, tradable=True),
+    ]
+    mocker.patch(
+        "chalicelib.src.exchanges.alpaca.alpaca_asset_utils.alpaca_get_trading_client",  # noqa: E501
+        return_value=client,
+    )
+    alpaca_clear_asset_metadata()
+    yield client
+    alpaca_clear_asset_metadata()
+
+
+def test_alpaca_load_asset_metadata_indexes_bulk_listing(
+    mock_trading_client, tmp_path
+):
+    file_path = str(tmp_path / "assets.json")
+
+    asset_metadata = alpaca_load_asset_metadata(file_path=file_path)
+    alpaca_load_asset_metadata(file_path=file_path)
+
+    mock_trading_client.get_all_assets.assert_called_once()
+    assert asset_metadata["AAPL"]["fractionable"] is True
+    assert asset_metadata["BRK.A"]["fractionable"] is False
+
+    with open(file_path) as metadata_file:
+        assert "AAPL" in json.load(metadata_file)["assets"]
+
+
+def test_alpaca_load_asset_metadata_reuses_persisted_file(
+    mock_trading_client, tmp_path
+):
+    file_path = tmp_path / "assets.json"
+    file_path.write_text(
+        json.dumps(
+            {
+                "loaded_at": time.time(),
+                "assets": {
+                    "TSLA": {
+                        "symbol": "TSLA",
+                        "fractionable": True,
+                        "tradable": True,
+                    }
+                },
+            }
+        )
+    )
+
+    asset_metadata = alpaca_load_asset_metadata(file_path=str(file_path))
+
+    mock_trading_client.get_all_assets.assert_not_called()
+    assert asset_metadata["TSLA"]["fractionable"] is True
+
+
+def test_alpaca_load_asset_metadata_reloads_after_ttl(
+    mock_trading_client, tmp_path
+):
+    file_path = str(tmp_path / "assets.json")
+
+    alpaca_load_asset_metadata(file_path=file_path)
+    alpaca_asset_utils.alpaca_asset_metadata_loaded_at -= 120
+    alpaca_load_asset_metadata(ttl_seconds=60, file_path=file_path + ".new")
+
+    assert mock_trading_client.get_all_assets.call_count == 2
+
+
+def test_alpaca_get_asset_metadata(mock_trading_client, tmp_path):
+    alpaca_load_asset_metadata(file_path=str(tmp_path / "assets.json"))
+
+    assert alpaca_get_asset_metadata("AAPL")["fractionable"] is True
+    assert alpaca_get_asset_metadata("UNKNOWN") is None
+    mock_trading_client.get_all_assets.assert_called_once()
+
+
+def test_alpaca_load_asset_metadata_backs_off_after_failure(
+    mock_trading_client, tmp_path
+):
+    file_path = str(tmp_path / "assets.json")
+    mock_trading_client.get_all_assets.side_effect = Exception("Timeout")
+
+    assert alpaca_load_asset_metadata(file_path=file_path) == {}
+    assert alpaca_load_asset_metadata(file_path=file_path) == {}
+    mock_trading_client.get_all_assets.assert_called_once()
+
+    # The listing is retried once the retry delay has passed
+    mock_trading_client.get_all_assets.side_effect = None
+    alpaca_asset_utils.alpaca_asset_metadata_failed_at -= 120
+    asset_metadata = alpaca_load_asset_metadata(
+        file_path=file_path, retry_seconds=60
+    )
+
+    assert mock_trading_client.get_all_assets.call_count == 2
+    assert "AAPL" in asset_metadata
+
+
+def test_alpaca_load_asset_metadata_does_not_wait_on_listing(
+    mock_trading_client, tmp_path
+):
+    file_path = str(tmp_path / "assets.json")
+    listing_started = threading.Event()
+    release_listing = threading.Event()
+    assets = mock_trading_client.get_all_assets.return_value
+
+    def slow_listing(request):
+        listing_started.set()
+        release_listing.wait(5)
+        return assets
+
+    mock_trading_client.get_all_assets.side_effect = slow_listing
+    loader = threading.Thread(
+        target=alpaca_load_asset_metadata, kwargs={"file_path": file_path}
+    )
+    loader.start()
+    listing_started.wait(5)
+
+    # A concurrent caller answers from the index already loaded
+    start_time = time.monotonic()
+    assert alpaca_load_asset_metadata(file_path=file_path) == {}
+    assert time.monotonic() - start_time < 1
+
+    release_listing.set()
+    loader.join(5)
+    assert "AAPL" in alpaca_load_asset_metadata(file_path=file_path)
+    mock_trading_client.get_all_assets.assert_called_once()
@@ -1,3 +1,18 @@
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from alpaca.trading.enums import OrderSide
+from chalicelib.src.exchanges.alpaca.alpaca_order_history_utils import (
+    alpaca_check_last_filled_order_type,
+    alpaca_create_order_history_snapshot,
+    alpaca_merge_orders_into_snapshot,
+)
+from chalicelib.src.exchanges.alpaca.alpaca_orders_helper import (
+    alpaca_calculate_profit_loss,
+)
+
 # import pytest
 # import requests_mock
 # from chalicelib.src.exchanges.alpaca.alpaca_order_history_utils import (
@@ -47,3 +62,61 @@
 # #     )
 
 # #     assert result == expected_result
+
+
+def mock_filled_order(order_id, side, filled_qty, filled_avg_price, day):
+    return MagicMock(
+        id=order_id,
+        side=side,
+        filled_qty=filled_qty,
+        filled_avg_price=filled_avg_price,
+        submitted_at=datetime(2024, 3, day),
+    )
+
+
+@pytest.fixture
+def mock_trading_client(mocker):
+    return mocker.patch(
+        "chalicelib.src.exchanges.alpaca.alpaca_order_history_utils.alpaca_get_trading_client"  # noqa: E501
+    ).return_value
+
+
+def test_alpaca_check_last_filled_order_type_reads_snapshot(
+    mock_trading_client,
+):
+    mock_trading_client.get_orders.return_value = [
+        mock_filled_order("3", OrderSide.SELL, "0", None, 3),
+        mock_filled_order("2", OrderSide.BUY, "10", "150", 2),
+    ]
+    snapshot = alpaca_create_order_history_snapshot("AAPL")
+
+    # An unfilled order is skipped, and the snapshot is not fetched again
+    assert alpaca_check_last_filled_order_type("AAPL", snapshot=snapshot) == (
+        OrderSide.BUY
+    )
+    mock_trading_client.get_orders.assert_called_once()
+    assert snapshot["complete"] is True
+
+
+def test_alpaca_calculate_profit_loss_pages_older_buys(mock_trading_client):
+    first_page = [
+        mock_filled_order("4", OrderSide.BUY, "5", "110", 4),
+        mock_filled_order("3", OrderSide.BUY, "5", "100", 3),
+    ]
+    older_page = [mock_filled_order("2", OrderSide.BUY, "10", "90", 2)]
+    mock_trading_client.get_orders.side_effect = [first_page, older_page]
+    snapshot = alpaca_create_order_history_snapshot("AAPL", limit=2)
+
+    # The closing fill is recorded without fetching the history again
+    alpaca_merge_orders_into_snapshot(
+        snapshot, [mock_filled_order("5", OrderSide.SELL, "15", "120", 5)]
+    )
+    profit_loss = alpaca_calculate_profit_loss("AAPL", snapshot=snapshot)
+
+    # Most recent buys first: 5 @ 110, 5 @ 100, then 5 of 10 @ 90
+    assert profit_loss == Decimal("15") * 120 - (550 + 500 + 450)
+    assert mock_trading_client.get_orders.call_count == 2
+    assert (
+        mock_trading_client.get_orders.call_args.args[0].until
+        == first_page[-1].submitted_at
+    )
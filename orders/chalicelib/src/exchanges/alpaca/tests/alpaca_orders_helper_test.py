@@ -5,9 +5,10 @@ from unittest.mock import MagicMock, patch
 import pytest
 import requests_mock
 from alpaca.trading.client import TradingClient
-from alpaca.trading.enums import OrderSide
+from alpaca.trading.enums import OrderSide, OrderStatus
 from chalicelib.src.exchanges.alpaca.alpaca_orders_helper import (
     alpaca_calculate_profit_loss,
+    alpaca_wait_for_order_fill,
 )
 from chalicelib.src.exchanges.alpaca.alpaca_types import (
     AlpacaAccountCredentials,
@@ -167,3 +168,39 @@ def alpaca_calculate_profit_loss_test_not_enough_buy_orders(
         ValueError, match="Not enough buy orders to match the sell quantity."
     ):
         alpaca_calculate_profit_loss("AAPL")
+
+
+@patch("chalicelib.src.exchanges.alpaca.alpaca_orders_helper.time.sleep")
+@patch(
+    "chalicelib.src.exchanges.alpaca.alpaca_orders_helper.alpaca_get_trading_client"  # noqa: E501
+)
+def test_alpaca_wait_for_order_fill(mock_get_trading_client, mock_sleep):
+    """Polls the order with a growing interval until it is filled."""
+    mock_get_trading_client.return_value.get_order_by_id.side_effect = [
+        MagicMock(status=OrderStatus.NEW),
+        MagicMock(status=OrderStatus.PARTIALLY_FILLED),
+        MagicMock(status=OrderStatus.FILLED),
+    ]
+
+    order = alpaca_wait_for_order_fill(
+        "order-id", initial_poll_seconds=0.1, poll_backoff=2
+    )
+
+    assert order.status is OrderStatus.FILLED
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.1, 0.2]
+
+
+@patch(
+    "chalicelib.src.exchanges.alpaca.alpaca_orders_helper.alpaca_get_trading_client"  # noqa: E501
+)
+def test_alpaca_wait_for_order_fill_timeout(mock_get_trading_client):
+    """Returns the open order once the timeout is reached."""
+    mock_get_trading_client.return_value.get_order_by_id.return_value = (
+        MagicMock(status=OrderStatus.NEW)
+    )
+
+    order = alpaca_wait_for_order_fill(
+        "order-id", timeout_seconds=0.05, initial_poll_seconds=0.01
+    )
+
+    assert order.status is OrderStatus.NEW
@@ -0,0 +1,134 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from alpaca.trading.enums import OrderSide
+from chalicelib.src.exchanges.alpaca.alpaca_preflight_utils import (
+    alpaca_gather_preflight_data,
+    alpaca_run_preflight_reads,
+)
+
+
+def test_alpaca_run_preflight_reads_runs_reads_concurrently():
+    def slow_read(value):
+        time.sleep(0.2)
+        return value
+
+    start_time = time.monotonic()
+    results = alpaca_run_preflight_reads(
+        {
+            "first": lambda: slow_read(1),
+            "second": lambda: slow_read(2),
+            "third": lambda: slow_read(3),
+        }
+    )
+
+    assert results == {"first": 1, "second": 2, "third": 3}
+    assert time.monotonic() - start_time < 0.5
+
+
+def test_alpaca_run_preflight_reads_drops_late_and_failed_reads():
+    def failing_read():
+        raise ValueError("Service unavailable")
+
+    results = alpaca_run_preflight_reads(
+        {
+            "fast": lambda: "ready",
+            "slow": lambda: time.sleep(1),
+            "failing": failing_read,
+        },
+        deadline_seconds=0.1,
+    )
+
+    assert results == {"fast": "ready", "slow": None, "failing": None}
+
+
+def test_alpaca_run_preflight_reads_concurrent_callers():
+    def slow_read(value):
+        time.sleep(0.2)
+        return value
+
+    def run_alert_reads(alert_index):
+        return alpaca_run_preflight_reads(
+            {
+                "hung": lambda: time.sleep(1),
+                "first": lambda: slow_read(alert_index),
+                "second": lambda: slow_read(alert_index),
+            },
+            deadline_seconds=0.5,
+        )
+
+    # Alerts of a batch run their reads at the same time, and reads left
+    # running by one alert do not delay the reads of the others
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as alert_executor:
+        results = list(alert_executor.map(run_alert_reads, range(8)))
+
+    assert results == [
+        {"hung": None, "first": alert_index, "second": alert_index}
+        for alert_index in range(8)
+    ]
+    assert time.monotonic() - start_time < 0.9
+
+
+def test_alpaca_gather_preflight_data(mocker):
+    module = "chalicelib.src.exchanges.alpaca.alpaca_preflight_utils"
+    order_history = {
+        "symbol": "SQQQ",
+        "account": "live",
+        "orders": [MagicMock(side=OrderSide.BUY, filled_qty="2")],
+        "complete": True,
+    }
+    mocker.patch(
+        f"{module}.alpaca_create_order_history_snapshot",
+        return_value=order_history,
+    )
+    mocker.patch(
+        f"{module}.alpaca_get_available_asset_balance",
+        return_value={"position_qty": "2"},
+    )
+    mocker.patch(
+        f"{module}.alpaca_get_account_balance",
+        return_value="Account balance not found",
+    )
+    mocker.patch(
+        f"{module}.alpaca_create_quote_snapshot",
+        side_effect=Exception("No credentials"),
+    )
+    mocker.patch(f"{module}.alpaca_is_asset_fractionable", return_value=True)
+
+    preflight_data = alpaca_gather_preflight_data("AAPL", "SQQQ")
+
+    assert preflight_data == {
+        "order_history": order_history,
+        "last_filled_order_side": OrderSide.BUY,
+        "inverse_asset_balance": {"position_qty": "2"},
+        "account_balance": None,
+        "quote_snapshot": None,
+        "latest_quote": None,
+        "fractionable": True,
+    }
+
+    # Quotes of both legs are fetched together, the quote of the leg to
+    # open is passed through to sizing
+    quote = {"ask_price": Decimal("10.00"), "bid_price": Decimal("9.99")}
+    mock_quote_snapshot = mocker.patch(
+        f"{module}.alpaca_create_quote_snapshot",
+        return_value={"quotes": {"AAPL": quote}},
+    )
+    assert alpaca_gather_preflight_data("AAPL", "SQQQ")["latest_quote"] == (
+        quote
+    )
+    mock_quote_snapshot.assert_called_once_with(["AAPL", "SQQQ"], "live")
+
+    # A known held leg skips the order history read
+    mock_snapshot = mocker.patch(
+        f"{module}.alpaca_create_order_history_snapshot"
+    )
+    preflight_data = alpaca_gather_preflight_data(
+        "AAPL", "SQQQ", include_order_history=False
+    )
+    mock_snapshot.assert_not_called()
+    assert preflight_data["order_history"] is None
+    assert preflight_data["last_filled_order_side"] is None
@@ -0,0 +1,278 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from chalicelib.src.exchanges.alpaca.alpaca_quote_utils import (
+    alpaca_clear_quote_cache,
+    alpaca_clear_quote_source_stats,
+    alpaca_create_quote_snapshot,
+    alpaca_fetch_recent_quote,
+    alpaca_get_cached_quotes,
+    alpaca_get_quote_source_stats,
+    alpaca_get_snapshot_quote,
+    alpaca_retrieve_quote_hedged,
+    alpaca_retrieve_quote_serial,
+)
+
+module = "chalicelib.src.exchanges.alpaca.alpaca_quote_utils"
+
+
+def mock_quote(price, age_seconds=None):
+    quote = {
+        "ask_price": Decimal(price),
+        "bid_price": Decimal(price),
+        "ask_size": 1,
+        "bid_size": 1,
+    }
+    if age_seconds is not None:
+        quote["timestamp"] = (
+            datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+        ).isoformat()
+    return quote
+
+
+def mock_source(result, delay=0.0, calls=None):
+    def fetch_quote(client, symbol):
+        if calls is not None:
+            calls.append(result)
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return fetch_quote
+
+
+@pytest.fixture(autouse=True)
+def clear_quote_state(mocker):
+    quote_executor = ThreadPoolExecutor(max_workers=6)
+    mocker.patch(f"{module}.alpaca_quote_executor", quote_executor)
+    alpaca_clear_quote_source_stats()
+    alpaca_clear_quote_cache()
+    yield
+    # Hedged requests left running finish before the next test reads stats
+    quote_executor.shutdown(wait=True)
+    alpaca_clear_quote_source_stats()
+    alpaca_clear_quote_cache()
+
+
+def test_alpaca_retrieve_quote_hedged_takes_recent_fallback(mocker):
+    fallback_quote = mock_quote("11", age_seconds=1)
+    mocker.patch.dict(
+        f"{module}.alpaca_quote_sources",
+        {
+            "latest_quote": mock_source(mock_quote("10"), delay=0.5),
+            "stock_quotes": mock_source(fallback_quote, delay=0.05),
+            "stock_bars": mock_source(mock_quote("12"), delay=0.01),
+        },
+    )
+
+    start_time = time.monotonic()
+    quote = alpaca_retrieve_quote_hedged(None, "QQQ", hedge_delay_seconds=0.1)
+
+    # A bar close only answers when no source has a bid/ask
+    assert quote == fallback_quote
+    assert time.monotonic() - start_time < 0.3
+    stats = alpaca_get_quote_source_stats()
+    assert stats["stock_quotes"]["selected"] == 1
+    assert stats["stock_quotes"]["hits"] == 1
+    assert stats["stock_quotes"]["total_latency_seconds"] >= 0.05
+
+
+def test_alpaca_retrieve_quote_hedged_waits_for_latest_over_old_quote(
+    mocker,
+):
+    latest_quote = mock_quote("10", age_seconds=0)
+    mocker.patch.dict(
+        f"{module}.alpaca_quote_sources",
+        {
+            "latest_quote": mock_source(latest_quote, delay=0.2),
+            "stock_quotes": mock_source(
+                mock_quote("11", age_seconds=3600), delay=0.01
+            ),
+            "stock_bars": mock_source(mock_quote("12"), delay=0.01),
+        },
+    )
+
+    quote = alpaca_retrieve_quote_hedged(None, "QQQ", hedge_delay_seconds=0.1)
+
+    # An old fallback quote does not beat the latest quote
+    assert quote == latest_quote
+    assert alpaca_get_quote_source_stats()["latest_quote"]["selected"] == 1
+
+
+def test_alpaca_retrieve_quote_hedged_picks_newest_quote(mocker):
+    newer_quote = mock_quote("11", age_seconds=60)
+    mocker.patch.dict(
+        f"{module}.alpaca_quote_sources",
+        {
+            "latest_quote": mock_source(
+                mock_quote("10", age_seconds=600), delay=0.1
+            ),
+            "stock_quotes": mock_source(newer_quote),
+            "stock_bars": mock_source(None),
+        },
+    )
+
+    quote = alpaca_retrieve_quote_hedged(None, "QQQ", hedge_delay_seconds=0)
+
+    # The fallback quote is too old to answer alone, but newer than the
+    # latest quote once both are in
+    assert quote == newer_quote
+
+
+def test_alpaca_fetch_recent_quote_requests_newest_quote():
+    client = MagicMock()
+    client.get_stock_quotes.return_value = {
+        "QQQ": [
+            MagicMock(
+                ask_price=10.01,
+                bid_price=9.99,
+                ask_size=1,
+                bid_size=2,
+                timestamp=None,
+            )
+        ]
+    }
+
+    quote = alpaca_fetch_recent_quote(client, "QQQ")
+
+    request = client.get_stock_quotes.call_args.args[0]
+    assert request.sort == "desc"
+    assert request.limit == 1
+    # The request model stores the start as naive UTC
+    start = request.start.replace(tzinfo=timezone.utc)
+    assert start > datetime.now(timezone.utc) - timedelta(days=7)
+    assert quote["bid_price"] == Decimal("9.99")
+
+
+def test_alpaca_retrieve_quote_hedged_skips_fallbacks_on_time(mocker):
+    calls = []
+    mocker.patch.dict(
+        f"{module}.alpaca_quote_sources",
+        {
+            "latest_quote": mock_source(mock_quote("10"), calls=calls),
+            "stock_quotes": mock_source(mock_quote("11"), calls=calls),
+            "stock_bars": mock_source(mock_quote("12"), calls=calls),
+        },
+    )
+
+    assert alpaca_retrieve_quote_hedged(None, "QQQ") == mock_quote("10")
+    assert calls == [mock_quote("10")]
+
+
+def test_alpaca_retrieve_quote_hedged_falls_back_to_bar(mocker):
+    mocker.patch.dict(
+        f"{module}.alpaca_quote_sources",
+        {
+            "latest_quote": mock_source(None),
+            "stock_quotes": mock_source(ValueError("No quotes")),
+            "stock_bars": mock_source(mock_quote("12"), delay=0.05),
+        },
+    )
+
+    assert alpaca_retrieve_quote_hedged(None, "QQQ") == mock_quote("12")
+    stats = alpaca_get_quote_source_stats()
+    assert stats["latest_quote"]["hits"] == 0
+    assert stats["stock_quotes"]["errors"] == 1
+    assert stats["stock_bars"]["selected"] == 1
+
+
+def test_alpaca_retrieve_quote_serial_tries_sources_in_order(mocker):
+    calls = []
+    mocker.patch.dict(
+        f"{module}.alpaca_quote_sources",
+        {
+            "latest_quote": mock_source(None, calls=calls),
+            "stock_quotes": mock_source(mock_quote("11"), calls=calls),
+            "stock_bars": mock_source(mock_quote("12"), calls=calls),
+        },
+    )
+
+    assert alpaca_retrieve_quote_serial(None, "QQQ") == mock_quote("11")
+    assert calls == [None, mock_quote("11")]
+    assert alpaca_get_quote_source_stats()["latest_quote"]["requests"] == 1
+
+
+def test_alpaca_quote_snapshot_fetches_both_legs_in_one_request(mocker):
+    client = MagicMock()
+    client.get_stock_latest_quote.return_value = {
+        "QQQ": MagicMock(
+            ask_price=10.005, bid_price=9.99, ask_size=1, bid_size=2
+        ),
+        "SQQQ": MagicMock(ask_price=0, bid_price=0),
+    }
+    mocker.patch(f"{module}.alpaca_get_data_client", return_value=client)
+    mock_fallback = mocker.patch(
+        f"{module}.alpaca_retrieve_quote_hedged",
+        return_value=mock_quote("5"),
+    )
+
+    snapshot = alpaca_create_quote_snapshot(
+        ["QQQ", "SQQQ", "QQQ"], max_age_seconds=60
+    )
+
+    client.get_stock_latest_quote.assert_called_once()
+    request = client.get_stock_latest_quote.call_args.args[0]
+    assert request.symbol_or_symbols == ["QQQ", "SQQQ"]
+    # Only the symbol without a latest quote goes to the backup methods
+    mock_fallback.assert_called_once_with(client, "SQQQ", include_latest=False)
+    assert snapshot["quotes"]["QQQ"]["ask_price"] == Decimal("10.01")
+    assert snapshot["quotes"]["SQQQ"] == mock_quote("5")
+
+    # Quotes are reused for the rest of the alert
+    assert alpaca_get_snapshot_quote(snapshot, "QQQ")["bid_price"] == (
+        Decimal("9.99")
+    )
+    client.get_stock_latest_quote.assert_called_once()
+
+    # A quote older than the max age is fetched again, a single symbol
+    # with the hedged retrieval
+    snapshot["max_age_seconds"] = 0
+    alpaca_clear_quote_cache()
+    mock_fallback.return_value = mock_quote("10.5")
+    assert alpaca_get_snapshot_quote(snapshot, "QQQ") == mock_quote("10.5")
+    mock_fallback.assert_called_with(client, "QQQ")
+
+
+def test_alpaca_get_cached_quotes_shares_one_request_per_symbol(mocker):
+    calls = []
+
+    def slow_get_latest_quotes(symbols, account, hedged):
+        calls.append(symbols)
+        time.sleep(0.1)
+        return {symbol: mock_quote("10") for symbol in symbols}
+
+    mocker.patch(
+        f"{module}.alpaca_get_latest_quotes",
+        side_effect=slow_get_latest_quotes,
+    )
+
+    # Alerts of a bar close look up the same symbol at the same time
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(lambda _: alpaca_get_cached_quotes(["QQQ"]), range(4))
+        )
+
+    assert calls == [["QQQ"]]
+    assert results == [{"QQQ": mock_quote("10")}] * 4
+
+    # Fresh quotes are served from the cache, stale ones fetched again
+    alpaca_get_cached_quotes(["QQQ"])
+    assert len(calls) == 1
+    alpaca_get_cached_quotes(["QQQ", "SPY"], max_age_ms=0)
+    assert calls[1] == ["QQQ", "SPY"]
+
+
+def test_alpaca_get_cached_quotes_does_not_cache_errors(mocker):
+    mock_get_latest_quotes = mocker.patch(
+        f"{module}.alpaca_get_latest_quotes",
+        side_effect=[Exception("Timeout"), {"QQQ": mock_quote("10")}],
+    )
+
+    assert alpaca_get_cached_quotes(["QQQ"]) == {"QQQ": {"error": "Timeout"}}
+    assert alpaca_get_cached_quotes(["QQQ"]) == {"QQQ": mock_quote("10")}
+    assert mock_get_latest_quotes.call_count == 2
@@ -0,0 +1,171 @@
+import json
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from chalicelib.src.exchanges.alpaca import alpaca_tax_utils
+from chalicelib.src.exchanges.alpaca.alpaca_tax_utils import (
+    alpaca_create_tax_task,
+    alpaca_defer_tax_task,
+    alpaca_persist_tax_task,
+    alpaca_reserve_tax_task,
+    alpaca_run_stale_tax_tasks,
+    alpaca_run_tax_task,
+    alpaca_run_tax_task_message,
+)
+
+module = "chalicelib.src.exchanges.alpaca.alpaca_tax_utils"
+
+tax_task = {
+    "symbol": "QQQ",
+    "account": "live",
+    "transaction_date": "2024-01-02 15:30:00",
+    "tax_amount": "25",
+}
+
+
+@pytest.fixture(autouse=True)
+def mock_pending_tax_tasks(mocker):
+    return {
+        "save": mocker.patch(f"{module}.save_pending_tax_task"),
+        "delete": mocker.patch(f"{module}.delete_pending_tax_task"),
+        "get_stale": mocker.patch(
+            f"{module}.get_stale_pending_tax_tasks", return_value=[]
+        ),
+    }
+
+
+@pytest.fixture
+def mock_sqs_client(mocker):
+    sqs_client = MagicMock()
+    sqs_client.get_queue_url.return_value = {"QueueUrl": "tax-queue-url"}
+    sqs_client.send_message.return_value = {"MessageId": "1"}
+    mocker.patch(f"{module}.get_alert_sqs_client", return_value=sqs_client)
+    mocker.patch.object(alpaca_tax_utils, "alpaca_tax_queue_url", None)
+    return sqs_client
+
+
+def test_alpaca_create_tax_task_calculates_tax_at_close(mocker):
+    mock_calculate = mocker.patch(
+        f"{module}.alpaca_calculate_profit_loss", return_value=Decimal("100")
+    )
+    mocker.patch(f"{module}.capital_gains_tax_rate", Decimal("0.25"))
+    snapshot = {"symbol": "QQQ"}
+
+    created_task = alpaca_create_tax_task("QQQ", "live", snapshot)
+
+    mock_calculate.assert_called_once_with("QQQ", "live", snapshot=snapshot)
+    assert created_task["tax_amount"] == "25.00"
+    assert json.loads(json.dumps(created_task)) == created_task
+
+
+def test_alpaca_reserve_tax_task_holds_back_tax():
+    account_balance = {
+        "account": None,
+        "account_equity": Decimal("1000"),
+        "account_cash": Decimal("400"),
+    }
+
+    reserved_balance = alpaca_reserve_tax_task(account_balance, tax_task)
+    assert reserved_balance["account_equity"] == Decimal("975")
+    assert reserved_balance["account_cash"] == Decimal("375")
+    assert account_balance["account_equity"] == Decimal("1000")
+
+    # A loss has no tax to hold back
+    loss_task = {**tax_task, "tax_amount": "-10"}
+    assert alpaca_reserve_tax_task(account_balance, loss_task) == (
+        account_balance
+    )
+
+
+def test_alpaca_run_tax_task_saves_positive_tax(
+    mocker, mock_pending_tax_tasks
+):
+    mock_calculate = mocker.patch(f"{module}.alpaca_calculate_profit_loss")
+    mock_save = mocker.patch(f"{module}.save_CGT_amount_to_dynamoDB")
+
+    assert alpaca_run_tax_task(tax_task) == Decimal("25")
+    # The tax calculated at close is saved, the history is not read again
+    mock_calculate.assert_not_called()
+    # The date taken at close keys the row, so a rerun saves it once
+    assert mock_save.call_args.kwargs["transaction_date"] == (
+        "2024-01-02 15:30:00"
+    )
+    assert mock_save.call_args.kwargs["profit"] == Decimal("25")
+
+    # The pending task is marked done once the tax is saved
+    mock_pending_tax_tasks["delete"].assert_called_once_with(
+        "alpaca", "live#QQQ#2024-01-02 15:30:00"
+    )
+
+    alpaca_run_tax_task_message(json.dumps({**tax_task, "tax_amount": "0"}))
+    mock_save.assert_called_once()
+
+
+def test_alpaca_persist_tax_task_saves_pending_task(mock_pending_tax_tasks):
+    assert alpaca_persist_tax_task(tax_task)
+    exchange, task_key, task = mock_pending_tax_tasks["save"].call_args.args
+    assert (exchange, task_key) == ("alpaca", "live#QQQ#2024-01-02 15:30:00")
+    assert json.loads(task) == tax_task
+
+    # A loss has no tax to save
+    assert not alpaca_persist_tax_task({**tax_task, "tax_amount": "-10"})
+
+    # The orders are placed even if the task cannot be saved
+    mock_pending_tax_tasks["save"].side_effect = Exception("Throttled")
+    assert not alpaca_persist_tax_task(tax_task)
+
+
+def test_alpaca_run_stale_tax_tasks(mocker, mock_pending_tax_tasks):
+    mock_save = mocker.patch(
+        f"{module}.save_CGT_amount_to_dynamoDB",
+        side_effect=[None, ValueError("Throttled")],
+    )
+    mock_pending_tax_tasks["get_stale"].return_value = [
+        {"TaskKey": "1", "Task": json.dumps(tax_task)},
+        {"TaskKey": "2", "Task": json.dumps(tax_task)},
+    ]
+
+    # A task that fails again stays pending
+    assert alpaca_run_stale_tax_tasks() == 1
+    assert mock_save.call_count == 2
+    mock_pending_tax_tasks["delete"].assert_called_once()
+
+
+def test_alpaca_defer_tax_task_queues_in_sqs_mode(
+    mocker, monkeypatch, mock_sqs_client, mock_pending_tax_tasks
+):
+    monkeypatch.setenv("ALERT_INTAKE_MODE", "sqs")
+    mock_run = mocker.patch(f"{module}.alpaca_run_tax_task")
+
+    alpaca_defer_tax_task(tax_task)
+
+    mock_run.assert_not_called()
+    mock_sqs_client.get_queue_url.assert_called_once_with(
+        QueueName="orders-alpaca-tax-tasks"
+    )
+    message = mock_sqs_client.send_message.call_args.kwargs
+    assert message["QueueUrl"] == "tax-queue-url"
+    assert json.loads(message["MessageBody"]) == tax_task
+    # Tasks left pending by earlier alerts are run in every mode
+    mock_pending_tax_tasks["get_stale"].assert_called_once_with("alpaca")
+
+
+def test_alpaca_defer_tax_task_runs_inline_without_queue(
+    mocker, monkeypatch, mock_sqs_client, mock_pending_tax_tasks
+):
+    monkeypatch.setenv("ALERT_INTAKE_MODE", "sqs")
+    mock_sqs_client.send_message.side_effect = Exception("Queue unavailable")
+    mock_run = mocker.patch(
+        f"{module}.alpaca_run_tax_task", side_effect=ValueError("No orders")
+    )
+
+    # Errors are printed, the orders are already placed
+    alpaca_defer_tax_task(tax_task)
+    mock_run.assert_called_once_with(tax_task)
+
+    monkeypatch.delenv("ALERT_INTAKE_MODE")
+    alpaca_defer_tax_task(tax_task)
+    assert mock_run.call_count == 2
+    mock_sqs_client.send_message.assert_called_once()
+    assert mock_pending_tax_tasks["get_stale"].call_count == 2
@@ -1,3 +1,5 @@
+from threading import Lock
+
 from chalicelib.src.constants import development_mode
 from chalicelib.src.exchanges.bybit.bybit_constants import (
     bybit_account_type,
@@ -8,6 +10,13 @@ from chalicelib.src.exchanges.bybit.bybit_constants import (
 from chalicelib.src.exchanges.bybit.bybit_types import BybitAccountCredentials
 from pybit.unified_trading import HTTP
 
+# Warm HTTP sessions keyed by account name and testnet flag. Each session
+# holds a keep-alive connection pool and survives across warm Lambda
+# invocations. Public sessions, without API keys, use None as account name
+bybit_http_sessions: dict[tuple[str | None, bool], HTTP] = {}
+bybit_http_sessions_lock: Lock = Lock()
+bybit_http_session_counters: dict[str, int] = {"created": 0, "reused": 0}
+
 
 def bybit_get_credentials(
     account_name: str = bybit_trading_account_name_live,
@@ -40,6 +49,106 @@ def bybit_get_credentials(
         return None
 
 
+def bybit_get_cached_http_session(
+    session_key: tuple[str | None, bool],
+    credentials: BybitAccountCredentials | None = None,
+) -> HTTP:
+    """
+    Retrieves a session from the session registry, creating it on first use
+
+    Parameters:
+    - session_key: Account name, or None for a public session, and testnet
+    - credentials: API credentials of the account, None for a public session
+
+    Returns:
+    - A pybit HTTP session
+    """
+
+    with bybit_http_sessions_lock:
+        session: HTTP | None = bybit_http_sessions.get(session_key)
+        if session is not None:
+            bybit_http_session_counters["reused"] += 1
+            return session
+
+        session = (
+            HTTP(
+                testnet=credentials["testnet"],
+                api_key=credentials["api_key"],
+                api_secret=credentials["api_secret"],
+            )
+            if credentials
+            else HTTP(testnet=session_key[1])
+        )
+        bybit_http_sessions[session_key] = session
+        bybit_http_session_counters["created"] += 1
+        return session
+
+
+def bybit_get_http_session(
+    account_name: str = bybit_trading_account_name_live,
+    development_mode_toggle: bool = development_mode,
+) -> HTTP | None:
+    """
+    Retrieves a warm authenticated session for an account. Reusing the
+    session avoids a new connection and TLS handshake for every request
+
+    Parameters:
+    - account_name: The name of the account to trade with
+    - development_mode_toggle: Forcely enable development mode
+
+    Returns:
+    - A pybit HTTP session, or None if no credentials are found
+    """
+
+    credentials: BybitAccountCredentials = bybit_get_credentials(
+        account_name, development_mode_toggle
+    )
+    if not credentials:
+        return None
+
+    return bybit_get_cached_http_session(
+        (account_name, credentials["testnet"]), credentials
+    )
+
+
+def bybit_get_public_http_session(testnet: bool = False) -> HTTP:
+    """
+    Retrieves a warm session without API keys, for public market data
+
+    Parameters:
+    - testnet: Use testnet instead of mainnet
+
+    Returns:
+    - A pybit HTTP session
+    """
+
+    return bybit_get_cached_http_session((None, testnet))
+
+
+def bybit_get_http_session_counters() -> dict[str, int]:
+    """
+    Number of sessions created and reused since the container started
+
+    Returns:
+    - A dictionary with the created and reused counts
+    """
+
+    with bybit_http_sessions_lock:
+        return dict(bybit_http_session_counters)
+
+
+def bybit_clear_http_sessions() -> None:
+    """
+    Drops every cached session so the next request builds a new one, eg.
+    after API credentials have been rotated
+    """
+
+    with bybit_http_sessions_lock:
+        bybit_http_sessions.clear()
+        bybit_http_session_counters["created"] = 0
+        bybit_http_session_counters["reused"] = 0
+
+
 def bybit_get_coin_balance(
     coin: str,
     account_name: str = bybit_trading_account_name_live,
@@ -58,13 +167,10 @@ def bybit_get_coin_balance(
     or an error message as a string.
     """
 
-    # Initialise the HTTP client with Bybit's endpoint and API credentials
-    credentials: BybitAccountCredentials = bybit_get_credentials(account_name)
-    session: HTTP = HTTP(
-        testnet=credentials["testnet"],
-        api_key=credentials["api_key"],
-        api_secret=credentials["api_secret"],
-    )
+    # Reuse the warm HTTP session of the account
+    session: HTTP | None = bybit_get_http_session(account_name)
+    if session is None:
+        return "Error: Account credentials not found"
 
     # Fetch the wallet balance for the specified coin
     response = session.get_wallet_balance(
@@ -1,5 +1,8 @@
 from chalicelib.src.exchanges.bybit.bybit_types import BybitAccountCredentials
 
+# Exchange name used to key the position state of a pair
+bybit_exchange_name: str = "bybit"
+
 # Bybit Credentials
 bybit_trading_account_name_live: str = "live"
 
@@ -22,6 +25,18 @@ bybit_accounts: dict[str, dict[BybitAccountCredentials]] = {
 
 bybit_default_product_category: str = "spot"
 
+# Instrument table refresh, stale tables keep serving while a background
+# refresh runs
+bybit_instrument_cache_ttl_seconds: int = 60 * 60
+
+bybit_instrument_missing_symbol_reload_seconds: int = 60
+
+# Execution history pages, the first page answers side detection and most
+# profit/loss matches, older pages are only fetched when needed
+bybit_execution_page_size: int = 10
+
+bybit_execution_extend_page_size: int = 50
+
 # Bybit trading information
 bybit_preferred_stablecoin: str = "USDT"
 
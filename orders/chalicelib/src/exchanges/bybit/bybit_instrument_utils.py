@@ -0,0 +1,249 @@
+import time
+from decimal import Decimal
+from threading import Lock, Thread
+from typing import Any, Dict
+
+from chalicelib.src.exchanges.bybit.bybit_account_utils import (
+    bybit_get_credentials,
+    bybit_get_public_http_session,
+)
+from chalicelib.src.exchanges.bybit.bybit_constants import (
+    bybit_default_product_category,
+    bybit_instrument_cache_ttl_seconds,
+    bybit_instrument_missing_symbol_reload_seconds,
+    bybit_trading_account_name_live,
+)
+from chalicelib.src.exchanges.bybit.bybit_types import (
+    BybitAccountCredentials,
+    BybitGetSymboIncrements,
+    BybitInstrument,
+    BybitInstrumentTable,
+)
+from pybit.unified_trading import HTTP
+
+# Instrument tables keyed by product category and testnet flag. Instrument
+# information is public, so one table is shared by every account
+bybit_instrument_tables: Dict[tuple[str, bool], BybitInstrumentTable] = {}
+bybit_instrument_tables_lock: Lock = Lock()
+
+
+def bybit_parse_instrument(trading_pair: Dict[str, Any]) -> BybitInstrument:
+    """
+    Extract the increments of an instrument and pre-parse the quantizers used
+    to round order quantities
+
+    Parameters:
+    - trading_pair: Instrument as returned by get_instruments_info
+
+    Returns:
+    - A BybitInstrument object with the raw increments and Decimal quantizers
+    """
+
+    lot_size_filter: Dict[str, str] = trading_pair.get("lotSizeFilter", {})
+    price_filter: Dict[str, str] = trading_pair.get("priceFilter", {})
+
+    increments: BybitGetSymboIncrements = {
+        "symbol": trading_pair.get("symbol"),
+        "basePrecision": lot_size_filter.get("basePrecision"),
+        "quotePrecision": lot_size_filter.get("quotePrecision"),
+        "minOrderQty": lot_size_filter.get("minOrderQty"),
+        "maxOrderQty": lot_size_filter.get("maxOrderQty"),
+        "minOrderAmt": lot_size_filter.get("minOrderAmt"),
+        "maxOrderAmt": lot_size_filter.get("maxOrderAmt"),
+        "tickSize": price_filter.get("tickSize"),
+    }
+
+    return {
+        "increments": increments,
+        "basePrecisionQuantizer": Decimal(increments["basePrecision"] or 0),
+        "quotePrecisionQuantizer": Decimal(increments["quotePrecision"] or 0),
+        "tickSizeQuantizer": Decimal(increments["tickSize"] or 0),
+    }
+
+
+def bybit_fetch_instruments(
+    product_category: str = bybit_default_product_category,
+    testnet: bool = False,
+) -> Dict[str, BybitInstrument]:
+    """
+    Fetch every instrument of a product category in bulk, following the
+    page cursor when Bybit paginates the response
+
+    Parameters:
+    - product_category: Bybit product to load eg. spot, derivatives, etc
+    - testnet: Load instruments from testnet
+
+    Returns:
+    - A dictionary of BybitInstrument objects keyed by symbol
+    """
+
+    session: HTTP = bybit_get_public_http_session(testnet)
+    instruments: Dict[str, BybitInstrument] = {}
+    cursor: str = ""
+
+    while True:
+        request_parameters: Dict[str, Any] = {
+            "category": product_category,
+            "limit": 1000,
+        }
+        if cursor:
+            request_parameters["cursor"] = cursor
+
+        response: Any = session.get_instruments_info(**request_parameters)
+        if response.get("retCode") != 0:
+            raise ValueError(f"Error: {response['retMsg']}")
+
+        for trading_pair in response["result"]["list"]:
+            instruments[trading_pair["symbol"]] = bybit_parse_instrument(
+                trading_pair
+            )
+
+        cursor = response["result"].get("nextPageCursor") or ""
+        if not cursor:
+            break
+
+    print("Instruments loaded:", len(instruments), product_category)
+    return instruments
+
+
+def bybit_refresh_instrument_table(
+    product_category: str = bybit_default_product_category,
+    testnet: bool = False,
+) -> BybitInstrumentTable:
+    """
+    Reload the instrument table of a product category. On failure the
+    previous table is kept
+
+    Parameters:
+    - product_category: Bybit product to load eg. spot, derivatives, etc
+    - testnet: Load instruments from testnet
+
+    Returns:
+    - The BybitInstrumentTable of the product category
+    """
+
+    table_key: tuple[str, bool] = (product_category, testnet)
+    try:
+        instruments: Dict[str, BybitInstrument] = bybit_fetch_instruments(
+            product_category, testnet
+        )
+    except Exception as e:
+        print(f"Error refreshing instruments: {e}")
+        instruments = None
+
+    with bybit_instrument_tables_lock:
+        table: BybitInstrumentTable = bybit_instrument_tables.setdefault(
+            table_key, {"instruments": {}, "loaded_at": 0, "refreshing": False}
+        )
+        if instruments:
+            table["instruments"] = instruments
+            table["loaded_at"] = time.monotonic()
+        table["refreshing"] = False
+        return table
+
+
+def bybit_get_instrument(
+    bybit_pair_symbol: str,
+    account_name: str = bybit_trading_account_name_live,
+    product_category: str = bybit_default_product_category,
+    ttl_seconds: int = bybit_instrument_cache_ttl_seconds,
+) -> BybitInstrument | None:
+    """
+    Look up an instrument in the in-process instrument table. An empty table
+    is loaded before answering, a stale table keeps answering while it is
+    refreshed in the background
+
+    Parameters:
+    - bybit_pair_symbol: Pair symbol to search for without hyphen
+    - account_name: Account used to pick mainnet or testnet
+    - product_category: Bybit product to search eg. spot, derivatives, etc
+    - ttl_seconds: Age after which the table is refreshed
+
+    Returns:
+    - A BybitInstrument object, or None if the symbol is not listed
+    """
+
+    credentials: BybitAccountCredentials = bybit_get_credentials(account_name)
+    testnet: bool = bool(credentials and credentials["testnet"])
+    table_key: tuple[str, bool] = (product_category, testnet)
+
+    with bybit_instrument_tables_lock:
+        table: BybitInstrumentTable | None = bybit_instrument_tables.get(
+            table_key
+        )
+        table_age: float = (
+            time.monotonic() - table["loaded_at"] if table else float("inf")
+        )
+        refresh_in_background: bool = bool(
+            table
+            and table["instruments"]
+            and table_age > ttl_seconds
+            and not table["refreshing"]
+        )
+        if refresh_in_background:
+            table["refreshing"] = True
+
+    refreshed: bool = False
+    if not table or not table["instruments"]:
+        table = bybit_refresh_instrument_table(product_category, testnet)
+        refreshed = True
+    elif refresh_in_background:
+        Thread(
+            target=bybit_refresh_instrument_table,
+            args=(product_category, testnet),
+            daemon=True,
+        ).start()
+
+    instrument: BybitInstrument | None = table["instruments"].get(
+        bybit_pair_symbol
+    )
+
+    # Newly listed symbols are picked up with a reload, rate limited so an
+    # unknown symbol cannot trigger a bulk load on every order
+    if (
+        instrument is None
+        and not refreshed
+        and time.monotonic() - table["loaded_at"]
+        > bybit_instrument_missing_symbol_reload_seconds
+    ):
+        table = bybit_refresh_instrument_table(product_category, testnet)
+        instrument = table["instruments"].get(bybit_pair_symbol)
+
+    return instrument
+
+
+def bybit_load_instrument_table(
+    account_name: str = bybit_trading_account_name_live,
+    product_category: str = bybit_default_product_category,
+) -> BybitInstrumentTable:
+    """
+    Load the instrument table used by an account if it is empty, so orders
+    that run concurrently find it loaded instead of each fetching it
+
+    Parameters:
+    - account_name: Account used to pick mainnet or testnet
+    - product_category: Bybit product to load eg. spot, derivatives, etc
+
+    Returns:
+    - The BybitInstrumentTable of the product category
+    """
+
+    credentials: BybitAccountCredentials = bybit_get_credentials(account_name)
+    testnet: bool = bool(credentials and credentials["testnet"])
+
+    with bybit_instrument_tables_lock:
+        table: BybitInstrumentTable | None = bybit_instrument_tables.get(
+            (product_category, testnet)
+        )
+    if table and table["instruments"]:
+        return table
+    return bybit_refresh_instrument_table(product_category, testnet)
+
+
+def bybit_clear_instrument_tables() -> None:
+    """
+    Drop every instrument table so the next lookup reloads it
+    """
+
+    with bybit_instrument_tables_lock:
+        bybit_instrument_tables.clear()
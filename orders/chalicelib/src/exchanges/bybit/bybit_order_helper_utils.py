@@ -1,20 +1,31 @@
-from datetime import timedelta
-from decimal import Decimal
-from typing import Any, Literal
+from decimal import Decimal, InvalidOperation
+from typing import Literal
 
 from chalicelib.src.exchanges.bybit.bybit_account_utils import (
-    bybit_get_credentials,
+    bybit_get_coin_balance,
 )
 from chalicelib.src.exchanges.bybit.bybit_constants import (
     bybit_default_product_category,
+    bybit_preferred_stablecoin,
     bybit_trading_account_name_live,
 )
+from chalicelib.src.exchanges.bybit.bybit_instrument_utils import (
+    bybit_get_instrument,
+)
+from chalicelib.src.exchanges.bybit.bybit_order_history_utils import (
+    bybit_create_execution_snapshot,
+    bybit_extend_execution_snapshot,
+    bybit_refresh_execution_snapshot,
+)
 from chalicelib.src.exchanges.bybit.bybit_types import (
-    BybitAccountCredentials,
+    BybitExecutionSnapshot,
     BybitGetSymboIncrements,
+    BybitInstrument,
+)
+from chalicelib.src.exchanges.exchanges_utils import (
+    get_base_and_quote_assets,
+    remove_hyphen_from_pair_symbol,
 )
-from pybit.unified_trading import HTTP
-from requests.structures import CaseInsensitiveDict
 
 
 def bybit_get_symbol_increments(
@@ -37,132 +48,140 @@ def bybit_get_symbol_increments(
 
     print("symbol", bybit_pair_symbol)
 
-    # Initialise the HTTP client with Bybit's endpoint and API credentials
-    credentials: BybitAccountCredentials = bybit_get_credentials(account_name)
-    session: HTTP = HTTP(
-        testnet=credentials["testnet"],
-        api_key=credentials["api_key"],
-        api_secret=credentials["api_secret"],
+    # Served from the in-process instrument table, loaded in bulk per product
+    # category instead of one get_instruments_info call per order
+    instrument: BybitInstrument | None = bybit_get_instrument(
+        bybit_pair_symbol, account_name, product_category
     )
+    if instrument is None:
+        return f"Symbol {bybit_pair_symbol} not found."
+
+    increments: BybitGetSymboIncrements = instrument["increments"]
+    print("Increments found:", increments)
+    return increments
+
+
+def bybit_holds_asset_position(
+    pair_symbol: str,
+    account_name: str = bybit_trading_account_name_live,
+    product_category: str = bybit_default_product_category,
+) -> bool | None:
+    """
+    Checks the wallet balance of the non stablecoin asset of a pair. A
+    balance below the minimum order of the pair is dust left by a close, not
+    a position
+
+    Parameters:
+    - pair_symbol: Pair symbol formatted with hypen eg. BTC-USDT
+    - account_name: Account to check the balance of
+    - product_category: Bybit product to search eg. spot, derivatives, etc
 
-    # Fetch the instrument information for desired product category
-    response: (
-        tuple[Any, timedelta, CaseInsensitiveDict[str]]
-        | tuple[Any, timedelta]
-        | Any
-    ) = session.get_instruments_info(
-        symbol=bybit_pair_symbol, category=product_category
+    Returns:
+    - A Boolean, true if the asset is held, or None if the balance could not
+    be read
+    """
+
+    base_asset, quote_asset = get_base_and_quote_assets(pair_symbol)
+    held_asset_is_base: bool = base_asset != bybit_preferred_stablecoin
+    balance: str = bybit_get_coin_balance(
+        base_asset if held_asset_is_base else quote_asset, account_name
     )
-    print("response", response)
-
-    # Iterate through each trading pair to find the matching symbol
-    if response.get("retCode") == 0:
-        # Iterate through each trading pair in the provided list
-        for trading_pair in response["result"]["list"]:
-            # Check if the current trading pair matches the desired symbol
-            if trading_pair.get("symbol") == bybit_pair_symbol:
-                # If the symbol matches, extract the increments information
-                lot_size_filter = trading_pair.get("lotSizeFilter", {})
-                price_filter = trading_pair.get("priceFilter", {})
-
-                # Construct a result dictionary with the increments information
-                increments: BybitGetSymboIncrements = {
-                    "symbol": bybit_pair_symbol,
-                    "basePrecision": lot_size_filter.get("basePrecision"),
-                    "quotePrecision": lot_size_filter.get("quotePrecision"),
-                    "minOrderQty": lot_size_filter.get("minOrderQty"),
-                    "maxOrderQty": lot_size_filter.get("maxOrderQty"),
-                    "minOrderAmt": lot_size_filter.get("minOrderAmt"),
-                    "maxOrderAmt": lot_size_filter.get("maxOrderAmt"),
-                    "tickSize": price_filter.get("tickSize"),
-                }
-                print("Increments found:", increments)
-                return increments
+    try:
+        asset_balance: Decimal = Decimal(balance)
+    except InvalidOperation:
+        print("Error reading balance:", balance)
+        return None
+
+    instrument: BybitInstrument | None = bybit_get_instrument(
+        remove_hyphen_from_pair_symbol(pair_symbol),
+        account_name,
+        product_category,
+    )
+    minimum_order: Decimal = Decimal(0)
+    if instrument is not None:
+        minimum_order = Decimal(
+            instrument["increments"][
+                "minOrderQty" if held_asset_is_base else "minOrderAmt"
+            ]
+            or 0
+        )
 
-        return f"Symbol {bybit_pair_symbol} not found."
-    else:
-        return f"Error: {response['retMsg']}"
+    return asset_balance > 0 and asset_balance >= minimum_order
 
 
 def bybit_calculate_profit_loss(
     bybit_pair_symbol: str,
     account_name: str = bybit_trading_account_name_live,
+    snapshot: BybitExecutionSnapshot | None = None,
 ) -> Decimal:
     """
-    Calculates the profit/loss of the last order. Limitation is that last
-    order needs to be made in the last 7 days
+    Calculates the profit/loss of the last order, matched against the most
+    recent opposite side executions. Older pages of executions are only
+    fetched when the first page does not hold enough to match the order
 
     Parameters:
     - bybit_pair_symbol: Pair symbol to search for information without hyphen
     - account_name: Account to use for search
+    - snapshot: Execution snapshot of the symbol taken earlier in the alert,
+    refreshed to include the order that closed the position
 
     Returns:
     - A Decimal with the profit or loss amount
     """
 
-    credentials: BybitAccountCredentials = bybit_get_credentials(account_name)
-    session: HTTP = HTTP(
-        testnet=credentials["testnet"],
-        api_key=credentials["api_key"],
-        api_secret=credentials["api_secret"],
-    )
-
-    executed_orders: (
-        tuple[Any, timedelta, CaseInsensitiveDict[str]]
-        | tuple[Any, timedelta]
-        | Any
-    ) = session.get_executions(
-        symbol=bybit_pair_symbol,
-        category=bybit_default_product_category,
-        limit=10,
-    )
+    if snapshot is None:
+        snapshot = bybit_create_execution_snapshot(
+            bybit_pair_symbol, account_name
+        )
+    else:
+        bybit_refresh_execution_snapshot(snapshot)
 
-    if (
-        not executed_orders
-        or "result" not in executed_orders
-        or "list" not in executed_orders["result"]
-        or len(executed_orders["result"]["list"]) == 0
-    ):
+    if snapshot is None or len(snapshot["executions"]) == 0:
         print("Error - Invalid executed order data")
         return Decimal(0)
 
-    # Filter orders for the specific symbol
-    orders = [
-        order
-        for order in executed_orders["result"]["list"]
-        if order["symbol"] == bybit_pair_symbol
-    ]
-    orders.reverse()
-
-    # Find the last (most recent) order
-    last_order = orders[0]  # The first order after reversing the list
-    last_order_side = last_order["side"]
+    # Executions are sorted newest first, the last order may be filled by
+    # several executions
+    last_order_id: str = snapshot["executions"][0]["orderId"]
+    last_order_side: str = snapshot["executions"][0]["side"]
     opposite_side: Literal["Sell", "Buy"] = (
         "Sell" if last_order_side == "Buy" else "Buy"
     )
 
-    last_order_qty: Decimal = Decimal(last_order["execQty"])
-    last_order_exec_value: Decimal = Decimal(last_order["execValue"])
+    last_order_qty: Decimal = Decimal(0)
+    last_order_exec_value: Decimal = Decimal(0)
+    for execution in snapshot["executions"]:
+        if execution["orderId"] == last_order_id:
+            last_order_qty += Decimal(execution["execQty"])
+            last_order_exec_value += Decimal(execution["execValue"])
 
     total_opposite_qty: Decimal = Decimal(0)
     total_opposite_exec_value: Decimal = Decimal(0)
 
-    for order in orders[1:]:  # Skip the first order since it's the last order
-        if order["side"] == opposite_side:
-            opposite_qty: Decimal = Decimal(order["execQty"])
-            if total_opposite_qty + opposite_qty <= last_order_qty:
-                total_opposite_qty += opposite_qty
-                total_opposite_exec_value += Decimal(order["execValue"])
-            else:
-                portion_needed: Decimal = last_order_qty - total_opposite_qty
-                total_opposite_qty += portion_needed
-                value_portion: Decimal = (
-                    portion_needed / opposite_qty * Decimal(order["execValue"])
-                )
-                total_opposite_exec_value += value_portion
-
-            if total_opposite_qty >= last_order_qty:
+    index: int = 0
+    while total_opposite_qty < last_order_qty:
+        if index >= len(snapshot["executions"]):
+            # Fetch older executions only when the match needs them
+            if not bybit_extend_execution_snapshot(snapshot):
                 break
+            continue
+
+        order = snapshot["executions"][index]
+        index += 1
+        if order["orderId"] == last_order_id or order["side"] != opposite_side:
+            continue
+
+        opposite_qty: Decimal = Decimal(order["execQty"])
+        if total_opposite_qty + opposite_qty <= last_order_qty:
+            total_opposite_qty += opposite_qty
+            total_opposite_exec_value += Decimal(order["execValue"])
+        else:
+            portion_needed: Decimal = last_order_qty - total_opposite_qty
+            total_opposite_qty += portion_needed
+            value_portion: Decimal = (
+                portion_needed / opposite_qty * Decimal(order["execValue"])
+            )
+            total_opposite_exec_value += value_portion
 
     if total_opposite_qty != last_order_qty:
         print(
@@ -2,66 +2,245 @@ from datetime import timedelta
 from typing import Any
 
 from chalicelib.src.exchanges.bybit.bybit_account_utils import (
-    bybit_get_credentials,
+    bybit_get_http_session,
 )
 from chalicelib.src.exchanges.bybit.bybit_constants import (
     bybit_default_product_category,
+    bybit_execution_extend_page_size,
+    bybit_execution_page_size,
     bybit_preferred_stablecoin,
     bybit_trading_account_name_live,
 )
-from chalicelib.src.exchanges.bybit.bybit_types import BybitAccountCredentials
+from chalicelib.src.exchanges.bybit.bybit_types import BybitExecutionSnapshot
 from pybit.unified_trading import HTTP
 from requests.structures import CaseInsensitiveDict
 
 
-def bybit_get_most_recent_inverse_fill_to_stablecoin(
+def bybit_fetch_executions(
     bybit_pair_symbol: str,
-    stablecoin: str = bybit_preferred_stablecoin,
     account_name: str = bybit_trading_account_name_live,
-) -> bool:
+    limit: int = bybit_execution_page_size,
+    cursor: str | None = None,
+    start_time: int | None = None,
+) -> tuple[list[dict[str, Any]], str] | None:
     """
-    Check if the most recent inverse fill to a stablecoin was a buy or a sell
+    Fetch one page of executions of a symbol, newest first
 
     Parameters:
     - bybit_pair_symbol: Pair symbol to search for information without hyphen
-    - stablecoin: Stablecoin pair to check
-    - account_name: Account to trade with
+    - account_name: Account to use for search
+    - limit: Number of executions to fetch
+    - cursor: Cursor of the page to fetch, returned by the previous page
+    - start_time: Only fetch executions from this time, in milliseconds
 
     Returns:
-    - A boolean, True if last trade was a sell to a stablecoin
+    - A tuple with the executions of the symbol and the cursor of the next
+    page (empty when there are no more pages), or None if the fetch failed
     """
 
-    credentials: BybitAccountCredentials = bybit_get_credentials(account_name)
-    session: HTTP = HTTP(
-        testnet=credentials["testnet"],
-        api_key=credentials["api_key"],
-        api_secret=credentials["api_secret"],
-    )
+    session: HTTP | None = bybit_get_http_session(account_name)
+    if session is None:
+        print("Error - Account credentials not found")
+        return None
+
+    request_parameters: dict[str, Any] = {
+        "symbol": bybit_pair_symbol,
+        "category": bybit_default_product_category,
+        "limit": limit,
+    }
+    if cursor:
+        request_parameters["cursor"] = cursor
+    if start_time is not None:
+        request_parameters["startTime"] = start_time
 
     executed_orders: (
         tuple[Any, timedelta, CaseInsensitiveDict[str]]
         | tuple[Any, timedelta]
         | Any
-    ) = session.get_executions(
-        symbol=bybit_pair_symbol,
-        category=bybit_default_product_category,
-        limit=10,
-    )
+    ) = session.get_executions(**request_parameters)
 
     if (
         not executed_orders
         or "result" not in executed_orders
         or "list" not in executed_orders["result"]
-        or len(executed_orders["result"]["list"]) == 0
     ):
-        return False
+        print("Error - Invalid executed order data")
+        return None
+
+    executions: list[dict[str, Any]] = [
+        execution
+        for execution in executed_orders["result"]["list"]
+        if execution["symbol"] == bybit_pair_symbol
+    ]
+    next_cursor: str = executed_orders["result"].get("nextPageCursor") or ""
+    return executions, next_cursor
+
+
+def bybit_merge_executions_into_snapshot(
+    snapshot: BybitExecutionSnapshot,
+    executions: list[dict[str, Any]],
+) -> int:
+    """
+    Add executions to a snapshot, skipping executions it already holds and
+    keeping the snapshot sorted newest first
+
+    Parameters:
+    - snapshot: Snapshot to update
+    - executions: Executions to add
+
+    Returns:
+    - Number of executions added
+    """
 
-    orders = [
-        order
-        for order in executed_orders["result"]["list"]
-        if order["symbol"] == bybit_pair_symbol
+    known_execution_ids: set[str] = {
+        execution["execId"] for execution in snapshot["executions"]
+    }
+    new_executions: list[dict[str, Any]] = [
+        execution
+        for execution in executions
+        if execution["execId"] not in known_execution_ids
     ]
-    last_trade = orders[0]
+    if new_executions:
+        snapshot["executions"] = sorted(
+            snapshot["executions"] + new_executions,
+            key=lambda execution: int(execution["execTime"]),
+            reverse=True,
+        )
+
+    return len(new_executions)
+
+
+def bybit_create_execution_snapshot(
+    bybit_pair_symbol: str,
+    account_name: str = bybit_trading_account_name_live,
+) -> BybitExecutionSnapshot | None:
+    """
+    Fetch the first page of executions of a symbol into a snapshot, shared
+    by side detection and the profit/loss calculation of one alert
+
+    Parameters:
+    - bybit_pair_symbol: Pair symbol to search for information without hyphen
+    - account_name: Account to use for search
+
+    Returns:
+    - A BybitExecutionSnapshot object, or None if the fetch failed
+    """
+
+    page: tuple[list[dict[str, Any]], str] | None = bybit_fetch_executions(
+        bybit_pair_symbol, account_name
+    )
+    if page is None:
+        return None
+
+    executions, next_cursor = page
+    snapshot: BybitExecutionSnapshot = {
+        "symbol": bybit_pair_symbol,
+        "account_name": account_name,
+        "executions": [],
+        "next_cursor": next_cursor,
+        "complete": not next_cursor,
+    }
+    bybit_merge_executions_into_snapshot(snapshot, executions)
+    return snapshot
+
+
+def bybit_refresh_execution_snapshot(
+    snapshot: BybitExecutionSnapshot,
+) -> int:
+    """
+    Add executions made since the snapshot was taken, eg. the fills of an
+    order submitted after side detection. Only executions from the newest
+    one held are fetched, so the older pages are not downloaded again
+
+    Parameters:
+    - snapshot: Snapshot to update
+
+    Returns:
+    - Number of executions added
+    """
+
+    start_time: int | None = (
+        int(snapshot["executions"][0]["execTime"])
+        if snapshot["executions"]
+        else None
+    )
+    page: tuple[list[dict[str, Any]], str] | None = bybit_fetch_executions(
+        snapshot["symbol"],
+        snapshot["account_name"],
+        limit=bybit_execution_extend_page_size,
+        start_time=start_time,
+    )
+    if page is None:
+        return 0
+
+    executions, next_cursor = page
+    # An empty snapshot had no older pages to keep
+    if start_time is None:
+        snapshot["next_cursor"] = next_cursor
+        snapshot["complete"] = not next_cursor
+    return bybit_merge_executions_into_snapshot(snapshot, executions)
+
+
+def bybit_extend_execution_snapshot(
+    snapshot: BybitExecutionSnapshot,
+    limit: int = bybit_execution_extend_page_size,
+) -> bool:
+    """
+    Fetch the next older page of executions into the snapshot
+
+    Parameters:
+    - snapshot: Snapshot to extend
+    - limit: Number of executions to fetch
+
+    Returns:
+    - A boolean, True if older executions were added
+    """
+
+    if snapshot["complete"]:
+        return False
+
+    page: tuple[list[dict[str, Any]], str] | None = bybit_fetch_executions(
+        snapshot["symbol"],
+        snapshot["account_name"],
+        limit=limit,
+        cursor=snapshot["next_cursor"],
+    )
+    if page is None:
+        return False
+
+    executions, next_cursor = page
+    snapshot["next_cursor"] = next_cursor
+    snapshot["complete"] = not next_cursor
+    return bybit_merge_executions_into_snapshot(snapshot, executions) > 0
+
+
+def bybit_get_most_recent_inverse_fill_to_stablecoin(
+    bybit_pair_symbol: str,
+    stablecoin: str = bybit_preferred_stablecoin,
+    account_name: str = bybit_trading_account_name_live,
+    snapshot: BybitExecutionSnapshot | None = None,
+) -> bool:
+    """
+    Check if the most recent inverse fill to a stablecoin was a buy or a sell
+
+    Parameters:
+    - bybit_pair_symbol: Pair symbol to search for information without hyphen
+    - stablecoin: Stablecoin pair to check
+    - account_name: Account to trade with
+    - snapshot: Execution snapshot of the symbol, fetched when not provided
+
+    Returns:
+    - A boolean, True if last trade was a sell to a stablecoin
+    """
+
+    if snapshot is None:
+        snapshot = bybit_create_execution_snapshot(
+            bybit_pair_symbol, account_name
+        )
+    if snapshot is None or len(snapshot["executions"]) == 0:
+        return False
+
+    last_trade = snapshot["executions"][0]
     is_sell_to_stablecoin: bool = (
         last_trade["symbol"].endswith(stablecoin)
         and last_trade["side"] == "Sell"
@@ -1,32 +1,41 @@
 from decimal import ROUND_DOWN, Decimal
-from typing import Any
 
+from chalicelib.src.aws.aws_types import AWSDynamoDbPositionState
+from chalicelib.src.aws.aws_utils import (
+    get_position_state,
+    save_position_state,
+)
 from chalicelib.src.constants import (
     capital_to_deploy_percentage,
     country_personal_income_tax_rate,
 )
 from chalicelib.src.exchanges.bybit.bybit_account_utils import (
     bybit_get_coin_balance,
-    bybit_get_credentials,
+    bybit_get_http_session,
 )
 from chalicelib.src.exchanges.bybit.bybit_constants import (
     bybit_default_product_category,
+    bybit_exchange_name,
     bybit_preferred_stablecoin,
     bybit_tax_pair,
     bybit_trading_account_name_live,
     tradingview_bybit_inverse_symbols,
     tradingview_bybit_symbols,
 )
+from chalicelib.src.exchanges.bybit.bybit_instrument_utils import (
+    bybit_get_instrument,
+)
 from chalicelib.src.exchanges.bybit.bybit_order_helper_utils import (
     bybit_calculate_profit_loss,
-    bybit_get_symbol_increments,
+    bybit_holds_asset_position,
 )
 from chalicelib.src.exchanges.bybit.bybit_order_history_utils import (
+    bybit_create_execution_snapshot,
     bybit_get_most_recent_inverse_fill_to_stablecoin,
 )
 from chalicelib.src.exchanges.bybit.bybit_types import (
-    BybitAccountCredentials,
-    BybitGetSymboIncrements,
+    BybitExecutionSnapshot,
+    BybitInstrument,
 )
 from chalicelib.src.exchanges.exchanges_utils import (
     get_base_and_quote_assets,
@@ -54,6 +63,10 @@ def bybit_submit_pair_trade_order(
     - buy_alert: Set buy or sell alert (buy positively or buy negatively
     correlated asset)
     - account_name: Account to use for order
+
+    Returns:
+    - The response of the opening order, or None or an error string if it
+    was not placed
     """
 
     print("Bybit Order Begin - bybit_submit_pair_trade_order")
@@ -73,11 +86,43 @@ def bybit_submit_pair_trade_order(
     # Check if you are holding the inverse asset, and sell it if you are
     # Assumes there is only one order open of an asset pair at a time
     # Sells all holdings of inverset asset, and converts CGT to tax stablecoin
-    if not (
-        bybit_get_most_recent_inverse_fill_to_stablecoin(
-            pair_inverse_symbol, account_name=account_name
+    # The held leg is read from the position state, the execution history is
+    # only read when there is no fresh state or the state proves wrong
+    position_state: AWSDynamoDbPositionState | None = get_position_state(
+        bybit_exchange_name, account_name, tradingview_symbol
+    )
+    execution_snapshot: BybitExecutionSnapshot | None = None
+    holding_inverse_asset: bool | None = None
+    if position_state is not None:
+        holding_inverse_asset = (
+            position_state["HeldSymbol"] == pair_inverse_symbol
+        )
+
+        # The state is saved when the opening order is submitted, not when
+        # it fills. A state that says the inverse asset is not held is
+        # checked against its balance, like the inverse position on Alpaca
+        if not holding_inverse_asset:
+            holds_inverse_position: bool | None = bybit_holds_asset_position(
+                pair_inverse_symbol, account_name
+            )
+            if holds_inverse_position is not False:
+                print("Position state mismatch - reconciling with executions")
+                holding_inverse_asset = None
+
+    if holding_inverse_asset is None:
+        # One execution snapshot is shared by side detection and profit/loss
+        execution_snapshot = bybit_create_execution_snapshot(
+            pair_inverse_symbol, account_name
+        )
+        holding_inverse_asset = (
+            not bybit_get_most_recent_inverse_fill_to_stablecoin(
+                pair_inverse_symbol,
+                account_name=account_name,
+                snapshot=execution_snapshot,
+            )
         )
-    ):
+
+    if holding_inverse_asset:
         (
             base_asset,
             quote_asset,
@@ -91,7 +136,7 @@ def bybit_submit_pair_trade_order(
             )
         if base_asset == bybit_preferred_stablecoin:
             print("No stablecoin conversion found - submit buy order")
-            bybit_submit_market_order_custom_percentage(
+            closing_order = bybit_submit_market_order_custom_percentage(
                 pair_inverse_symbol,
                 buy_side_order=True,
                 asset_percentage_to_deploy=Decimal(1),
@@ -99,17 +144,34 @@ def bybit_submit_pair_trade_order(
             )
         elif quote_asset == bybit_preferred_stablecoin:
             print("No stablecoin conversion found - submit sell order")
-            bybit_submit_market_order_custom_percentage(
+            closing_order = bybit_submit_market_order_custom_percentage(
                 pair_inverse_symbol,
                 buy_side_order=False,
                 asset_percentage_to_deploy=Decimal(1),
                 account_name=account_name,
             )
 
+        # The state said the inverse asset was held but it could not be
+        # closed, so the execution history decides if there was a position
+        if execution_snapshot is None and isinstance(closing_order, str):
+            print("Position state mismatch - reconciling with executions")
+            execution_snapshot = bybit_create_execution_snapshot(
+                pair_inverse_symbol, account_name
+            )
+            holding_inverse_asset = (
+                not bybit_get_most_recent_inverse_fill_to_stablecoin(
+                    pair_inverse_symbol,
+                    account_name=account_name,
+                    snapshot=execution_snapshot,
+                )
+            )
+
         # Calculate tax to convert to preferred tax stablecoin
-        if calculate_tax:
+        if calculate_tax and holding_inverse_asset:
             profit_loss_amount: Decimal = bybit_calculate_profit_loss(
-                pair_inverse_symbol, account_name
+                pair_inverse_symbol,
+                account_name,
+                snapshot=execution_snapshot,
             )
             tax_amount: Decimal = Decimal(profit_loss_amount) * Decimal(
                 country_personal_income_tax_rate
@@ -125,13 +187,21 @@ def bybit_submit_pair_trade_order(
                 )
 
     # Submit market order for new asset, once inverse asset holdings are sold
-    bybit_submit_market_order_custom_percentage(
+    opening_order = bybit_submit_market_order_custom_percentage(
         pair_symbol,
         buy_side_order=True,
         asset_percentage_to_deploy=capital_to_deploy,
         account_name=account_name,
     )
 
+    # The next alert on the pair can skip the execution history lookup
+    if opening_order is not None and not isinstance(opening_order, str):
+        save_position_state(
+            bybit_exchange_name, account_name, tradingview_symbol, pair_symbol
+        )
+
+    return opening_order
+
 
 def bybit_submit_market_order_custom_percentage(
     pair_symbol: str,
@@ -165,13 +235,18 @@ def bybit_submit_market_order_custom_percentage(
         return "Error - Insufficient funds to execute order"
 
     # Get increment information to execute order
-    increments_object: BybitGetSymboIncrements = bybit_get_symbol_increments(
-        remove_hyphen_from_pair_symbol(pair_symbol), account_name
+    instrument: BybitInstrument | None = bybit_get_instrument(
+        remove_hyphen_from_pair_symbol(pair_symbol),
+        account_name,
+        product_category,
     )
-    basePrecision: str | Any = increments_object.get("basePrecision")
-    quotePrecision: str | Any = increments_object.get("quotePrecision")
+    if instrument is None:
+        print("Error - Symbol increments not found")
+        return "Error - Symbol increments not found"
     symbol_minimum_increment: Decimal = (
-        Decimal(quotePrecision) if buy_side_order else Decimal(basePrecision)
+        instrument["quotePrecisionQuantizer"]
+        if buy_side_order
+        else instrument["basePrecisionQuantizer"]
     )
 
     # Calculate funds to deploy
@@ -188,15 +263,11 @@ def bybit_submit_market_order_custom_percentage(
     print("Funds to deploy", funds_to_deploy, "\n")
 
     if funds_to_deploy > 0:
-        # Initialise the HTTP client with Bybit's endpoint and API credentials
-        credentials: BybitAccountCredentials = bybit_get_credentials(
-            account_name
-        )
-        session: HTTP = HTTP(
-            testnet=credentials["testnet"],
-            api_key=credentials["api_key"],
-            api_secret=credentials["api_secret"],
-        )
+        # Reuse the warm HTTP session of the account
+        session: HTTP | None = bybit_get_http_session(account_name)
+        if session is None:
+            print("Error - Account credentials not found")
+            return "Error - Account credentials not found"
         symbol: str = remove_hyphen_from_pair_symbol(pair_symbol)
         order_response = session.place_order(
             category=product_category,
@@ -206,6 +277,7 @@ def bybit_submit_market_order_custom_percentage(
             qty=quantity_to_deploy,
         )
         print("Bybit market order submitted: \n", order_response, "\n")
+        return order_response
 
 
 def bybit_submit_market_order_custom_amount(
@@ -240,13 +312,18 @@ def bybit_submit_market_order_custom_amount(
         return "Error - Insufficient funds to execute order"
 
     # Get increment information to execute order
-    increments_object: BybitGetSymboIncrements = bybit_get_symbol_increments(
-        remove_hyphen_from_pair_symbol(pair_symbol), account_name
+    instrument: BybitInstrument | None = bybit_get_instrument(
+        remove_hyphen_from_pair_symbol(pair_symbol),
+        account_name,
+        product_category,
     )
-    basePrecision: str | Any = increments_object.get("basePrecision")
-    quotePrecision: str | Any = increments_object.get("quotePrecision")
+    if instrument is None:
+        print("Error - Symbol increments not found")
+        return "Error - Symbol increments not found"
     symbol_minimum_increment: Decimal = (
-        Decimal(basePrecision) if buy_side_order else Decimal(quotePrecision)
+        instrument["basePrecisionQuantizer"]
+        if buy_side_order
+        else instrument["quotePrecisionQuantizer"]
     )
 
     # Calculate funds to deploy
@@ -261,15 +338,11 @@ def bybit_submit_market_order_custom_amount(
     print("Funds to deploy", funds_to_deploy, "\n")
 
     if funds_to_deploy > 0:
-        # Initialise the HTTP client with Bybit's endpoint and API credentials
-        credentials: BybitAccountCredentials = bybit_get_credentials(
-            account_name
-        )
-        session: HTTP = HTTP(
-            testnet=credentials["testnet"],
-            api_key=credentials["api_key"],
-            api_secret=credentials["api_secret"],
-        )
+        # Reuse the warm HTTP session of the account
+        session: HTTP | None = bybit_get_http_session(account_name)
+        if session is None:
+            print("Error - Account credentials not found")
+            return "Error - Account credentials not found"
         symbol: str = remove_hyphen_from_pair_symbol(pair_symbol)
         order_response = session.place_order(
             category=product_category,
@@ -279,3 +352,4 @@ def bybit_submit_market_order_custom_amount(
             qty=quantity_to_deploy,
         )
         print("Bybit market order submitted: \n", order_response, "\n")
+        return order_response
@@ -0,0 +1,60 @@
+from chalice import Blueprint
+from chalice.app import SQSEvent
+from chalicelib.src.alerts.alerts_constants import (
+    alert_exchange_bybit,
+    alert_queue_names,
+)
+from chalicelib.src.alerts.alerts_types import AlertJob
+from chalicelib.src.alerts.alerts_utils import (
+    execute_alert_job_message,
+    submit_alert,
+)
+
+# Bybit routes, registered by the combined orders app and deployed on their
+# own by the orders-bybit unit (see scripts/build_deployment_units.py).
+# Exchange modules are imported on first use to keep cold starts short
+bybit_routes: Blueprint = Blueprint(__name__)
+
+# SQS queue workers, registered only when ALERT_INTAKE_MODE is sqs so sync
+# and local deployments do not need the queues to exist
+bybit_workers: Blueprint = Blueprint(__name__)
+
+
+@bybit_routes.route("/bybitpairtradebuyalert", methods=["POST"])
+def bybit_pair_trade_buy_alert():
+    request = bybit_routes.current_request
+    tradingViewWebhookMessage = request.json_body
+    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+    alert_job: AlertJob = submit_alert(
+        alert_exchange_bybit, tradingViewWebhookMessage
+    )
+
+    return {
+        "message": "bybitpairtradebuyalert - alert received",
+        "alertJobId": alert_job["job_id"],
+        "tradingViewWebhookMessage": tradingViewWebhookMessage,
+    }
+
+
+@bybit_routes.route("/bybitpairtradesellalert", methods=["POST"])
+def bybit_pair_trade_sell_alert():
+    request = bybit_routes.current_request
+    tradingViewWebhookMessage = request.json_body
+    print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+    alert_job: AlertJob = submit_alert(
+        alert_exchange_bybit, tradingViewWebhookMessage, buy_alert=False
+    )
+
+    return {
+        "message": "bybitpairtradesellalert - alert received",
+        "alertJobId": alert_job["job_id"],
+        "tradingViewWebhookMessage": tradingViewWebhookMessage,
+    }
+
+
+# Worker of the alert queue. The queue is FIFO and grouped per pair, so a
+# pair is never traded by two workers at once
+@bybit_workers.on_sqs_message(queue=alert_queue_names[alert_exchange_bybit])
+def bybit_alert_queue_worker(event: SQSEvent):
+    for record in event:
+        execute_alert_job_message(record.body)
@@ -1,4 +1,5 @@
-from typing import TypedDict
+from decimal import Decimal
+from typing import Any, TypedDict
 
 
 class BybitAccountCredentials(TypedDict):
@@ -16,3 +17,24 @@ class BybitGetSymboIncrements(TypedDict):
     minOrderAmt: str
     maxOrderAmt: str
     tickSize: str
+
+
+class BybitInstrument(TypedDict):
+    increments: BybitGetSymboIncrements
+    basePrecisionQuantizer: Decimal
+    quotePrecisionQuantizer: Decimal
+    tickSizeQuantizer: Decimal
+
+
+class BybitInstrumentTable(TypedDict):
+    instruments: dict[str, BybitInstrument]
+    loaded_at: float
+    refreshing: bool
+
+
+class BybitExecutionSnapshot(TypedDict):
+    symbol: str
+    account_name: str
+    executions: list[dict[str, Any]]
+    next_cursor: str
+    complete: bool
@@ -2,8 +2,12 @@ from unittest.mock import patch
 
 import pytest
 from chalicelib.src.exchanges.bybit.bybit_account_utils import (
+    bybit_clear_http_sessions,
     bybit_get_coin_balance,
     bybit_get_credentials,
+    bybit_get_http_session,
+    bybit_get_http_session_counters,
+    bybit_get_public_http_session,
 )
 from chalicelib.src.exchanges.bybit.bybit_constants import (
     bybit_accounts,
@@ -65,3 +69,19 @@ def test_bybit_get_coin_balance(mocker, coin, expected):
 
     # Assert the expected outcome
     assert result == expected
+
+
+def test_bybit_get_http_session_reuses_session():
+    bybit_clear_http_sessions()
+
+    session = bybit_get_http_session(bybit_trading_account_name_live)
+    assert bybit_get_http_session(bybit_trading_account_name_live) is session
+    assert bybit_get_public_http_session() is not session
+    assert bybit_get_http_session("non_existent_account", False) is None
+    assert bybit_get_http_session_counters() == {"created": 2, "reused": 1}
+
+    bybit_clear_http_sessions()
+    assert bybit_get_http_session(bybit_trading_account_name_live) is not (
+        session
+    )
+    bybit_clear_http_sessions()
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+import pytest
+from chalicelib.src.exchanges.bybit.bybit_instrument_utils import (
+    bybit_clear_instrument_tables,
+    bybit_get_instrument,
+    bybit_instrument_tables,
+)
+from chalicelib.src.exchanges.bybit.tests.bybit_mock_data_objects import (
+    mock_instruments_info_response,
+)
+
+
+@pytest.fixture
+def mock_get_instruments_info(mocker):
+    bybit_clear_instrument_tables()
+    yield mocker.patch(
+        "pybit.unified_trading.HTTP.get_instruments_info",
+        return_value=mock_instruments_info_response,
+    )
+    bybit_clear_instrument_tables()
+
+
+def test_bybit_get_instrument_loads_table_once(mock_get_instruments_info):
+    btc_instrument = bybit_get_instrument("BTCUSDT")
+    usdc_instrument = bybit_get_instrument("USDCUSDT")
+
+    mock_get_instruments_info.assert_called_once()
+    assert btc_instrument["increments"]["basePrecision"] == "0.000001"
+    assert btc_instrument["basePrecisionQuantizer"] == Decimal("0.000001")
+    assert btc_instrument["quotePrecisionQuantizer"] == Decimal("0.00000001")
+    assert btc_instrument["tickSizeQuantizer"] == Decimal("0.01")
+    assert usdc_instrument["tickSizeQuantizer"] == Decimal("0.0001")
+
+
+def test_bybit_get_instrument_refreshes_stale_table_in_background(
+    mocker, mock_get_instruments_info
+):
+    mock_thread = mocker.patch(
+        "chalicelib.src.exchanges.bybit.bybit_instrument_utils.Thread"
+    )
+
+    bybit_get_instrument("BTCUSDT")
+    stale_instrument = bybit_get_instrument("BTCUSDT", ttl_seconds=-1)
+
+    # The stale table still answers while the refresh is started
+    assert stale_instrument["increments"]["symbol"] == "BTCUSDT"
+    mock_thread.return_value.start.assert_called_once()
+    assert bybit_instrument_tables[("spot", False)]["refreshing"] is True
+
+
+def test_bybit_get_instrument_unknown_symbol(mock_get_instruments_info):
+    assert bybit_get_instrument("UNKNOWNUSDT") is None
+    mock_get_instruments_info.assert_called_once()
@@ -88,3 +88,47 @@ mock_coin_balance_response: dict[str, any] = {
     "retExtInfo": {},
     "time": 1708100506934,
 }
+
+
+# Mock response for get_instruments_info
+mock_instruments_info_response: dict[str, any] = {
+    "retCode": 0,
+    "retMsg": "OK",
+    "result": {
+        "category": "spot",
+        "list": [
+            {
+                "symbol": "BTCUSDT",
+                "baseCoin": "BTC",
+                "quoteCoin": "USDT",
+                "status": "Trading",
+                "lotSizeFilter": {
+                    "basePrecision": "0.000001",
+                    "quotePrecision": "0.00000001",
+                    "minOrderQty": "0.000048",
+                    "maxOrderQty": "71.73956243",
+                    "minOrderAmt": "1",
+                    "maxOrderAmt": "2000000",
+                },
+                "priceFilter": {"tickSize": "0.01"},
+            },
+            {
+                "symbol": "USDCUSDT",
+                "baseCoin": "USDC",
+                "quoteCoin": "USDT",
+                "status": "Trading",
+                "lotSizeFilter": {
+                    "basePrecision": "0.01",
+                    "quotePrecision": "0.000001",
+                    "minOrderQty": "1",
+                    "maxOrderQty": "1000000",
+                    "minOrderAmt": "1",
+                    "maxOrderAmt": "1000000",
+                },
+                "priceFilter": {"tickSize": "0.0001"},
+            },
+        ],
+    },
+    "retExtInfo": {},
+    "time": 1708100506934,
+}
@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+import pytest
+from chalicelib.src.exchanges.bybit.bybit_order_helper_utils import (
+    bybit_holds_asset_position,
+)
+
+module = "chalicelib.src.exchanges.bybit.bybit_order_helper_utils"
+
+
+@pytest.fixture
+def mock_btc_instrument(mocker):
+    return mocker.patch(
+        f"{module}.bybit_get_instrument",
+        return_value={
+            "increments": {"minOrderQty": "0.000048", "minOrderAmt": "1"},
+            "basePrecisionQuantizer": Decimal("0.000001"),
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "balance, expected",
+    [
+        ("0.5", True),
+        # Dust left by a close is not a position
+        ("0.00001", False),
+        ("0", False),
+        ("Error: Account credentials not found", None),
+    ],
+)
+def test_bybit_holds_asset_position(
+    mocker, mock_btc_instrument, balance, expected
+):
+    mock_balance = mocker.patch(
+        f"{module}.bybit_get_coin_balance", return_value=balance
+    )
+
+    assert bybit_holds_asset_position("BTC-USDT") is expected
+    mock_balance.assert_called_once_with("BTC", "live")
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from chalicelib.src.exchanges.bybit.bybit_order_helper_utils import (
+    bybit_calculate_profit_loss,
+)
+from chalicelib.src.exchanges.bybit.bybit_order_history_utils import (
+    bybit_create_execution_snapshot,
+    bybit_get_most_recent_inverse_fill_to_stablecoin,
+)
+
+
+def mock_execution(exec_id, order_id, side, qty, value, exec_time):
+    return {
+        "symbol": "BTCUSDT",
+        "execId": exec_id,
+        "orderId": order_id,
+        "side": side,
+        "execQty": qty,
+        "execValue": value,
+        "execTime": str(exec_time),
+    }
+
+
+def mock_executions_response(executions, next_cursor=""):
+    return {
+        "retCode": 0,
+        "result": {"list": executions, "nextPageCursor": next_cursor},
+    }
+
+
+@pytest.fixture
+def mock_session(mocker):
+    session = MagicMock()
+    mocker.patch(
+        "chalicelib.src.exchanges.bybit.bybit_order_history_utils"
+        ".bybit_get_http_session",
+        return_value=session,
+    )
+    return session
+
+
+def test_bybit_snapshot_shared_by_side_detection_and_profit_loss(
+    mock_session,
+):
+    # First page, newest first, taken before the position is closed
+    mock_session.get_executions.side_effect = [
+        mock_executions_response(
+            [mock_execution("2", "buy-2", "Buy", "1", "110", 2000)],
+            next_cursor="page-2",
+        ),
+        # Refresh after closing, with the two fills of the sell order
+        mock_executions_response(
+            [
+                mock_execution("4", "sell-1", "Sell", "0.5", "60", 4000),
+                mock_execution("3", "sell-1", "Sell", "1", "120", 3000),
+                mock_execution("2", "buy-2", "Buy", "1", "110", 2000),
+            ]
+        ),
+        # Older page, only fetched because the match needs it
+        mock_executions_response(
+            [mock_execution("1", "buy-1", "Buy", "1", "100", 1000)]
+        ),
+    ]
+
+    snapshot = bybit_create_execution_snapshot("BTCUSDT")
+    assert not bybit_get_most_recent_inverse_fill_to_stablecoin(
+        "BTCUSDT", snapshot=snapshot
+    )
+
+    profit_loss = bybit_calculate_profit_loss("BTCUSDT", snapshot=snapshot)
+
+    # Sold 1.5 for 180, bought 1 for 110 and 0.5 of 1 for 100
+    assert profit_loss == Decimal("20")
+    assert mock_session.get_executions.call_count == 3
+    refresh_call = mock_session.get_executions.call_args_list[1]
+    assert refresh_call.kwargs["startTime"] == 2000
+    extend_call = mock_session.get_executions.call_args_list[2]
+    assert extend_call.kwargs["cursor"] == "page-2"
+    assert [execution["execId"] for execution in snapshot["executions"]] == [
+        "4",
+        "3",
+        "2",
+        "1",
+    ]
+
+
+def test_bybit_calculate_profit_loss_stops_at_first_page(mock_session):
+    mock_session.get_executions.return_value = mock_executions_response(
+        [
+            mock_execution("3", "sell-1", "Sell", "1", "90", 3000),
+            mock_execution("2", "buy-2", "Buy", "2", "200", 2000),
+        ],
+        next_cursor="page-2",
+    )
+
+    assert bybit_calculate_profit_loss("BTCUSDT") == Decimal("-10")
+    mock_session.get_executions.assert_called_once()
+
+
+def test_bybit_calculate_profit_loss_unmatched_quantity(mock_session):
+    mock_session.get_executions.return_value = mock_executions_response(
+        [mock_execution("1", "sell-1", "Sell", "1", "90", 1000)]
+    )
+
+    assert bybit_calculate_profit_loss("BTCUSDT") == Decimal(0)
+    mock_session.get_executions.assert_called_once()
@@ -4,8 +4,12 @@ from chalicelib.src.exchanges.kucoin.kucoin_types import (
     KucoinAccountCredentials,
 )
 
+# Exchange name used to key the position state of a pair
+kucoin_exchange_name: str = "kucoin"
+
 # Kucoin Credentials
 base_url: str = "https://api.kucoin.com"
+kucoin_sandbox_url: str = "https://openapi-sandbox.kucoin.com"
 kucoin_account_names: list[str] = ["main", "sub_account_1", "sub_account_2"]
 kucoin_accounts: Dict[str, KucoinAccountCredentials] = {
     kucoin_account_names[0]: {
@@ -32,6 +36,12 @@ sell: str = "sell"
 tax_pair: str = "USDC-USDT"
 preferred_stablecoin: str = "USDT"
 
+# Symbol metadata is reloaded at most once per window
+kucoin_symbol_cache_ttl_seconds: int = 60 * 60
+
+# Fills fetched per page, older pages are only fetched when needed
+kucoin_fills_page_size: int = 50
+
 # Pairs
 tradingview_kucoin_symbols: dict[str, str] = {
     "<insert>": "<insert>",
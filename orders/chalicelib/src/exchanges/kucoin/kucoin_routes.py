@@ -0,0 +1,350 @@
+from chalice import Blueprint
+from chalice.app import SQSEvent
+from chalicelib.src.alerts.alerts_constants import (
+    alert_exchange_kucoin,
+    alert_queue_names,
+)
+from chalicelib.src.alerts.alerts_utils import execute_alert_job_message
+
+# KuCoin routes, deployed on their own by the orders-kucoin unit (see
+# scripts/build_deployment_units.py). Exchange modules are imported on first
+# use to keep cold starts short
+kucoin_routes: Blueprint = Blueprint(__name__)
+
+# SQS queue workers, registered only when ALERT_INTAKE_MODE is sqs so sync
+# and local deployments do not need the queues to exist
+kucoin_workers: Blueprint = Blueprint(__name__)
+
+"""
+Developer routes
+"""
+
+
+# # Developer function, convert assets in Kucoin subaccount to a stablecoin
+# @kucoin_routes.route("/converttostablecoin")
+# def transfer_funds_to_stablecoin():
+#     # set to sub account 1
+#     submit_market_order_custom_percentage(
+#         tax_pair, False, account=kucoin_account_names[2]
+#     )
+
+#     return {"message": "market order executed"}
+
+
+# # Developer function, reset Kucoin account to all Stablecoins
+# @kucoin_routes.route("/resettostablecoin")
+# def reset_funds_to_stablecoin():
+#     # SET BASE AND QUOTE CURRENCIES
+#     # SET ACCOUNT OR SUBACCOUNT
+#     # SET TRUE OR FALSE BUY
+#     # SET BUY PERCENTAGE CAPITAL
+#     pairToReset: str = "RNDRUP-USDT"
+#     account: str = kucoin_account_names[2]
+#     submit_market_order_custom_percentage(
+#         pairToReset,
+#         False,
+#         capital_percentage_to_deploy=1,
+#         account=account,
+#     )
+
+#     return {"message": "market order executed"}
+
+
+# """
+# Main Account routes
+# """
+
+
+# @kucoin_routes.route("/pairtradebuyalert", methods=["POST"])
+# def pair_trade_buy_alert():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     alert_job: AlertJob = submit_alert(
+#         alert_exchange_kucoin,
+#         tradingViewWebhookMessage,
+#         capital_to_deploy=0.98,
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "alertJobId": alert_job["job_id"],
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/pairtradesellalert", methods=["POST"])
+# def pair_trade_sell_alert():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     alert_job: AlertJob = submit_alert(
+#         alert_exchange_kucoin,
+#         tradingViewWebhookMessage,
+#         capital_to_deploy=0.98,
+#         buy_alert=False,
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "alertJobId": alert_job["job_id"],
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/pairtradebuyalertnotax", methods=["POST"])
+# def pair_trade_buy_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     alert_job: AlertJob = submit_alert(
+#         alert_exchange_kucoin,
+#         tradingViewWebhookMessage,
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "alertJobId": alert_job["job_id"],
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# Worker of the alert queue. The queue is FIFO and grouped per pair, so a
+# pair is never traded by two workers at once
+@kucoin_workers.on_sqs_message(queue=alert_queue_names[alert_exchange_kucoin])
+def kucoin_alert_queue_worker(event: SQSEvent):
+    for record in event:
+        execute_alert_job_message(record.body)
+
+
+# Subaccounts can be traded from one alert with /pairtradefanoutalert, see
+# alerts_routes, instead of one route per subaccount
+
+# """
+# Sub Account 1 routes
+# """
+
+
+# @kucoin_routes.route("/sub1pairtradebuyalert", methods=["POST"])
+# def sub_1_pair_trade_buy_alert():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         account=kucoin_account_names[1],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub1pairtradesellalert", methods=["POST"])
+# def sub_1_pair_trade_sell_alert():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         buy_alert=False,
+#         account=kucoin_account_names[1],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub1pairtradebuyalertnotax", methods=["POST"])
+# def sub_1_pair_trade_buy_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         account=kucoin_account_names[1],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub1pairtradesellalertnotax", methods=["POST"])
+# def sub_1_pair_trade_sell_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         buy_alert=False,
+#         account=kucoin_account_names[1],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# """
+# Sub Account 2 routes
+# """
+
+
+# @kucoin_routes.route("/sub2pairtradebuyalert", methods=["POST"])
+# def sub_2_pair_trade_buy_alert():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         account=kucoin_account_names[2],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub2pairtradesellalert", methods=["POST"])
+# def sub_2_pair_trade_sell_alert():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         buy_alert=False,
+#         account=kucoin_account_names[2],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub2pairtradebuyalertnotax", methods=["POST"])
+# def sub_2_pair_trade_buy_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         account=kucoin_account_names[2],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub2pairtradesellalertnotax", methods=["POST"])
+# def sub_2_pair_trade_sell_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         buy_alert=False,
+#         account=kucoin_account_names[2],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub3pairtradebuyalertnotax", methods=["POST"])
+# def sub_3_pair_trade_buy_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         account=kucoin_account_names[3],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub3pairtradesellalertnotax", methods=["POST"])
+# def sub_3_pair_trade_sell_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         buy_alert=False,
+#         account=kucoin_account_names[3],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub4pairtradebuyalertnotax", methods=["POST"])
+# def sub_4_pair_trade_buy_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         account=kucoin_account_names[4],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
+
+
+# @kucoin_routes.route("/sub4pairtradesellalertnotax", methods=["POST"])
+# def sub_4_pair_trade_sell_alert_no_tax():
+#     request = kucoin_routes.current_request
+#     tradingViewWebhookMessage = request.json_body
+#     print("tradingViewWebhookMessage", tradingViewWebhookMessage, "\n")
+#     submit_pair_trade_order(
+#         tradingview_symbol=tradingViewWebhookMessage["ticker"],
+#         capital_to_deploy=0.98,
+#         calculate_tax=False,
+#         buy_alert=False,
+#         account=kucoin_account_names[4],
+#     )
+
+#     return {
+#         "message": "alert received",
+#         "tradingViewWebhookMessage": tradingViewWebhookMessage,
+#     }
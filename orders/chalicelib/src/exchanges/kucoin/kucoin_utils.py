@@ -1,6 +1,12 @@
+import time
 from decimal import ROUND_DOWN, Decimal
-from typing import Any, Dict, Optional, Tuple
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Type
 
+from chalicelib.src.aws.aws_utils import (
+    get_position_state,
+    save_position_state,
+)
 from chalicelib.src.constants import (
     capital_to_deploy_percentage,
     country_personal_income_tax_rate,
@@ -11,6 +17,10 @@ from chalicelib.src.exchanges.kucoin.kucoin_constants import (
     base_url,
     kucoin_account_names,
     kucoin_accounts,
+    kucoin_exchange_name,
+    kucoin_fills_page_size,
+    kucoin_sandbox_url,
+    kucoin_symbol_cache_ttl_seconds,
     preferred_stablecoin,
     tax_pair,
     trade_account,
@@ -20,7 +30,22 @@ from chalicelib.src.exchanges.kucoin.kucoin_constants import (
 from chalicelib.src.exchanges.kucoin.kucoin_types import (
     KucoinAccountCredentials,
 )
+from kucoin.base_request.base_request import KucoinBaseRestApi
 from kucoin.client import Market, Trade, User
+from requests import Session
+
+# Base and quote increments indexed by symbol. Symbol metadata is public, so
+# the index is shared by every account
+kucoin_symbol_increments: Dict[str, Tuple[str, str]] = {}
+kucoin_symbol_increments_loaded_at: float = 0
+kucoin_symbol_increments_lock: Lock = Lock()
+
+# Pooled clients keyed by client class, account and sandbox flag. Clients of
+# the same sandbox flag share one requests session, so keep-alive connections
+# are reused across the calls of an alert and across warm invocations
+kucoin_clients: Dict[Tuple[type, Optional[str], bool], KucoinBaseRestApi] = {}
+kucoin_sessions: Dict[bool, Session] = {}
+kucoin_clients_lock: Lock = Lock()
 
 
 # Get account credentials, for main account or sub accounts to trade with
@@ -39,27 +64,140 @@ def get_account_credentials(
         return None, None, None
 
 
+# Get a pooled User, Trade or Market client for an account. Public market
+# data can be read without an account by passing None
+def get_kucoin_client(
+    client_class: Type[KucoinBaseRestApi],
+    account: Optional[str] = kucoin_account_names[0],
+    sandbox: bool = development_mode,
+) -> Any:
+    client_key = (client_class, account, sandbox)
+    with kucoin_clients_lock:
+        client = kucoin_clients.get(client_key)
+        if client is None:
+            api_key, api_secret, api_passphrase = (
+                get_account_credentials(account) if account else ("", "", "")
+            )
+            client = client_class(
+                api_key,
+                api_secret,
+                api_passphrase,
+                url=kucoin_sandbox_url if sandbox else base_url,
+            )
+            client.session = kucoin_sessions.setdefault(sandbox, Session())
+            kucoin_clients[client_key] = client
+
+    return client
+
+
+# Drop pooled clients so the next call builds new ones, eg. after API
+# credentials have been rotated
+def clear_kucoin_clients() -> None:
+    with kucoin_clients_lock:
+        kucoin_clients.clear()
+        kucoin_sessions.clear()
+
+
 # Get current account balance
 def get_account_balance(account: str = kucoin_account_names[0]) -> Any:
-    api_key, api_secret, api_passphrase = get_account_credentials(account)
-    client = (
-        User(api_key, api_secret, api_passphrase)
-        if not development_mode
-        else User(
-            api_key,
-            api_secret,
-            api_passphrase,
-            is_sandbox=True,
-            url=f"{base_url}/api/v1/accounts/test",
-        )
-    )
+    client = get_kucoin_client(User, account)
     balance = client.get_account_list()
 
     print("Account balance:", balance)
     return balance
 
 
-# Submit market order for inversely paired assets
+# Fills of a symbol, newest first, shared by the side detection and the
+# profit/loss calculation of one alert. The first page is fetched once, and
+# older pages are only fetched when a walk runs past the loaded fills
+class KucoinFillsCursor:
+    def __init__(
+        self,
+        kucoin_symbol: str,
+        account: str = kucoin_account_names[0],
+        page_size: int = kucoin_fills_page_size,
+    ):
+        self.kucoin_symbol = kucoin_symbol
+        self.account = account
+        self.page_size = page_size
+        self.fills: List[Dict[str, Any]] = []
+        self.trade_ids: Set[str] = set()
+        self.pages_loaded: int = 0
+        self.total_pages: Optional[int] = None
+
+    # Fetch a page of fills from KuCoin
+    def fetch_fills(self, **kwargs) -> List[Dict[str, Any]]:
+        client = get_kucoin_client(Trade, self.account)
+        response = client.get_fill_list(
+            tradeType=trade_account.upper(),
+            symbol=self.kucoin_symbol,
+            pageSize=self.page_size,
+            **kwargs,
+        )
+        if "currentPage" in kwargs:
+            self.total_pages = response.get("totalPage", 0)
+        return response.get("items") or []
+
+    # Keep fills not seen before, in the order they were fetched
+    def new_fills(self, fills: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        unseen_fills = []
+        for fill in fills:
+            if fill["tradeId"] not in self.trade_ids:
+                self.trade_ids.add(fill["tradeId"])
+                unseen_fills.append(fill)
+        return unseen_fills
+
+    # Fetch the next older page. Returns False once every page is loaded
+    def load_next_page(self) -> bool:
+        if (
+            self.total_pages is not None
+            and self.pages_loaded >= self.total_pages
+        ):
+            return False
+
+        fills = self.fetch_fills(currentPage=self.pages_loaded + 1)
+        self.pages_loaded += 1
+        # Fills made since the first page shift the pages, so an older page
+        # may repeat fills that are already loaded
+        self.fills.extend(self.new_fills(fills))
+        return len(fills) > 0
+
+    # Add fills made since the cursor was loaded, eg. the fills of the order
+    # that closed a position, without fetching the older pages again
+    def refresh(self) -> int:
+        if self.pages_loaded == 0:
+            self.load_next_page()
+            return len(self.fills)
+
+        start_at = self.fills[0]["createdAt"] if self.fills else None
+        fills = (
+            self.fetch_fills(startAt=start_at)
+            if start_at is not None
+            else self.fetch_fills(currentPage=1)
+        )
+        unseen_fills = self.new_fills(fills)
+        self.fills[:0] = unseen_fills
+        return len(unseen_fills)
+
+    # Most recent fill, or None if the symbol has no fills
+    def first_fill(self) -> Optional[Dict[str, Any]]:
+        if self.pages_loaded == 0:
+            self.load_next_page()
+        return self.fills[0] if self.fills else None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        index = 0
+        while True:
+            if index >= len(self.fills):
+                if not self.load_next_page():
+                    return
+                continue
+            yield self.fills[index]
+            index += 1
+
+
+# Submit market order for inversely paired assets. Returns the opening order,
+# or None if it was not placed
 def submit_pair_trade_order(
     tradingview_symbol,
     capital_to_deploy=capital_to_deploy_percentage,
@@ -81,12 +219,37 @@ def submit_pair_trade_order(
 
     # If there is no sell order found for inverse pair symbol,
     # sell all holdings of the inverse pair and convert CGT to USDC.
-    # Assumes there is only one order open at a time
-    if not (
-        get_most_recent_inverse_fill_to_stablecoin(
-            kucoin_inverse_symbol, account=account
+    # Assumes there is only one order open at a time. The held leg is read
+    # from the position state, the fills are only read when there is no
+    # fresh state or the state proves wrong, and are then fetched once and
+    # shared with the profit/loss calculation
+    position_state = get_position_state(
+        kucoin_exchange_name, account, tradingview_symbol
+    )
+    fills_cursor = None
+    holding_inverse_asset = None
+    if position_state is not None:
+        holding_inverse_asset = (
+            position_state["HeldSymbol"] == kucoin_inverse_symbol
         )
-    ):
+
+        # The state is saved when the opening order is submitted, not when
+        # it fills. A state that says the inverse asset is not held is
+        # checked against its balance, like the inverse position on Alpaca
+        if not holding_inverse_asset and (
+            holds_asset_position(kucoin_inverse_symbol, account=account)
+            is not False
+        ):
+            print("POSITION STATE MISMATCH - RECONCILING WITH FILLS")
+            holding_inverse_asset = None
+
+    if holding_inverse_asset is None:
+        fills_cursor = KucoinFillsCursor(kucoin_inverse_symbol, account)
+        holding_inverse_asset = not get_most_recent_inverse_fill_to_stablecoin(
+            kucoin_inverse_symbol, account=account, fills_cursor=fills_cursor
+        )
+
+    if holding_inverse_asset:
         (
             base_currency_inverse,
             quote_currency_inverse,
@@ -100,7 +263,7 @@ def submit_pair_trade_order(
             )
         if base_currency_inverse == preferred_stablecoin:
             print("NO CONVERSION TO STABLECOIN FOUND - SUBMIT BUY ORDER")
-            submit_market_order_custom_percentage(
+            closing_order = submit_market_order_custom_percentage(
                 kucoin_inverse_symbol,
                 True,
                 capital_percentage_to_deploy=1,
@@ -108,16 +271,31 @@ def submit_pair_trade_order(
             )
         elif quote_currency_inverse == preferred_stablecoin:
             print("NO CONVERSION TO STABLECOIN FOUND - SUBMIT SELL ORDER")
-            submit_market_order_custom_percentage(
+            closing_order = submit_market_order_custom_percentage(
                 kucoin_inverse_symbol,
                 False,
                 capital_percentage_to_deploy=1,
                 account=account,
             )
 
-        if calculate_tax:
+        # The state said the inverse asset was held but there was nothing to
+        # close, so the fills decide if there was a position
+        if fills_cursor is None and closing_order is None:
+            print("POSITION STATE MISMATCH - RECONCILING WITH FILLS")
+            fills_cursor = KucoinFillsCursor(kucoin_inverse_symbol, account)
+            holding_inverse_asset = (
+                not get_most_recent_inverse_fill_to_stablecoin(
+                    kucoin_inverse_symbol,
+                    account=account,
+                    fills_cursor=fills_cursor,
+                )
+            )
+
+        if calculate_tax and holding_inverse_asset:
             profit_loss_amount = calculate_profit_loss(
-                kucoin_inverse_symbol, account
+                kucoin_inverse_symbol,
+                account=account,
+                fills_cursor=fills_cursor,
             )
             tax_amount = profit_loss_amount * country_personal_income_tax_rate
             print("tax_amount", profit_loss_amount, "\n")
@@ -127,10 +305,18 @@ def submit_pair_trade_order(
                     tax_pair, True, tax_amount, account
                 )
 
-    submit_market_order_custom_percentage(
+    opening_order = submit_market_order_custom_percentage(
         kucoin_symbol, True, capital_to_deploy, account
     )
 
+    # The next alert on the pair can skip the fills lookup
+    if opening_order is not None:
+        save_position_state(
+            kucoin_exchange_name, account, tradingview_symbol, kucoin_symbol
+        )
+
+    return opening_order
+
 
 # Check if last fill was a sell side order have been sold to USDT.
 # Returns True if last order was Sell, False if last order was a Buy or
@@ -139,6 +325,7 @@ def get_most_recent_inverse_fill_to_stablecoin(
     kucoin_symbol,
     stablecoin=preferred_stablecoin,
     account=kucoin_account_names[0],
+    fills_cursor=None,
 ):
     base_currency, quote_currency = get_base_and_quote_assets(kucoin_symbol)
     buyOrSellToStablecoin: str = ""
@@ -153,30 +340,48 @@ def get_most_recent_inverse_fill_to_stablecoin(
     buyOrSellToStablecoin = (
         "sell" if base_currency == stablecoin else "quote_currency"
     )
-    api_key, api_secret, api_passphrase = get_account_credentials(account)
-    client = (
-        Trade(api_key, api_secret, api_passphrase)
-        if not development_mode
-        else Trade(
-            api_key,
-            api_secret,
-            api_passphrase,
-            is_sandbox=True,
-            url=f"{base_url}/api/v1/fills/test",
-        )
-    )
-    recent_fills = client.get_fill_list(
-        tradeType=trade_account.upper(),
-        symbol=kucoin_symbol,
-    )
+    if fills_cursor is None:
+        fills_cursor = KucoinFillsCursor(kucoin_symbol, account)
 
-    if len(recent_fills["items"]) > 0:
-        last_fill = recent_fills["items"][0]
+    last_fill = fills_cursor.first_fill()
+    if last_fill is not None:
         return True if last_fill["side"] == buyOrSellToStablecoin else False
 
     return False
 
 
+# Check the balance of the non stablecoin asset of a pair. A balance below
+# the order increment of the pair is dust left by a close, not a position.
+# Returns None if the balance could not be read
+def holds_asset_position(
+    kucoin_symbol,
+    stablecoin=preferred_stablecoin,
+    account=kucoin_account_names[0],
+) -> Optional[bool]:
+    base_currency, quote_currency = get_base_and_quote_assets(kucoin_symbol)
+    held_asset_is_base = base_currency != stablecoin
+    try:
+        balance = get_available_balance(
+            base_currency if held_asset_is_base else quote_currency, account
+        )
+    except Exception as e:
+        print(f"Error reading balance: {e}")
+        return None
+    if balance is None:
+        return None
+
+    base_increment, quote_increment = get_symbol_increments(
+        kucoin_symbol, account
+    )
+    increment = base_increment if held_asset_is_base else quote_increment
+    asset_balance = Decimal(balance)
+    if increment is not None:
+        asset_balance = asset_balance.quantize(
+            Decimal(increment), rounding=ROUND_DOWN
+        )
+    return asset_balance > 0
+
+
 # Sell all holdings of a symbol using a Market Order.
 # Default is aSell Side Order
 def submit_market_order_custom_percentage(
@@ -215,18 +420,7 @@ def submit_market_order_custom_percentage(
     # Remember to use size instead of funds if you want denomination
     # in base currency
     if funds_to_deploy > 0:
-        api_key, api_secret, api_passphrase = get_account_credentials(account)
-        client_trade = (
-            Trade(api_key, api_secret, api_passphrase)
-            if not development_mode
-            else Trade(
-                api_key,
-                api_secret,
-                api_passphrase,
-                is_sandbox=True,
-                url=f"{base_url}/api/v1/orders/test",
-            )
-        )
+        client_trade = get_kucoin_client(Trade, account)
         if buy_side_order:
             order_response = client_trade.create_market_order(
                 symbol=str(kucoin_symbol),
@@ -234,6 +428,7 @@ def submit_market_order_custom_percentage(
                 funds=str(funds_to_deploy),
             )
             print("Market buy order submitted: \n", order_response, "\n")
+            return order_response
         else:
             order_response = client_trade.create_market_order(
                 symbol=str(kucoin_symbol),
@@ -241,46 +436,38 @@ def submit_market_order_custom_percentage(
                 size=str(funds_to_deploy),
             )
             print("Market sell order submitted: \n", order_response, "\n")
+            return order_response
 
 
 # Calculate the profit/loss made from previous trade
 # (assuming Market Order for both)
-# Change stablecoin to other stablecoin or pair
+# Change stablecoin to other stablecoin or pair. A fills cursor created
+# before the closing order is refreshed to include the closing fills
 def calculate_profit_loss(
     kucoin_symbol,
     currency_to_convert_to=preferred_stablecoin,
     account=kucoin_account_names[0],
-):
-    api_key, api_secret, api_passphrase = get_account_credentials(account)
-    client = (
-        Trade(api_key, api_secret, api_passphrase)
-        if not development_mode
-        else Trade(
-            api_key,
-            api_secret,
-            api_passphrase,
-            is_sandbox=True,
-            url=f"{base_url}/api/v1/fills/test",
-        )
-    )
-    recent_fills = client.get_fill_list(
-        tradeType=trade_account.upper(), symbol=kucoin_symbol
-    )
+    fills_cursor=None,
+) -> Decimal:
+    if fills_cursor is None:
+        fills_cursor = KucoinFillsCursor(kucoin_symbol, account)
+    else:
+        fills_cursor.refresh()
     base_currency, quote_currency = get_base_and_quote_assets(kucoin_symbol)
-    sell_funds = []
-    buy_funds = []
-    profitOrLoss = 0
+    sell_funds: List[Decimal] = []
+    buy_funds: List[Decimal] = []
     iterating_sell = True
 
-    for item in recent_fills["items"]:
+    # Older pages are only fetched if the walk runs past the loaded fills
+    for item in fills_cursor:
         if quote_currency == currency_to_convert_to:
             # Iterate over "sell" orders until the first "buy" order is found
             if item["side"] == "sell" and iterating_sell:
-                sell_funds.append(float(item["funds"]))
-            elif item["side"] == "buy" and iterating_sell:
+                sell_funds.append(Decimal(item["funds"]))
+            elif item["side"] == "buy":
                 # Stop iterating over "sell" orders once a "buy" order is found
                 iterating_sell = False
-                buy_funds.append(float(item["funds"]))
+                buy_funds.append(Decimal(item["funds"]))
             elif item["side"] == "sell" and not iterating_sell:
                 # Stop iterating once the first "sell" order after a "buy"
                 # order is found
@@ -288,20 +475,22 @@ def calculate_profit_loss(
         elif base_currency == currency_to_convert_to:
             # Iterate over "buy" orders until the first "sell" order is found
             if item["side"] == "buy" and iterating_sell:
-                buy_funds.append(float(item["funds"]))
-            elif item["side"] == "sell" and iterating_sell:
+                buy_funds.append(Decimal(item["funds"]))
+            elif item["side"] == "sell":
                 # Stop iterating over "buy" orders once a "sell" order is found
                 iterating_sell = False
-                sell_funds.append(float(item["funds"]))
+                sell_funds.append(Decimal(item["funds"]))
             elif item["side"] == "buy" and not iterating_sell:
                 # Stop iterating once the first "buy" order after a "sell"
                 # order is found
                 break
+        else:
+            break
     print("buy_funds", buy_funds)
     print("sell_funds", sell_funds)
-    sum_sell_funds = sum(sell_funds)
-    sum_buy_funds = sum(buy_funds)
-    profitOrLoss = sum_sell_funds - sum_buy_funds
+    sum_sell_funds: Decimal = sum(sell_funds, Decimal(0))
+    sum_buy_funds: Decimal = sum(buy_funds, Decimal(0))
+    profitOrLoss: Decimal = sum_sell_funds - sum_buy_funds
 
     print("profit/loss:", profitOrLoss)
     return profitOrLoss
@@ -344,18 +533,7 @@ def submit_market_order_custom_amount(
     # Remember to use size instead of funds if you want denomination
     # in base currency
     if funds_to_deploy > 0:
-        api_key, api_secret, api_passphrase = get_account_credentials(account)
-        client_trade = (
-            Trade(api_key, api_secret, api_passphrase)
-            if not development_mode
-            else Trade(
-                api_key,
-                api_secret,
-                api_passphrase,
-                is_sandbox=True,
-                url=f"{base_url}/api/v1/orders/test",
-            )
-        )
+        client_trade = get_kucoin_client(Trade, account)
         if buy_side_order:
             order_response = client_trade.create_market_order(
                 symbol=str(kucoin_symbol),
@@ -363,6 +541,7 @@ def submit_market_order_custom_amount(
                 funds=str(funds_to_deploy),
             )
             print("Market buy order submitted: \n", order_response, "\n")
+            return order_response
         else:
             order_response = client_trade.create_market_order(
                 symbol=str(kucoin_symbol),
@@ -370,6 +549,7 @@ def submit_market_order_custom_amount(
                 size=str(funds_to_deploy),
             )
             print("Market sell order submitted: \n", order_response, "\n")
+            return order_response
 
 
 # Get available coin balance, can specify base or quote symbol
@@ -377,8 +557,7 @@ def get_available_balance(
     currency: str,
     account: str = kucoin_account_names[0],
 ) -> Optional[str]:
-    api_key, api_secret, api_passphrase = get_account_credentials(account)
-    client = User(api_key, api_secret, api_passphrase)
+    client = get_kucoin_client(User, account)
     accounts = client.get_account_list(currency=currency)
 
     # Handle the case where the structure is different
@@ -402,23 +581,52 @@ def get_available_balance(
     return None
 
 
+# Load the increments of every listed symbol into the symbol index, at most
+# once per TTL window. The previous index is kept if the reload fails
+def load_symbol_increments(
+    ttl_seconds: int = kucoin_symbol_cache_ttl_seconds,
+) -> Dict[str, Tuple[str, str]]:
+    global kucoin_symbol_increments, kucoin_symbol_increments_loaded_at
+
+    with kucoin_symbol_increments_lock:
+        if (
+            kucoin_symbol_increments
+            and time.monotonic() - kucoin_symbol_increments_loaded_at
+            <= ttl_seconds
+        ):
+            return kucoin_symbol_increments
+
+        try:
+            symbols = get_kucoin_client(Market, None).get_symbol_list_v2()
+        except Exception as e:
+            print(f"Error loading symbol list: {e}")
+            return kucoin_symbol_increments
+
+        kucoin_symbol_increments = {
+            s["symbol"]: (s.get("baseIncrement"), s.get("quoteIncrement"))
+            for s in symbols
+        }
+        kucoin_symbol_increments_loaded_at = time.monotonic()
+        print("Symbol increments loaded:", len(kucoin_symbol_increments))
+        return kucoin_symbol_increments
+
+
+# Drop the symbol index so the next lookup reloads it
+def clear_symbol_increments() -> None:
+    global kucoin_symbol_increments, kucoin_symbol_increments_loaded_at
+
+    with kucoin_symbol_increments_lock:
+        kucoin_symbol_increments = {}
+        kucoin_symbol_increments_loaded_at = 0
+
+
 # Get minimum increment that a coin pair accepts. Returns base increment
 # of the base currency (first currency in the trading pair), and the quote
-# increment of the quote currency (second currency in the trading pair)
+# increment of the quote currency (second currency in the trading pair).
+# Symbol metadata is not account specific, the account is kept for callers
 def get_symbol_increments(
     symbol: str,
     account: str = kucoin_account_names[0],
 ) -> Tuple[Optional[str], Optional[str]]:
-    api_key, api_secret, api_passphrase = get_account_credentials(account)
-    client = Market(api_key, api_secret, api_passphrase)
-    symbols = client.get_symbol_list_v2()
-
-    # Iterate through the symbols to find the one
-    # matching the provided symbol
-    for s in symbols:
-        if s["symbol"] == symbol:
-            # Return base increment and quote increment
-            return s.get("baseIncrement"), s.get("quoteIncrement")
-
     # Return None if the symbol is not found
-    return None, None
+    return load_symbol_increments().get(symbol, (None, None))
@@ -1,13 +1,24 @@
+from decimal import Decimal
 from unittest.mock import patch
 
 from chalicelib.src.exchanges.kucoin.kucoin_constants import (
     kucoin_account_names,
+    kucoin_exchange_name,
 )
 from chalicelib.src.exchanges.kucoin.kucoin_utils import (
+    KucoinFillsCursor,
+    calculate_profit_loss,
+    clear_kucoin_clients,
+    clear_symbol_increments,
     get_account_credentials,
     get_available_balance,
+    get_kucoin_client,
+    get_most_recent_inverse_fill_to_stablecoin,
     get_symbol_increments,
+    load_symbol_increments,
+    submit_pair_trade_order,
 )
+from kucoin.client import Market, Trade, User
 from mock_data_objects import (
     mock_account_list_response,
     mock_kucoin_accounts,
@@ -68,8 +79,10 @@ def test_get_available_balance(mocker, capsys):
 
 
 def test_get_symbol_increments(mocker):
+    clear_symbol_increments()
+
     # Mock the Market class and its get_symbol_list_v2 method
-    mocker.patch(
+    mock_get_symbol_list = mocker.patch(
         "chalicelib.src.exchanges.kucoin.kucoin_utils.Market.get_symbol_list_v2",  # noqa: E501
         return_value=mock_symbol_list_response,
     )
@@ -85,3 +98,207 @@ def test_get_symbol_increments(mocker):
     # Test for a non-existing symbol (XYZUSDT)
     symbol_increments = get_symbol_increments("XYZUSDT")
     assert symbol_increments == (None, None)
+
+    # The symbol list is downloaded once and shared across accounts
+    get_symbol_increments("BTCUSDT", kucoin_account_names[1])
+    mock_get_symbol_list.assert_called_once()
+
+
+def test_load_symbol_increments_reloads_after_ttl(mocker):
+    clear_symbol_increments()
+    mock_get_symbol_list = mocker.patch(
+        "chalicelib.src.exchanges.kucoin.kucoin_utils.Market.get_symbol_list_v2",  # noqa: E501
+        return_value=mock_symbol_list_response,
+    )
+
+    load_symbol_increments()
+    load_symbol_increments(ttl_seconds=-1)
+    assert mock_get_symbol_list.call_count == 2
+
+    # A failed reload keeps the previous index
+    mock_get_symbol_list.side_effect = Exception("Request timed out")
+    symbol_increments = load_symbol_increments(ttl_seconds=-1)
+    assert symbol_increments["ETHUSDT"] == ("0.01", "0.1")
+    clear_symbol_increments()
+
+
+def test_get_kucoin_client_pools_clients():
+    clear_kucoin_clients()
+
+    trade_client = get_kucoin_client(Trade, kucoin_account_names[0], False)
+    user_client = get_kucoin_client(User, kucoin_account_names[0], False)
+    sandbox_client = get_kucoin_client(Trade, kucoin_account_names[0], True)
+
+    # One client per class, account and sandbox flag
+    assert get_kucoin_client(Trade, kucoin_account_names[0], False) is (
+        trade_client
+    )
+    assert get_kucoin_client(Trade, kucoin_account_names[1], False) is not (
+        trade_client
+    )
+    assert sandbox_client is not trade_client
+    assert sandbox_client.url != trade_client.url
+
+    # Clients of the same sandbox flag share the keep-alive connections
+    assert user_client.session is trade_client.session
+    assert sandbox_client.session is not trade_client.session
+    assert get_kucoin_client(Market, None, False).key == ""
+    clear_kucoin_clients()
+
+
+def mock_fill(trade_id, side, funds, created_at):
+    return {
+        "symbol": "BTC-USDT",
+        "tradeId": trade_id,
+        "side": side,
+        "funds": funds,
+        "createdAt": created_at,
+    }
+
+
+def test_fills_cursor_shared_by_side_detection_and_profit_loss(mocker):
+    mock_get_fill_list = mocker.patch(
+        "chalicelib.src.exchanges.kucoin.kucoin_utils.Trade.get_fill_list",
+        side_effect=[
+            # First page, before the position is closed
+            {
+                "totalPage": 2,
+                "items": [mock_fill("3", "buy", "0.1", 3000)],
+            },
+            # Refresh with the fill of the closing order
+            {
+                "items": [
+                    mock_fill("4", "sell", "0.35", 4000),
+                    mock_fill("3", "buy", "0.1", 3000),
+                ]
+            },
+            # Second page, shifted by the closing fill
+            {
+                "totalPage": 2,
+                "items": [
+                    mock_fill("3", "buy", "0.1", 3000),
+                    mock_fill("2", "buy", "0.2", 2000),
+                    mock_fill("1", "sell", "0.5", 1000),
+                ],
+            },
+        ],
+    )
+
+    fills_cursor = KucoinFillsCursor("BTC-USDT", page_size=1)
+    assert not get_most_recent_inverse_fill_to_stablecoin(
+        "BTC-USDT", fills_cursor=fills_cursor
+    )
+    profit_loss = calculate_profit_loss("BTC-USDT", fills_cursor=fills_cursor)
+
+    # Sums are exact, 0.35 - (0.1 + 0.2)
+    assert profit_loss == Decimal("0.05")
+    assert mock_get_fill_list.call_count == 3
+    assert mock_get_fill_list.call_args_list[1].kwargs["startAt"] == 3000
+    assert mock_get_fill_list.call_args_list[2].kwargs["currentPage"] == 2
+
+
+def test_fills_cursor_stops_at_first_page(mocker):
+    mock_get_fill_list = mocker.patch(
+        "chalicelib.src.exchanges.kucoin.kucoin_utils.Trade.get_fill_list",
+        return_value={
+            "totalPage": 5,
+            "items": [
+                mock_fill("3", "sell", "12", 3000),
+                mock_fill("2", "buy", "10", 2000),
+                mock_fill("1", "sell", "9", 1000),
+            ],
+        },
+    )
+
+    assert calculate_profit_loss("BTC-USDT") == Decimal("2")
+    mock_get_fill_list.assert_called_once()
+
+
+def mock_pair_trade(mocker, position_state, balances):
+    module = "chalicelib.src.exchanges.kucoin.kucoin_utils"
+    mocker.patch(
+        f"{module}.tradingview_kucoin_symbols", {"BTCUSDT": "BTC-USDT"}
+    )
+    mocker.patch(
+        f"{module}.tradingview_kucoin_inverse_pairs",
+        {"BTCUSDT": "BTC3S-USDT"},
+    )
+    mocker.patch(f"{module}.get_position_state", return_value=position_state)
+    mocker.patch(
+        f"{module}.get_available_balance",
+        side_effect=lambda currency, account=None: balances.get(currency),
+    )
+    mocker.patch(
+        f"{module}.get_symbol_increments", return_value=("0.001", "0.01")
+    )
+    return (
+        mocker.patch(
+            f"{module}.Trade.create_market_order",
+            return_value={"orderId": "1"},
+        ),
+        mocker.patch(f"{module}.Trade.get_fill_list"),
+        mocker.patch(f"{module}.save_position_state"),
+    )
+
+
+def test_submit_pair_trade_order_uses_position_state(mocker, capsys):
+    (
+        mock_create_market_order,
+        mock_get_fill_list,
+        mock_save_position_state,
+    ) = mock_pair_trade(
+        mocker,
+        {"HeldSymbol": "BTC3S-USDT"},
+        {"BTC3S": "5", "USDT": "100"},
+    )
+
+    opening_order = submit_pair_trade_order("BTCUSDT", 1, calculate_tax=False)
+
+    # The held leg comes from the state, so no fills are read
+    mock_get_fill_list.assert_not_called()
+    assert "POSITION STATE MISMATCH" not in capsys.readouterr().out
+    assert [
+        call.kwargs["side"] for call in mock_create_market_order.call_args_list
+    ] == ["sell", "buy"]
+    mock_save_position_state.assert_called_once_with(
+        kucoin_exchange_name, kucoin_account_names[0], "BTCUSDT", "BTC-USDT"
+    )
+    assert opening_order == {"orderId": "1"}
+
+
+def test_submit_pair_trade_order_reconciles_position_state(mocker, capsys):
+    (
+        mock_create_market_order,
+        mock_get_fill_list,
+        mock_save_position_state,
+    ) = mock_pair_trade(mocker, {"HeldSymbol": "BTC3S-USDT"}, {"USDT": "100"})
+    mock_get_fill_list.return_value = {"items": []}
+
+    submit_pair_trade_order("BTCUSDT", 1, calculate_tax=False)
+
+    # Nothing was closed, so the fills decide if there was a position
+    assert "POSITION STATE MISMATCH" in capsys.readouterr().out
+    mock_get_fill_list.assert_called_once()
+    mock_create_market_order.assert_called_once_with(
+        symbol="BTC-USDT", side="buy", funds="100.000"
+    )
+    mock_save_position_state.assert_called_once()
+
+
+def test_submit_pair_trade_order_checks_position_state_balance(mocker):
+    mock_create_market_order, mock_get_fill_list, _ = mock_pair_trade(
+        mocker, {"HeldSymbol": "BTC-USDT"}, {"BTC3S": "0.0001", "USDT": "100"}
+    )
+
+    # Dust left by a close is not a position
+    submit_pair_trade_order("BTCUSDT", 1, calculate_tax=False)
+    mock_get_fill_list.assert_not_called()
+    assert mock_create_market_order.call_count == 1
+
+    # The opening order of the state was not filled or was reversed
+    _, mock_get_fill_list, _ = mock_pair_trade(
+        mocker, {"HeldSymbol": "BTC-USDT"}, {"BTC3S": "5", "USDT": "100"}
+    )
+    mock_get_fill_list.return_value = {"items": []}
+    submit_pair_trade_order("BTCUSDT", 1, calculate_tax=False)
+    mock_get_fill_list.assert_called_once()
@@ -0,0 +1,325 @@
+"""
+Builds a separately deployable Chalice project for each exchange. Every unit
+registers a single exchange blueprint and ships only the requirements and
+chalicelib modules that exchange needs, instead of the dependencies of every
+exchange in requirements.txt
+
+How to run:
+- cd orders
+- python scripts/build_deployment_units.py
+- python scripts/build_deployment_units.py alpaca bybit --report
+- cd build/orders-alpaca && chalice deploy
+
+Chalice keeps the state of deployed resources in .chalice/deployed of each
+unit, which is preserved when a unit is rebuilt
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+from importlib import metadata
+from typing import Dict, List, Set, TypedDict
+
+from cold_start_benchmark import measure_import_path, orders_directory
+
+build_directory: str = os.path.join(orders_directory, "build")
+
+
+class DeploymentUnit(TypedDict):
+    blueprint_module: str
+    blueprint_name: str
+    workers_blueprint_name: str
+    order_module: str
+    requirements_file: str
+    chalicelib_paths: List[str]
+
+
+# Modules shared by every exchange
+shared_chalicelib_paths: List[str] = [
+    "__init__.py",
+    "src/__init__.py",
+    "src/alerts",
+    "src/aws",
+    "src/constants.py",
+    "src/exchanges/__init__.py",
+    "src/exchanges/exchanges_utils.py",
+]
+
+deployment_units: Dict[str, DeploymentUnit] = {
+    "alpaca": {
+        "blueprint_module": "chalicelib.src.exchanges.alpaca.alpaca_routes",
+        "blueprint_name": "alpaca_routes",
+        "workers_blueprint_name": "alpaca_workers",
+        "order_module": "chalicelib.src.exchanges.alpaca.alpaca_orders_utils",
+        "requirements_file": "requirements-alpaca.txt",
+        "chalicelib_paths": ["src/exchanges/alpaca"],
+    },
+    "bybit": {
+        "blueprint_module": "chalicelib.src.exchanges.bybit.bybit_routes",
+        "blueprint_name": "bybit_routes",
+        "workers_blueprint_name": "bybit_workers",
+        "order_module": "chalicelib.src.exchanges.bybit.bybit_order_utils",
+        "requirements_file": "requirements-bybit.txt",
+        "chalicelib_paths": ["src/exchanges/bybit"],
+    },
+    "kucoin": {
+        "blueprint_module": "chalicelib.src.exchanges.kucoin.kucoin_routes",
+        "blueprint_name": "kucoin_routes",
+        "workers_blueprint_name": "kucoin_workers",
+        "order_module": "chalicelib.src.exchanges.kucoin.kucoin_utils",
+        "requirements_file": "requirements-kucoin.txt",
+        "chalicelib_paths": ["src/exchanges/kucoin"],
+    },
+}
+
+unit_app_template: str = """from chalice import Chalice
+from chalicelib.src.alerts.alerts_constants import alert_intake_mode_sqs
+from chalicelib.src.alerts.alerts_utils import get_alert_intake_mode
+from {blueprint_module} import (
+    {blueprint_name},
+    {workers_blueprint_name},
+)
+
+# Generated by scripts/build_deployment_units.py, do not edit
+app = Chalice(app_name="{app_name}")
+app.register_blueprint({blueprint_name})
+
+# Queue workers only exist when ALERT_INTAKE_MODE is sqs
+if get_alert_intake_mode() == alert_intake_mode_sqs:
+    app.register_blueprint({workers_blueprint_name})
+"""
+
+
+def build_deployment_unit(exchange: str) -> str:
+    """
+    Builds the Chalice project of an exchange into build/orders-<exchange>
+
+    Parameters:
+    - exchange: Exchange name, a key of deployment_units
+
+    Returns:
+    - A string with the path of the built unit
+    """
+
+    unit: DeploymentUnit = deployment_units[exchange]
+    app_name: str = f"orders-{exchange}"
+    unit_directory: str = os.path.join(build_directory, app_name)
+    source_chalicelib: str = os.path.join(orders_directory, "chalicelib")
+    unit_chalicelib: str = os.path.join(unit_directory, "chalicelib")
+
+    # Rebuild everything except deployed resource state
+    shutil.rmtree(unit_chalicelib, ignore_errors=True)
+    os.makedirs(os.path.join(unit_directory, ".chalice"), exist_ok=True)
+
+    for relative_path in shared_chalicelib_paths + unit["chalicelib_paths"]:
+        source_path: str = os.path.join(source_chalicelib, relative_path)
+        target_path: str = os.path.join(unit_chalicelib, relative_path)
+        if os.path.isdir(source_path):
+            shutil.copytree(
+                source_path,
+                target_path,
+                ignore=shutil.ignore_patterns("tests", "__pycache__"),
+            )
+        else:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copy2(source_path, target_path)
+
+    with open(os.path.join(unit_directory, "app.py"), "w") as app_file:
+        app_file.write(
+            unit_app_template.format(
+                blueprint_module=unit["blueprint_module"],
+                blueprint_name=unit["blueprint_name"],
+                workers_blueprint_name=unit["workers_blueprint_name"],
+                app_name=app_name,
+            )
+        )
+
+    shutil.copy2(
+        os.path.join(orders_directory, unit["requirements_file"]),
+        os.path.join(unit_directory, "requirements.txt"),
+    )
+
+    with open(
+        os.path.join(orders_directory, ".chalice", "config.json")
+    ) as config_file:
+        config: dict = json.load(config_file)
+    config["app_name"] = app_name
+    with open(
+        os.path.join(unit_directory, ".chalice", "config.json"), "w"
+    ) as config_file:
+        json.dump(config, config_file, indent=2)
+        config_file.write("\n")
+
+    print(f"Built {app_name} in {unit_directory}")
+    return unit_directory
+
+
+def read_requirement_names(requirements_path: str) -> List[str]:
+    """
+    Read the distribution names listed in a requirements file
+
+    Parameters:
+    - requirements_path: Path of the requirements file
+
+    Returns:
+    - A list of distribution names
+    """
+
+    with open(requirements_path) as requirements_file:
+        return [
+            re.split(r"[\s<>=!~;\[]", line.strip(), maxsplit=1)[0]
+            for line in requirements_file
+            if line.strip() and not line.startswith("#")
+        ]
+
+
+def get_installed_bundle_size(requirement_names: List[str]) -> int:
+    """
+    Size of the installed distributions a bundle would contain, including
+    transitive dependencies. Optional extras are not followed
+
+    Parameters:
+    - requirement_names: Distribution names listed in a requirements file
+
+    Returns:
+    - An int with the installed size in bytes
+    """
+
+    seen: Set[str] = set()
+    pending: List[str] = list(requirement_names)
+    total_size: int = 0
+
+    while pending:
+        name: str = pending.pop().lower().replace("_", "-")
+        if name in seen:
+            continue
+        seen.add(name)
+
+        try:
+            distribution = metadata.distribution(name)
+        except metadata.PackageNotFoundError:
+            print(f"    {name} is not installed, size not counted")
+            continue
+
+        for distribution_file in distribution.files or []:
+            file_path = distribution_file.locate()
+            if os.path.isfile(file_path):
+                total_size += os.path.getsize(file_path)
+
+        for requirement in distribution.requires or []:
+            if "extra ==" in requirement:
+                continue
+            pending.append(
+                re.split(r"[\s<>=!~;\[(]", requirement, maxsplit=1)[0]
+            )
+
+    return total_size
+
+
+def get_median_init_time_ms(
+    statement: str, project_directory: str, runs: int
+) -> float | None:
+    """
+    Median import time of a statement across fresh interpreters
+
+    Parameters:
+    - statement: Python statement(s) to run
+    - project_directory: Chalice project folder to run the statement from
+    - runs: Number of fresh interpreters to start
+
+    Returns:
+    - A float with the median import time in milliseconds, or None if the
+    import failed
+    """
+
+    totals_ms: List[float] = []
+    for _ in range(runs):
+        try:
+            import_times = measure_import_path(statement, project_directory)
+        except RuntimeError as e:
+            print(f"    Import failed: {str(e).splitlines()[-1]}")
+            return None
+        totals_ms.append(sum(time for _, time in import_times) / 1000)
+
+    return statistics.median(totals_ms)
+
+
+def report_deployment_units(exchanges: List[str], runs: int) -> None:
+    """
+    Print the bundle size and init time of each unit next to the combined
+    orders app
+
+    Parameters:
+    - exchanges: Exchange units to report on
+    - runs: Number of fresh interpreters to start per unit
+    """
+
+    combined_order_modules: str = "\n".join(
+        f"import {unit['order_module']}" for unit in deployment_units.values()
+    )
+    rows: List[tuple[str, int, float | None]] = [
+        (
+            "orders (combined)",
+            get_installed_bundle_size(
+                read_requirement_names(
+                    os.path.join(orders_directory, "requirements.txt")
+                )
+            ),
+            get_median_init_time_ms(
+                f"import app\n{combined_order_modules}",
+                orders_directory,
+                runs,
+            ),
+        )
+    ]
+
+    for exchange in exchanges:
+        unit: DeploymentUnit = deployment_units[exchange]
+        unit_directory: str = os.path.join(
+            build_directory, f"orders-{exchange}"
+        )
+        rows.append(
+            (
+                f"orders-{exchange}",
+                get_installed_bundle_size(
+                    read_requirement_names(
+                        os.path.join(unit_directory, "requirements.txt")
+                    )
+                ),
+                get_median_init_time_ms(
+                    f"import app\nimport {unit['order_module']}",
+                    unit_directory,
+                    runs,
+                ),
+            )
+        )
+
+    print(f"\n{'unit':<20} {'dependencies (MB)':>18} {'init time (ms)':>15}")
+    for unit_name, bundle_size, init_time_ms in rows:
+        init_time: str = (
+            f"{init_time_ms:15.1f}" if init_time_ms is not None else "failed"
+        )
+        print(f"{unit_name:<20} {bundle_size / 1e6:18.1f} {init_time:>15}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "exchanges",
+        nargs="*",
+        choices=list(deployment_units),
+        help="Exchanges to build, defaults to all",
+    )
+    parser.add_argument("--report", action="store_true")
+    parser.add_argument("--runs", type=int, default=5)
+    arguments = parser.parse_args()
+    exchanges: List[str] = arguments.exchanges or list(deployment_units)
+
+    for exchange in exchanges:
+        build_deployment_unit(exchange)
+
+    if arguments.report:
+        report_deployment_units(exchanges, arguments.runs)
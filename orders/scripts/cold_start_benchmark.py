@@ -0,0 +1,150 @@
+"""
+Cold start benchmark for the Chalice app. Each exchange path is imported in
+a fresh interpreter with `python -X importtime`, and the cumulative import
+time of every top level module is summed to give the import cost a cold
+Lambda container pays before the route handler runs
+
+How to run:
+- cd orders
+- python scripts/cold_start_benchmark.py
+- python scripts/cold_start_benchmark.py --runs 10 --top 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+orders_directory: str = os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+
+# Module imported by the route handlers of each path on first use. Every
+# path starts with `import app`, as a cold Lambda container does
+exchange_import_paths: Dict[str, str | None] = {
+    "app only": None,
+    "alert intake": "chalicelib.src.alerts.alerts_utils",
+    "alpaca": "chalicelib.src.exchanges.alpaca.alpaca_orders_utils",
+    "alpaca cron": "chalicelib.src.exchanges.alpaca.alpaca_cron_jobs",
+    "bybit": "chalicelib.src.exchanges.bybit.bybit_order_utils",
+    "kucoin": "chalicelib.src.exchanges.kucoin.kucoin_utils",
+}
+
+
+def parse_import_times(importtime_output: str) -> List[Tuple[str, int]]:
+    """
+    Parse `python -X importtime` output into top level modules and their
+    cumulative import time
+
+    Parameters:
+    - importtime_output: stderr of a `python -X importtime` run
+
+    Returns:
+    - A list of tuples, module name and cumulative import time in
+    microseconds
+    """
+
+    top_level_imports: List[Tuple[str, int]] = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, module_name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+
+        # Nested imports are indented below the module that imported them
+        if module_name.startswith("  ") or module_name.strip() == "":
+            continue
+        top_level_imports.append(
+            (module_name.strip(), int(cumulative.strip()))
+        )
+
+    return top_level_imports
+
+
+def measure_import_path(
+    statement: str, project_directory: str = orders_directory
+) -> List[Tuple[str, int]]:
+    """
+    Run a statement in a fresh interpreter and collect its import times
+
+    Parameters:
+    - statement: Python statement(s) to run
+    - project_directory: Chalice project folder to run the statement from
+
+    Returns:
+    - A list of tuples, module name and cumulative import time in
+    microseconds
+    """
+
+    environment: Dict[str, str] = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [project_directory, environment.get("PYTHONPATH")])
+    )
+
+    completed_process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=project_directory,
+        env=environment,
+        capture_output=True,
+        text=True,
+    )
+    if completed_process.returncode != 0:
+        raise RuntimeError(
+            f"Import failed for statement {statement!r}:\n"
+            f"{completed_process.stderr[-2000:]}"
+        )
+
+    return parse_import_times(completed_process.stderr)
+
+
+def run_benchmark(runs: int, top: int) -> None:
+    """
+    Measure every exchange path and print a report
+
+    Parameters:
+    - runs: Number of fresh interpreters to start per path
+    - top: Number of heaviest top level modules to list per path
+    """
+
+    print(f"Cold start import times (median of {runs} runs)\n")
+    for path_name, module_name in exchange_import_paths.items():
+        statement: str = (
+            f"import app\nimport {module_name}"
+            if module_name
+            else "import app"
+        )
+        totals_ms: List[float] = []
+        heaviest_modules: List[Tuple[str, int]] = []
+
+        for _ in range(runs):
+            try:
+                import_times = measure_import_path(statement)
+            except RuntimeError as e:
+                print(f"{path_name:<12} import failed")
+                print(f"    {str(e).splitlines()[-1]}\n")
+                break
+            totals_ms.append(sum(time for _, time in import_times) / 1000)
+            heaviest_modules = sorted(
+                import_times, key=lambda item: item[1], reverse=True
+            )[:top]
+
+        if not totals_ms:
+            continue
+
+        print(f"{path_name:<12} {statistics.median(totals_ms):9.1f} ms")
+        for imported_module, cumulative in heaviest_modules:
+            print(f"    {imported_module:<60} {cumulative / 1000:9.1f} ms")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    arguments = parser.parse_args()
+
+    run_benchmark(arguments.runs, arguments.top)